@@ -0,0 +1,184 @@
+import numpy as np
+
+from models import MONTH_NAMES, month_number
+
+
+class AggregationCube:
+    """
+    This class holds income, expenses and goals as dense NumPy arrays and computes rollups on them.
+
+    Income and expenses are (year x month x category) arrays and the monthly goals are (year x month)
+    arrays, with `years` and `categories` giving the labels of the first and last axis. Every rollup
+    is a vectorized reduction over these arrays, so no Python loop over months or transactions is needed.
+    """
+
+    kinds = ('income', 'expenses', 'income_goal', 'expense_goal')
+
+    def __init__(self, years: list, categories: list):
+        """
+        Initializes the class with zero-filled arrays.
+
+        Args:
+            years (list): The years covered by the cube, in ascending order.
+            categories (list): The category names.
+        """
+        self.years = list(years)
+        self.categories = list(categories)
+        self._year_index = {year: row for row, year in enumerate(self.years)}
+
+        shape = (len(self.years), 12, len(self.categories))
+        self.income = np.zeros(shape)
+        self.expenses = np.zeros(shape)
+        self.income_goal = np.zeros(shape[:2])
+        self.expense_goal = np.zeros(shape[:2])
+
+    @classmethod
+    def from_ledger(cls, ledger, goals=None):
+        """
+        Builds a cube from a TransactionLedger, and optionally from the monthly goals of a Goals object.
+
+        The ledger's columns are wrapped without copying and summed into the cube with `np.bincount`.
+        Month keys that aren't calendar months (see `month_number`) are left out.
+
+        Args:
+            ledger (TransactionLedger): The transactions to aggregate.
+            goals (Goals, optional): The goals to include.
+
+        Returns:
+            AggregationCube: The filled cube.
+        """
+        columns = ledger.columns()
+
+        years = set(ledger.years())
+        if goals is not None:
+            years.update(goals.years())
+        categories = list(columns["category_names"])
+        if "" not in categories:
+            categories.append("")  # balances folded by compact() have no category
+        cube = cls(sorted(years), categories)
+        if not cube.years:
+            return cube
+
+        amounts = np.frombuffer(columns["amount"], dtype=columns["amount"].typecode)
+        types = np.frombuffer(columns["type"], dtype=columns["type"].typecode)
+        category_ids = np.frombuffer(columns["category"], dtype=columns["category"].typecode)
+        year_rows = np.searchsorted(cube.years, np.frombuffer(columns["year"], dtype=columns["year"].typecode))
+        month_lookup = np.array([month_number(key) for key in columns["month_keys"]] or [0], dtype=np.intp)
+        months = month_lookup[np.frombuffer(columns["month"], dtype=columns["month"].typecode)]
+
+        cells = (year_rows * 12 + months - 1) * len(categories) + category_ids
+        for code, kind in enumerate(("income", "expenses")):
+            target = getattr(cube, kind)
+            selected = (types == code) & (months > 0)
+            # Summing whole cents is exact, so each cell is only rounded once, when converted
+            target += np.bincount(cells[selected], weights=amounts[selected],
+                                  minlength=target.size).reshape(target.shape) / 100
+
+            opening = ledger.opening_totals(kind[0])
+            for year, totals in opening.items():
+                for month, total in totals.items():
+                    number = month_number(month)
+                    if number:
+                        target[cube._year_index[year], number - 1, categories.index("")] += total
+
+        if goals is not None:
+            cube.add_goals(goals)
+        return cube
+
+    def add_goals(self, goals) -> None:
+        """
+        Fills the monthly goal arrays from the goals of every year in the cube.
+
+        Month keys that aren't calendar months (see `month_number`) are left out.
+
+        Args:
+            goals (Goals): The goals to include.
+        """
+        for year, row in self._year_index.items():
+            for type, kind in (("i", "income_goal"), ("e", "expense_goal")):
+                for month, goal in goals.get_monthly_goals(type, year).items():
+                    number = month_number(month)
+                    if number:
+                        getattr(self, kind)[row, number - 1] = goal
+
+    def _by_month(self, kind: str) -> np.ndarray:
+        """
+        Returns the (year x month) array of a kind, summed over categories.
+        """
+        if kind not in self.kinds:
+            raise ValueError(f"Unknown kind '{kind}'")
+        data = getattr(self, kind)
+        return data.sum(axis=2) if data.ndim == 3 else data
+
+    def monthly(self, kind: str, year: int) -> np.ndarray:
+        """
+        Returns the twelve monthly totals of a year.
+
+        Args:
+            kind (str): 'income', 'expenses', 'income_goal' or 'expense_goal'.
+            year (int): The year to total.
+
+        Returns:
+            np.ndarray: January to December totals, zeros if the year isn't in the cube.
+        """
+        row = self._year_index.get(year)
+        if row is None:
+            return np.zeros(12)
+        return self._by_month(kind)[row]
+
+    def quarterly(self, kind: str, year: int) -> np.ndarray:
+        """
+        Returns the four quarterly totals of a year.
+
+        Args:
+            kind (str): 'income', 'expenses', 'income_goal' or 'expense_goal'.
+            year (int): The year to total.
+
+        Returns:
+            np.ndarray: Q1 to Q4 totals.
+        """
+        return self.monthly(kind, year).reshape(4, 3).sum(axis=1)
+
+    def yearly(self, kind: str) -> np.ndarray:
+        """
+        Returns the total of every year in the cube.
+
+        Args:
+            kind (str): 'income', 'expenses', 'income_goal' or 'expense_goal'.
+
+        Returns:
+            np.ndarray: One total per entry of `years`.
+        """
+        return self._by_month(kind).sum(axis=1)
+
+    def by_category(self, kind: str, year: int) -> np.ndarray:
+        """
+        Returns the yearly total of each category.
+
+        Args:
+            kind (str): 'income' or 'expenses'.
+            year (int): The year to total.
+
+        Returns:
+            np.ndarray: One total per entry of `categories`.
+        """
+        row = self._year_index.get(year)
+        if row is None:
+            return np.zeros(len(self.categories))
+        return getattr(self, kind)[row].sum(axis=0)
+
+    def goal_variance(self, year: int) -> dict:
+        """
+        Returns how far each month of a year is from its goals.
+
+        Positive values mean the goal was beaten: income above the income goal, or expenses below
+        the expense goal.
+
+        Args:
+            year (int): The year to compare.
+
+        Returns:
+            dict: {'income': np.ndarray, 'expenses': np.ndarray} with twelve monthly variances each.
+        """
+        return {"income": self.monthly("income", year) - self.monthly("income_goal", year),
+                "expenses": self.monthly("expense_goal", year) - self.monthly("expenses", year)}
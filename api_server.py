@@ -0,0 +1,363 @@
+import argparse
+import asyncio
+import json
+import sys
+from datetime import datetime
+from urllib.parse import urlsplit, parse_qsl
+
+from models import MoneyManagement, Goals, month_number
+from money import to_amount
+from persistence import DataPersistence, SQLiteBackend, shared_requested
+from reports import ReportEngine
+from workspaces import Workspace, WorkspaceManager
+
+
+MAX_BODY = 10 * 1024 * 1024
+_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class ApiError(Exception):
+    """
+    Raised by a request handler to answer with an error status and message.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+
+def _month(value) -> int:
+    """
+    Returns the calendar month (1-12) of a query string or JSON value such as 4, '4' or 'April'.
+    """
+    number = month_number(value) if isinstance(value, (int, str)) and not isinstance(value, bool) else 0
+    if not number:
+        raise ApiError(400, f"Invalid month {value!r}")
+    return number
+
+
+def _year(value):
+    """
+    Returns a year from a query string or JSON value, or None if it isn't given.
+    """
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ApiError(400, f"Invalid year {value!r}")
+
+
+def _type(value) -> str:
+    if value not in ("i", "e"):
+        raise ApiError(400, "type must be 'i' (income) or 'e' (expenses)")
+    return value
+
+
+
+class ApiServer:
+    """
+    This class serves MoneyManagement and Goals over a small HTTP/JSON API, using only asyncio.
+
+    Every connection is handled by its own coroutine, so many clients are served concurrently; they
+    all run on the event loop thread, so the models are never touched by two requests at once.
+    Changes are saved in the background every `save_interval` seconds (and when the server closes),
+    with the write itself running in a worker thread so requests aren't held up by the disk.
+
+    Endpoints:
+        GET  /totals/monthly?type=i&year=2024    {month: total} of a year
+        GET  /totals/yearly?type=e&year=2024     {"total": total} of a year
+        GET  /goals?type=i&year=2024             {month: goal} of a year
+        GET  /report?month=4&year=2024           {"report": text}
+        GET  /categories?type=e&year=2024&month=4&top=10   {"categories": [[category, total], ...]}, largest first
+        POST /values  {"type", "value", "month", "year"}    like MoneyManagement.update_values
+        POST /goals   {"type", "goal", "month", "year"}     like Goals.update_monthly_goal
+        POST /batch   {"updates": [{"op": "values" or "goals", ...}, ...]}
+    """
+
+    def __init__(self, money_management: MoneyManagement, goals: Goals, persistence: DataPersistence = None,
+                 save_interval: float = 5.0, load_year=None):
+        """
+        Initializes the server without listening yet.
+
+        Args:
+            money_management (MoneyManagement): The income and expenses to serve.
+            goals (Goals): The goals to serve.
+            persistence (DataPersistence, optional): Where to save changes. Without it nothing is saved.
+            save_interval (float, optional): Seconds between background saves.
+            load_year (optional): Called with every year a request reads or changes before it is
+                served, e.g. `Workspace.load_year`, so years are only read from storage when asked for.
+        """
+        self.money_management = money_management
+        self.goals = goals
+        self.persistence = persistence
+        self.save_interval = save_interval
+        self.load_year = load_year
+        self.report_engine = ReportEngine(money_management, goals)
+        self.requests = 0
+        self._server = None
+        self._saver = None
+        self._save_lock = None
+        self._routes = {
+            ("GET", "/totals/monthly"): self.monthly_totals,
+            ("GET", "/totals/yearly"): self.yearly_total,
+            ("GET", "/goals"): self.monthly_goals,
+            ("GET", "/report"): self.report,
+            ("GET", "/categories"): self.categories,
+            ("POST", "/values"): self.update_values,
+            ("POST", "/goals"): self.update_goal,
+            ("POST", "/batch"): self.batch,
+        }
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8326):
+        """
+        Starts listening, and saving changes in the background.
+
+        Args:
+            host (str, optional): The address to listen on.
+            port (int, optional): The port to listen on; 0 picks a free one.
+
+        Returns:
+            asyncio.Server: The listening server; its `sockets` give the actual port.
+        """
+        self._save_lock = asyncio.Lock()
+        self._server = await asyncio.start_server(self.handle_connection, host, port)
+        if self.persistence is not None:
+            self._saver = asyncio.create_task(self._save_periodically())
+        return self._server
+
+    async def close(self) -> None:
+        """
+        Stops listening and saves the remaining changes.
+        """
+        if self._saver is not None:
+            # Wait for a save in progress instead of cancelling it halfway
+            async with self._save_lock:
+                self._saver.cancel()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        await self.save()
+
+    async def save(self) -> None:
+        """
+        Saves the values changed since the last save in a worker thread.
+        """
+        if self.persistence is None or not (self.money_management.has_changes() or self.goals.has_changes()):
+            return
+        async with self._save_lock:
+            # Collected on the loop thread, so requests can't change them while they are written
+            changes = (self.money_management.get_changes(), self.goals.get_changes())
+            await asyncio.to_thread(self.persistence.save_changes, *changes)
+
+    async def _save_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.save_interval)
+            await self.save()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers the HTTP/1.1 requests of one connection, keeping it open between requests.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode("latin-1").split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    self._respond(writer, 413, {"error": "Request body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = self.dispatch(method, target, body)
+
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _respond(self, writer: asyncio.StreamWriter, status: int, payload: dict, keep_alive: bool) -> None:
+        body = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status} {_reasons[status]}\r\n"
+                     f"Content-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n"
+                     f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + body)
+
+    def dispatch(self, method: str, target: str, body: bytes) -> tuple:
+        """
+        Runs the handler of a request.
+
+        Args:
+            method (str): The HTTP method.
+            target (str): The request path with its query string.
+            body (bytes): The request body, JSON for POST requests.
+
+        Returns:
+            tuple: (HTTP status, JSON-serializable payload)
+        """
+        self.requests += 1
+        url = urlsplit(target)
+        handler = self._routes.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self._routes):
+                return 405, {"error": f"{method} is not allowed on {url.path}"}
+            return 404, {"error": f"Unknown endpoint {url.path}"}
+        try:
+            if method == "POST":
+                try:
+                    data = json.loads(body or b"{}")
+                except ValueError:
+                    raise ApiError(400, "Request body isn't valid JSON")
+                if not isinstance(data, dict):
+                    raise ApiError(400, "Request body must be a JSON object")
+            else:
+                data = dict(parse_qsl(url.query))
+            return 200, handler(data)
+        except ApiError as e:
+            return e.status, {"error": str(e)}
+        except (KeyError, TypeError, ValueError) as e:
+            return 400, {"error": f"Invalid request: {e!r}"}
+        except Exception as e:
+            # A failing handler answers this request only, instead of dropping the connection
+            print(f"Error: {method} {url.path} failed: {e!r}")
+            return 500, {"error": "Internal server error"}
+
+    def _year(self, value, history: int = 0):
+        """
+        Returns a year from a query string or JSON value (see `_year`), after loading it and the
+        `history` years before it.
+        """
+        year = _year(value)
+        if self.load_year is not None:
+            last = year or datetime.now().year
+            for earlier in range(last - history, last + 1):
+                self.load_year(earlier)
+        return year
+
+    def monthly_totals(self, query: dict) -> dict:
+        return dict(self.money_management.get_year(_type(query.get("type", "i")), self._year(query.get("year"))))
+
+    def yearly_total(self, query: dict) -> dict:
+        year = self._year(query.get("year"))
+        if _type(query.get("type", "i")) == "i":
+            return {"total": self.money_management.get_yearly_income(year)}
+        return {"total": self.money_management.get_yearly_expenses(year)}
+
+    def monthly_goals(self, query: dict) -> dict:
+        return dict(self.goals.get_monthly_goals(_type(query.get("type", "i")), self._year(query.get("year"))))
+
+    def report(self, query: dict) -> dict:
+        month = _month(query["month"]) if query.get("month") else None
+        # The forecast in the report learns from the five years before (see forecast.forecast_year)
+        return {"report": self.report_engine.report(month, self._year(query.get("year"), history=5))}
+
+    def categories(self, query: dict) -> dict:
+        month = _month(query["month"]) if query.get("month") else None
+        try:
+            top = int(query.get("top", 10))
+        except ValueError:
+            raise ApiError(400, f"Invalid top {query['top']!r}")
+        return {"categories": self.money_management.top_categories(_type(query.get("type", "e")), top,
+                                                                   self._year(query.get("year")), month)}
+
+    def update_values(self, data: dict) -> dict:
+        self.money_management.update_values(_type(data["type"]), to_amount(data["value"]), _month(data["month"]), self._year(data.get("year")))
+        return {"updated": 1}
+
+    def update_goal(self, data: dict) -> dict:
+        self.goals.update_monthly_goal(to_amount(data["goal"]), _type(data["type"]), _month(data["month"]), self._year(data.get("year")))
+        return {"updated": 1}
+
+    def batch(self, data: dict) -> dict:
+        """
+        Applies many updates in one request.
+
+        Every update is checked before any is applied, so a bad update leaves the data unchanged.
+        """
+        updates = data["updates"]
+        if not isinstance(updates, list):
+            raise ApiError(400, "updates must be a list")
+        operations = {"values": self.update_values, "goals": self.update_goal}
+        checked = []
+        for number, update in enumerate(updates):
+            if not isinstance(update, dict) or update.get("op") not in operations:
+                raise ApiError(400, f"Update {number} needs an 'op' of 'values' or 'goals'")
+            try:
+                arguments = (_type(update["type"]), to_amount(update["value" if update["op"] == "values" else "goal"]),
+                             _month(update["month"]), self._year(update.get("year")))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ApiError(400, f"Update {number} is invalid: {e!r}")
+            checked.append((update["op"], arguments))
+        for op, (type, value, month, year) in checked:
+            if op == "values":
+                self.money_management.update_values(type, value, month, year)
+            else:
+                self.goals.update_monthly_goal(value, type, month, year)
+        return {"updated": len(checked)}
+
+
+async def serve(server: ApiServer, host: str, port: int) -> None:
+    """
+    Runs the server until it is cancelled (e.g. with Ctrl+C), then saves the remaining changes.
+    """
+    listening = await server.start(host, port)
+    print(f"Serving on http://{host}:{listening.sockets[0].getsockname()[1]}")
+    try:
+        await listening.serve_forever()
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await server.close()
+
+
+def main(argv=None):
+    """
+    Command line entry point for running the API server on the stored data.
+
+    Returns:
+        int: 0 when the server is stopped.
+    """
+    parser = argparse.ArgumentParser(description="Serve income, expenses and goals over HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8326)
+    parser.add_argument("--sqlite", help="use this SQLite database instead of the shelve file")
+    parser.add_argument("--workspace", help="serve this workspace (see workspaces.py)")
+    parser.add_argument("--save-interval", type=float, default=5.0, help="seconds between saves")
+    parser.add_argument("--shared", action="store_true",
+                        help="lock the shelve file on every access, so other programs can use it at the same time")
+    args = parser.parse_args(argv)
+
+    shared = shared_requested(args.shared)
+    with WorkspaceManager(sqlite=args.sqlite, max_open=1, shared=shared) as workspaces:
+        if args.workspace:
+            workspace = workspaces.open(args.workspace)
+        else:
+            workspace = Workspace("", DataPersistence(SQLiteBackend(args.sqlite) if args.sqlite else None, shared=shared))
+        server = ApiServer(workspace.money_management, workspace.goals, workspace.persistence, args.save_interval,
+                           workspace.load_year)
+        try:
+            asyncio.run(serve(server, args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        if not args.workspace:
+            workspace.persistence.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+"""
+A memory-mapped columnar archive for historical data.
+
+Closed years rarely change but are read again and again for charts, yearly totals and forecasts.
+Exporting them to an archive stores each kind of value as a fixed-width float64 column that is read
+through mmap, so a year's totals are a zero-copy slice instead of an unpickled dictionary:
+
+    python archive.py export history.fmarch --end 2023      # shelve file -> archive
+    python archive.py import history.fmarch                  # archive -> shelve file
+"""
+import argparse
+import bisect
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from models import month_number
+from persistence import MONTHLY_KINDS, YEARLY_KINDS, StorageBackend, StorageError, ShelveBackend, SQLiteBackend, \
+    shared_requested
+
+
+MAGIC = b"FMARCH01"
+VERSION = 1
+_HEADER = struct.Struct("<8sII")  # magic, format version, number of years
+_UNSET = float("nan")  # months and goals that were never set
+
+
+def _layout(count: int) -> dict:
+    """
+    Returns the byte offset of every column of an archive holding `count` years.
+
+    After the header come the years (int32), padded to 8 bytes, then one float64 column per kind:
+    twelve values per year for the monthly kinds and one per year for the yearly goals, each in
+    the order of the years column.
+    """
+    offset = _HEADER.size
+    offsets = {"years": offset}
+    offset += 4 * count
+    offset += -offset % 8
+    for kind in MONTHLY_KINDS:
+        offsets[kind] = offset
+        offset += 8 * 12 * count
+    for kind in YEARLY_KINDS:
+        offsets[kind] = offset
+        offset += 8 * count
+    offsets["end"] = offset
+    return offsets
+
+
+def write_archive(path: str, data: dict) -> int:
+    """
+    Writes data of many years to a columnar archive file, replacing it in one step.
+
+    Month keys are stored as calendar months (1-12, see `month_number`); values under other keys
+    can't be stored in the fixed-width columns and are skipped.
+
+    Args:
+        path (str): The archive file to write.
+        data (dict): {year: data} in the layout used by the storage backends.
+
+    Returns:
+        int: The number of monthly values that were skipped.
+    """
+    if sys.byteorder != "little":
+        raise StorageError("Columnar archives can only be written on little-endian machines")
+    years = sorted(data)
+    offsets = _layout(len(years))
+    columns = {kind: array('d', [_UNSET]) * (12 * len(years)) for kind in MONTHLY_KINDS}
+    columns.update({kind: array('d', [_UNSET]) * len(years) for kind in YEARLY_KINDS})
+    skipped = 0
+    for row, year in enumerate(years):
+        for kind in MONTHLY_KINDS:
+            for month, value in data[year].get(kind, {}).items():
+                number = month_number(month)
+                if number:
+                    columns[kind][row * 12 + number - 1] = value
+                else:
+                    skipped += 1
+        for kind in YEARLY_KINDS:
+            if data[year].get(kind) is not None:
+                columns[kind][row] = data[year][kind]
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as output:
+        output.write(_HEADER.pack(MAGIC, VERSION, len(years)))
+        output.write(array('i', years).tobytes())
+        output.write(bytes(offsets[MONTHLY_KINDS[0]] - output.tell()))
+        for kind in MONTHLY_KINDS + YEARLY_KINDS:
+            output.write(columns[kind].tobytes())
+    os.replace(temporary, path)
+    return skipped
+
+
+class ColumnarArchive(StorageBackend):
+    """
+    This class reads a columnar archive of historical data through a read-only memory map.
+
+    The archive stores every kind of value in its own fixed-width float64 column (twelve values per
+    year for the monthly kinds), so a year's income, or the income of a range of years, is one
+    contiguous slice. Opening the archive only reads its header; the slices handed out are
+    `memoryview`s of the mapped file, so nothing is copied or unpickled until a value is used, and
+    the operating system only pages in the parts that are read.
+
+    It implements the StorageBackend interface for reading, so `DataPersistence(ColumnarArchive(path))`
+    gives read-only access to archived years; writes raise StorageError.
+    """
+
+    def __init__(self, path: str):
+        """
+        Maps the archive file and checks its header.
+
+        Args:
+            path (str): The archive file.
+
+        Raises:
+            StorageError: If the file can't be opened or isn't a valid archive.
+        """
+        if sys.byteorder != "little":
+            raise StorageError("Columnar archives can only be read on little-endian machines")
+        self.path = path
+        try:
+            with open(path, "rb") as archive:
+                self._map = mmap.mmap(archive.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise StorageError(e) from e
+        if len(self._map) < _HEADER.size:
+            self._map.close()
+            raise StorageError(f"'{path}' is not a columnar archive")
+        magic, version, count = _HEADER.unpack_from(self._map)
+        offsets = _layout(count)
+        if magic != MAGIC or version != VERSION or len(self._map) != offsets["end"]:
+            self._map.close()
+            raise StorageError(f"'{path}' is not a columnar archive of version {VERSION}")
+
+        view = memoryview(self._map)
+        self._years = view[offsets["years"]:offsets["years"] + 4 * count].cast("i")
+        self._columns = {}
+        for kind in MONTHLY_KINDS:
+            self._columns[kind] = view[offsets[kind]:offsets[kind] + 8 * 12 * count].cast("d")
+        for kind in YEARLY_KINDS:
+            self._columns[kind] = view[offsets[kind]:offsets[kind] + 8 * count].cast("d")
+        self._view = view
+
+    def years(self) -> list:
+        return self._years.tolist()
+
+    def __contains__(self, year: int) -> bool:
+        return self._row(year) is not None
+
+    def _row(self, year: int):
+        row = bisect.bisect_left(self._years, year)
+        if row < len(self._years) and self._years[row] == year:
+            return row
+        return None
+
+    def monthly(self, kind: str, year: int) -> memoryview:
+        """
+        Returns the twelve values of a monthly kind for a year, without copying.
+
+        Args:
+            kind (str): 'income', 'expenses', 'income_goal' or 'expense_goal'.
+            year (int): The year.
+
+        Returns:
+            memoryview: January to December as doubles, NaN for months that were never set, or None
+                if the year isn't archived. The view is only valid until the archive is closed.
+        """
+        row = self._row(year)
+        if row is None:
+            return None
+        return self._columns[kind][row * 12:row * 12 + 12]
+
+    def column(self, kind: str) -> memoryview:
+        """
+        Returns a whole column without copying: (years x 12) values for the monthly kinds, in the
+        order of `years()`, or one value per year for the yearly goals. `numpy.asarray(column)` wraps
+        it without a copy as well.
+        """
+        return self._columns[kind]
+
+    def yearly_total(self, type: str, year: int) -> float:
+        """
+        Returns the yearly income or expenses, reading only that year's twelve values.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int): The year.
+
+        Returns:
+            float: The total, 0.0 if the year isn't archived.
+        """
+        values = self.monthly("income" if type == "i" else "expenses", year)
+        return math.fsum(value for value in values if value == value) if values is not None else 0.0
+
+    def chart_data(self, year: int) -> dict:
+        """
+        Returns the chart values of a year in the layout of `GUI_management.chart_data`, so
+        `draw_chart` can plot archived years.
+        """
+        data = {}
+        for kind, key in (("income", "income"), ("expenses", "expenses"),
+                          ("income_goal", "income_goal"), ("expense_goal", "expense_goal")):
+            values = self.monthly(kind, year)
+            data[key] = [value if value == value else 0.0 for value in values] if values is not None else [0.0] * 12
+        return data
+
+    def read(self, year: int) -> dict:
+        row = self._row(year)
+        if row is None:
+            return {}
+        data = {}
+        for kind in MONTHLY_KINDS:
+            values = self._columns[kind][row * 12:row * 12 + 12]
+            months = {month: value for month, value in enumerate(values, 1) if value == value}
+            if months:
+                data[kind] = months
+        for kind in YEARLY_KINDS:
+            value = self._columns[kind][row]
+            if value == value:
+                data[kind] = value
+        return data
+
+    def read_month(self, year: int, month) -> dict:
+        row = self._row(year)
+        number = month_number(month)
+        if row is None or not number:
+            return {}
+        values = {kind: self._columns[kind][row * 12 + number - 1] for kind in MONTHLY_KINDS}
+        return {kind: value for kind, value in values.items() if value == value}
+
+    def write(self, data: dict, year: int) -> None:
+        raise StorageError(f"The archive '{self.path}' is read-only; use import_archive to change the data")
+
+    def update(self, data: dict, year: int) -> None:
+        self.write(data, year)
+
+    def close(self) -> None:
+        for view in (*self._columns.values(), self._years, self._view):
+            view.release()
+        self._columns = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # A caller still holds a slice; the mapping is freed once the last one is gone
+            pass
+
+
+def export_archive(backend: StorageBackend, path: str, start_year: int = None, end_year: int = None) -> dict:
+    """
+    Writes the years stored in a backend (e.g. the shelve file) to a columnar archive.
+
+    Args:
+        backend (StorageBackend): The backend to read.
+        path (str): The archive file to write.
+        start_year (int, optional): The first year to export. Defaults to the first stored year.
+        end_year (int, optional): The last year to export. Defaults to the last stored year.
+
+    Returns:
+        dict: {'years': number of exported years, 'skipped': monthly values that weren't calendar months}.
+    """
+    years = backend.years()
+    if not years:
+        data = {}
+    else:
+        data = backend.read_range(start_year if start_year is not None else years[0],
+                                  end_year if end_year is not None else years[-1])
+    return {"years": len(data), "skipped": write_archive(path, data)}
+
+
+def import_archive(path: str, backend: StorageBackend) -> int:
+    """
+    Copies every year of a columnar archive into a backend (e.g. the shelve file).
+
+    Archived values replace the stored ones of the same kinds; kinds missing from the archive are kept.
+
+    Args:
+        path (str): The archive file to read.
+        backend (StorageBackend): The backend to write to.
+
+    Returns:
+        int: The number of imported years.
+    """
+    with ColumnarArchive(path) as archive:
+        years = archive.years()
+        for year in years:
+            backend.write(archive.read(year), year)
+    backend.flush()
+    return len(years)
+
+
+def main(argv=None):
+    """
+    Command line entry point for exporting the stored data to a columnar archive and importing it back.
+
+    Returns:
+        int: 0 on success, 1 if the data couldn't be read or written.
+    """
+    parser = argparse.ArgumentParser(description="Convert between the data file and a memory-mapped columnar archive.")
+    parser.add_argument("command", choices=("export", "import"))
+    parser.add_argument("archive", help="the archive file")
+    parser.add_argument("--data", default="financial_management_data", help="the shelve file (default: %(default)s)")
+    parser.add_argument("--sqlite", help="use this SQLite database instead of the shelve file")
+    parser.add_argument("--start", type=int, help="first year to export")
+    parser.add_argument("--end", type=int, help="last year to export")
+    parser.add_argument("--shared", action="store_true",
+                        help="lock the shelve file on every access, so other programs can use it at the same time")
+    args = parser.parse_args(argv)
+
+    try:
+        with (SQLiteBackend(args.sqlite) if args.sqlite else ShelveBackend(args.data, shared=shared_requested(args.shared))) as backend:
+            if args.command == "export":
+                result = export_archive(backend, args.archive, args.start, args.end)
+                print(f"Exported {result['years']} years to '{args.archive}'")
+                if result["skipped"]:
+                    print(f"Skipped {result['skipped']} values stored under months that aren't calendar months")
+            else:
+                print(f"Imported {import_archive(args.archive, backend)} years from '{args.archive}'")
+    except StorageError as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
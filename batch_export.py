@@ -0,0 +1,237 @@
+import argparse
+import html
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from models import MoneyManagement, Goals
+from persistence import DataPersistence, SQLiteBackend, shared_requested
+from reports import MONTH_NAMES, generate_report, report_values
+
+
+def parse_month(text: str) -> tuple:
+    """
+    Parses a 'YYYY-MM' string.
+
+    Args:
+        text (str): The month, e.g. '2023-04'.
+
+    Returns:
+        tuple: (year, month) with the month as 1-12.
+
+    Raises:
+        ValueError: If the text isn't a valid 'YYYY-MM' month.
+    """
+    year, _, month = text.partition("-")
+    year, month = int(year), int(month)
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month '{text}'")
+    return year, month
+
+
+def month_range(start: tuple, end: tuple):
+    """
+    Yields every (year, month) from `start` to `end` (inclusive).
+
+    Args:
+        start (tuple): The first (year, month).
+        end (tuple): The last (year, month).
+
+    Yields:
+        tuple: (year, month) with the month as 1-12.
+    """
+    year, month = start
+    while (year, month) <= end:
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+
+
+def snapshot(money_management: MoneyManagement, goals: Goals, start: tuple, end: tuple) -> tuple:
+    """
+    Copies the values needed for the reports and charts of a range of months into plain dictionaries.
+
+    Each month's values and text come from `reports.report_values` and `reports.generate_report`, the
+    same functions the GUI report uses, so the exported text includes the largest expenses and the
+    year-end forecast. The chart values are taken from MoneyManagement's aggregation cube. The result
+    only holds numbers and strings, which is cheap to send to worker processes.
+
+    Args:
+        money_management (MoneyManagement): The income and expenses to report on.
+        goals (Goals): The goals to compare against.
+        start (tuple): The first (year, month).
+        end (tuple): The last (year, month).
+
+    Returns:
+        tuple: (reports, charts) where reports is a list of report value dictionaries (see
+            `reports.report_values`) with the report text under 'text', one per month, and charts is
+            {year: {kind: twelve monthly values}}.
+    """
+    cube = money_management.aggregate(goals)
+    charts = {}
+    for year in range(start[0], end[0] + 1):
+        charts[year] = {kind: cube.monthly(kind, year).tolist() for kind in cube.kinds}
+
+    reports = []
+    for year, month in month_range(start, end):
+        values = report_values(money_management, goals, month, year)
+        values["text"] = generate_report(money_management, goals, month, year)
+        reports.append(values)
+    return reports, charts
+
+
+def write_report(directory: str, values: dict, chart: bool = True) -> tuple:
+    """
+    Writes the HTML report of one month.
+
+    Args:
+        directory (str): The directory to write to.
+        values (dict): The report values and text of the month, as returned by `snapshot`.
+        chart (bool, optional): Link the chart image of the month's year.
+
+    Returns:
+        tuple: (file name, seconds taken).
+    """
+    start = time.perf_counter()
+    year, month = values["year"], values["month"]
+    title = f"{MONTH_NAMES[month - 1]} {year}"
+    text = html.escape(values["text"]).replace("\n", "<br>\n")
+
+    lines = [
+        "<!DOCTYPE html>",
+        f"<html><head><meta charset=\"utf-8\"><title>Monthly Report - {title}</title></head><body>",
+        f"<h1>Monthly Report - {title}</h1>",
+        "<table>",
+        f"<tr><th>Income</th><td>${values['income']:.2f}</td><th>Income goal</th><td>${values['income_goal']:.2f}</td></tr>",
+        f"<tr><th>Expenses</th><td>${values['expenses']:.2f}</td><th>Expense goal</th><td>${values['expense_goal']:.2f}</td></tr>",
+        f"<tr><th>Income this year</th><td>${values['yearly_income']:.2f}</td><th>Expenses this year</th><td>${values['yearly_expenses']:.2f}</td></tr>",
+        "</table>",
+        f"<p>{text}</p>",
+    ]
+    if chart:
+        lines.append(f"<img src=\"chart-{year}.png\" alt=\"Monthly chart {year}\">")
+    lines.append("</body></html>")
+
+    name = f"report-{year}-{month:02d}.html"
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as report:
+        report.write("\n".join(lines))
+    return name, time.perf_counter() - start
+
+
+def write_chart(directory: str, year: int, chart: dict) -> tuple:
+    """
+    Renders the monthly chart of a year to a PNG file with Matplotlib's Agg backend.
+
+    Args:
+        directory (str): The directory to write to.
+        year (int): The year of the chart.
+        chart (dict): {kind: twelve monthly values} as returned by `snapshot`.
+
+    Returns:
+        tuple: (file name, seconds taken).
+    """
+    start = time.perf_counter()
+    # Figure with an Agg canvas doesn't need pyplot or a display, so this is safe in worker processes
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from reports import draw_monthly_chart
+
+    figure = Figure(figsize=(9, 5))
+    FigureCanvasAgg(figure)
+    artists = draw_monthly_chart(figure, chart["income"], chart["expenses"], chart["income_goal"], chart["expense_goal"])
+    artists["axes"].set_title(f'Monthly Income and Expenses {year}')
+
+    name = f"chart-{year}.png"
+    figure.savefig(os.path.join(directory, name))
+    return name, time.perf_counter() - start
+
+
+def export_reports(money_management: MoneyManagement, goals: Goals, start: tuple, end: tuple,
+                   directory: str, workers: int = None, charts: bool = True) -> list:
+    """
+    Writes the HTML report of every month from `start` to `end`, and a PNG chart for every year,
+    in parallel across a pool of worker processes.
+
+    An index.html linking every report is written as well.
+
+    Args:
+        money_management (MoneyManagement): The income and expenses to report on.
+        goals (Goals): The goals to compare against.
+        start (tuple): The first (year, month).
+        end (tuple): The last (year, month).
+        directory (str): The directory to write to. It is created if needed.
+        workers (int, optional): Number of worker processes. Defaults to the number of CPUs.
+        charts (bool, optional): Also render the charts.
+
+    Returns:
+        list: (file name, seconds taken) for every written report and chart.
+    """
+    os.makedirs(directory, exist_ok=True)
+    reports, years = snapshot(money_management, goals, start, end)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(write_report, directory, values, charts) for values in reports]
+        if charts:
+            futures += [pool.submit(write_chart, directory, year, chart) for year, chart in years.items()]
+        timings = [future.result() for future in futures]
+
+    links = [f"<li><a href=\"report-{values['year']}-{values['month']:02d}.html\">"
+             f"{MONTH_NAMES[values['month'] - 1]} {values['year']}</a></li>" for values in reports]
+    with open(os.path.join(directory, "index.html"), "w", encoding="utf-8") as index:
+        index.write("\n".join(["<!DOCTYPE html>", "<html><head><meta charset=\"utf-8\"><title>Monthly Reports</title></head><body>",
+                               "<h1>Monthly Reports</h1>", "<ul>", *links, "</ul>", "</body></html>"]))
+    return timings
+
+
+def main(argv=None):
+    """
+    Command line entry point for exporting the monthly reports of a range of months.
+
+    The data is read from the same store the GUI uses (or from an SQLite database with --sqlite).
+    The time taken by every report and chart is printed, followed by the totals.
+
+    Returns:
+        int: 0 on success, 1 if the range is invalid.
+    """
+    parser = argparse.ArgumentParser(description="Export monthly reports to HTML files and PNG charts.")
+    parser.add_argument("start", help="first month, as YYYY-MM")
+    parser.add_argument("end", nargs="?", help="last month, as YYYY-MM (default: the first month)")
+    parser.add_argument("--output", default="reports", help="directory to write the reports to")
+    parser.add_argument("--sqlite", help="read the data from this SQLite database instead of the shelve file")
+    parser.add_argument("--workers", type=int, help="number of worker processes (default: number of CPUs)")
+    parser.add_argument("--no-charts", action="store_true", help="don't render the PNG charts")
+    parser.add_argument("--shared", action="store_true",
+                        help="lock the shelve file on every access, so other programs can use it at the same time")
+    args = parser.parse_args(argv)
+
+    try:
+        start = parse_month(args.start)
+        end = parse_month(args.end) if args.end else start
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    if end < start:
+        print("Error: the last month is before the first month")
+        return 1
+
+    money_management = MoneyManagement()
+    goals = Goals()
+    backend = SQLiteBackend(args.sqlite) if args.sqlite else None
+    with DataPersistence(backend, shared=shared_requested(args.shared)) as persistence:
+        for year, data in persistence.read_range(start[0], end[0]).items():
+            money_management.load_data(data, year)
+            goals.load_data(data, year)
+
+    elapsed = time.perf_counter()
+    timings = export_reports(money_management, goals, start, end, args.output, args.workers, not args.no_charts)
+    elapsed = time.perf_counter() - elapsed
+
+    for name, seconds in timings:
+        print(f"{name}: {seconds * 1000:.1f} ms")
+    busy = sum(seconds for _, seconds in timings)
+    print(f"Wrote {len(timings)} files to '{args.output}' in {elapsed:.2f}s "
+          f"({busy:.2f}s of work, {busy / len(timings) * 1000 if timings else 0:.1f} ms per file)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""
+Load test for the HTTP/JSON API server (api_server.py).
+
+Starts a server on in-memory data (or targets a running one with --port) and runs a number of
+concurrent keep-alive clients against it for a fixed time, then prints the requests per second and
+the latency percentiles. Run from the repository root with:
+
+    python -m benchmarks.api_load --clients 50 --duration 5
+    python -m benchmarks.api_load --port 8326 --batch 100
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+
+from api_server import ApiServer
+from models import MoneyManagement, Goals
+
+
+async def request(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, method: str, path: str, body: dict = None) -> tuple:
+    """
+    Sends one request on a keep-alive connection and reads the response.
+
+    Returns:
+        tuple: (HTTP status, decoded JSON body)
+    """
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def make_request(rng: random.Random, batch: int) -> tuple:
+    """
+    Returns a random (method, path, body): mostly reads, with some updates.
+    """
+    year = rng.randint(2015, 2024)
+    month = rng.randint(1, 12)
+    choice = rng.random()
+    if choice < 0.4:
+        return "GET", f"/totals/monthly?type={rng.choice('ie')}&year={year}", None
+    if choice < 0.6:
+        return "GET", f"/totals/yearly?type={rng.choice('ie')}&year={year}", None
+    if choice < 0.7:
+        return "GET", f"/report?month={month}&year={year}", None
+    if batch > 1:
+        return "POST", "/batch", {"updates": [{"op": "values", "type": rng.choice("ie"), "value": rng.uniform(0, 5000),
+                                               "month": rng.randint(1, 12), "year": year} for _ in range(batch)]}
+    return "POST", "/values", {"type": rng.choice("ie"), "value": rng.uniform(0, 5000), "month": month, "year": year}
+
+
+async def client(host: str, port: int, deadline: float, batch: int, seed: int, latencies: list) -> int:
+    """
+    Sends requests on one connection until the deadline and records their latencies.
+
+    Returns:
+        int: The number of failed requests.
+    """
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    failures = 0
+    try:
+        while time.perf_counter() < deadline:
+            method, path, body = make_request(rng, batch)
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, method, path, body)
+            latencies.append(time.perf_counter() - start)
+            failures += status != 200
+    finally:
+        writer.close()
+    return failures
+
+
+async def run(args) -> dict:
+    """
+    Runs the load test and returns its results.
+    """
+    server = None
+    port = args.port
+    if port is None:
+        money_management, goals = MoneyManagement(), Goals()
+        for year in range(2015, 2025):
+            money_management.load_data({"income": {month: 4000.0 for month in range(1, 13)},
+                                        "expenses": {month: 3000.0 for month in range(1, 13)}}, year)
+        server = ApiServer(money_management, goals)
+        port = (await server.start(args.host, 0)).sockets[0].getsockname()[1]
+
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    failures = await asyncio.gather(*(client(args.host, port, deadline, args.batch, seed, latencies)
+                                      for seed in range(args.clients)))
+    elapsed = time.perf_counter() - start
+    if server is not None:
+        await server.close()
+
+    latencies.sort()
+    percentile = lambda fraction: latencies[min(int(len(latencies) * fraction), len(latencies) - 1)] * 1000 if latencies else 0.0
+    return {"requests": len(latencies), "failures": sum(failures), "seconds": elapsed,
+            "requests_per_second": len(latencies) / elapsed, "p50_ms": percentile(0.5), "p99_ms": percentile(0.99)}
+
+
+def main(argv=None):
+    """
+    Command line entry point for the load test.
+
+    Returns:
+        int: 0 if every request succeeded, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Measure the requests per second of the API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of a running server (default: start one in-process)")
+    parser.add_argument("--clients", type=int, default=20, help="number of concurrent connections")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds to run")
+    parser.add_argument("--batch", type=int, default=1, help="updates per request (uses /batch when above 1)")
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args))
+    print(f"{results['requests']} requests in {results['seconds']:.2f}s from {args.clients} clients: "
+          f"{results['requests_per_second']:.0f} requests/sec, "
+          f"p50 {results['p50_ms']:.2f} ms, p99 {results['p99_ms']:.2f} ms, {results['failures']} failures")
+    return 0 if not results["failures"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
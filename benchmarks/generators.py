@@ -0,0 +1,64 @@
+"""
+Synthetic, reproducible data for the benchmarks.
+
+Every generator takes a seed, so the same parameters always give the same data.
+"""
+import random
+from datetime import date
+
+
+FIRST_YEAR = 2000
+CATEGORIES = ["Salary", "Rent", "Groceries", "Dining", "Transport", "Utilities", "Insurance", "Travel",
+              "Health", "Entertainment", "Gifts", "Savings"]
+
+
+def transactions(count: int, years: int = 10, seed: int = 0):
+    """
+    Yields `count` (date, amount, category) rows spread over `years` years, like bulk_import's readers.
+
+    Roughly a quarter of the rows are income (positive amounts), the rest expenses (negative).
+
+    Args:
+        count (int): The number of rows.
+        years (int, optional): The number of years the rows are spread over, starting at FIRST_YEAR.
+        seed (int, optional): The random seed.
+
+    Yields:
+        tuple: (date, amount, category)
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        on_date = date(FIRST_YEAR + rng.randrange(years), rng.randint(1, 12), rng.randint(1, 28))
+        amount = round(rng.uniform(5.0, 500.0), 2)
+        yield on_date, amount if rng.random() < 0.25 else -amount, rng.choice(CATEGORIES)
+
+
+def yearly_data(years: int, seed: int = 0) -> dict:
+    """
+    Returns a full year of month totals and goals for each of `years` years, as stored by DataPersistence.
+
+    Args:
+        years (int): The number of years, starting at FIRST_YEAR.
+        seed (int, optional): The random seed.
+
+    Returns:
+        dict: {year: data} with 'income', 'expenses', 'income_goal' and 'expense_goal' for all twelve
+            months and both yearly goals.
+    """
+    rng = random.Random(seed)
+    data = {}
+    for year in range(FIRST_YEAR, FIRST_YEAR + years):
+        data[year] = {kind: {month: round(rng.uniform(1000.0, 6000.0), 2) for month in range(1, 13)}
+                      for kind in ("income", "expenses", "income_goal", "expense_goal")}
+        data[year]["yearly_income_goal"] = round(rng.uniform(30000.0, 60000.0), 2)
+        data[year]["yearly_expense_goal"] = round(rng.uniform(20000.0, 50000.0), 2)
+    return data
+
+
+def load_models(money_management, goals, data: dict) -> None:
+    """
+    Loads the output of `yearly_data` into MoneyManagement and Goals objects.
+    """
+    for year, year_data in data.items():
+        money_management.load_data(year_data, year)
+        goals.load_data(year_data, year)
@@ -0,0 +1,85 @@
+"""
+Compares the memory used by MoneyManagement/Goals and CompactMoneyManagement/CompactGoals.
+
+The dataset has a transaction for every category, month and type over a number of years, plus a
+monthly income and expense goal for every month. Run from the repository root with:
+
+    python -m benchmarks.memory_models --years 10 --categories 50
+"""
+import argparse
+import gc
+import sys
+import tracemalloc
+from datetime import date
+
+from compact_models import CompactMoneyManagement, CompactGoals
+from models import MoneyManagement, Goals
+
+
+def build(money_management_class, goals_class, years: int, categories: int, first_year: int = 2015) -> tuple:
+    """
+    Fills new money management and goals objects with the synthetic dataset.
+
+    Args:
+        money_management_class: MoneyManagement or CompactMoneyManagement.
+        goals_class: Goals or CompactGoals.
+        years (int): Number of years of data.
+        categories (int): Number of categories per type.
+        first_year (int, optional): The first year of data.
+
+    Returns:
+        tuple: (money management object, goals object)
+    """
+    money_management = money_management_class()
+    goals = goals_class()
+    names = [f"Category {number}" for number in range(categories)]
+    for year in range(first_year, first_year + years):
+        for month in range(1, 13):
+            on_date = date(year, month, 1)
+            for number, category in enumerate(names):
+                money_management.add_transaction(100.0 + number, "i", on_date, category)
+                money_management.add_transaction(50.0 + number, "e", on_date, category)
+            goals.update_monthly_goal(5000.0, "i", month, year)
+            goals.update_monthly_goal(3000.0, "e", month, year)
+        goals.update_yearly_goal(60000.0, "i", year)
+    money_management.get_changes()
+    goals.get_changes()
+    return money_management, goals
+
+
+def measure(money_management_class, goals_class, years: int, categories: int) -> int:
+    """
+    Returns the number of bytes still allocated by the objects built by `build`.
+    """
+    gc.collect()
+    tracemalloc.start()
+    objects = build(money_management_class, goals_class, years, categories)
+    gc.collect()
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return used
+
+
+def main(argv=None):
+    """
+    Prints the memory used by both representations for the dataset given on the command line.
+
+    Returns:
+        int: 0
+    """
+    parser = argparse.ArgumentParser(description="Compare the memory use of the regular and compact models.")
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--categories", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    regular = measure(MoneyManagement, Goals, args.years, args.categories)
+    compact = measure(CompactMoneyManagement, CompactGoals, args.years, args.categories)
+    transactions = args.years * 12 * args.categories * 2
+    print(f"{args.years} years, {args.categories} categories, {transactions} transactions")
+    print(f"MoneyManagement + Goals:               {regular / 1024:10.1f} KiB")
+    print(f"CompactMoneyManagement + CompactGoals: {compact / 1024:10.1f} KiB ({regular / compact:.1f}x smaller)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,416 @@
+"""
+Benchmark suite for the model, persistence and report hot paths.
+
+Every benchmark is run for a range of sizes (number of transactions or years of data). For each it
+records the median and minimum wall time over a number of repeats and, in a separate traced run,
+the peak memory allocated while it runs. Results are saved as JSON so runs can be compared between
+commits. Run from the repository root with:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --transactions 1 1000 100000 1000000 --years 1 10 50
+    python -m benchmarks.run --compare baseline.json --output new.json --fail-on-regression 1.25
+    python -m benchmarks.run --only load_data read_data
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from array import array
+
+from archive import ColumnarArchive, write_archive
+from benchmarks.generators import FIRST_YEAR, transactions, yearly_data, load_models
+from models import MoneyManagement, Goals
+from money import Money, parse_amounts
+from persistence import DataPersistence, ShelveBackend, SQLiteBackend
+from reports import generate_report
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str, param: str):
+    """
+    Registers a benchmark.
+
+    The decorated function is called with one size and returns (setup, run, teardown): `setup()`
+    builds the input and returns a state, `run(state)` is the timed part and returns the number of
+    operations it performed, and `teardown(state)` (or None) cleans up.
+
+    Args:
+        name (str): The name of the benchmark.
+        param (str): 'transactions' or 'years', the size the benchmark is run for.
+    """
+    def register(function):
+        BENCHMARKS[name] = (param, function)
+        return function
+    return register
+
+
+def filled_models(count: int) -> tuple:
+    """
+    Returns MoneyManagement and Goals objects holding `count` synthetic transactions and a year of goals.
+    """
+    money_management, goals = MoneyManagement(), Goals()
+    for on_date, amount, category in transactions(count):
+        if amount >= 0:
+            money_management.add_transaction(amount, "i", on_date, category)
+        else:
+            money_management.add_transaction(-amount, "e", on_date, category)
+    load_models(MoneyManagement(), goals, yearly_data(1))
+    return money_management, goals
+
+
+@benchmark("add_transaction", "transactions")
+def bench_add_transaction(count: int):
+    def setup():
+        return MoneyManagement(), list(transactions(count))
+
+    def run(state):
+        money_management, rows = state
+        for on_date, amount, category in rows:
+            money_management.add_transaction(abs(amount), "i" if amount >= 0 else "e", on_date, category)
+        return len(rows)
+    return setup, run, None
+
+
+@benchmark("add_transaction[monitored]", "transactions")
+def bench_add_transaction_monitored(count: int):
+    from goal_monitor import GoalMonitor
+
+    def setup():
+        money_management, goals = MoneyManagement(), Goals()
+        load_models(MoneyManagement(), goals, yearly_data(10))
+        GoalMonitor(money_management, goals)
+        return money_management, list(transactions(count))
+
+    def run(state):
+        money_management, rows = state
+        for on_date, amount, category in rows:
+            money_management.add_transaction(abs(amount), "i" if amount >= 0 else "e", on_date, category)
+        return len(rows)
+    return setup, run, None
+
+
+@benchmark("add_transaction[journaled]", "transactions")
+def bench_add_transaction_journaled(count: int):
+    def setup():
+        directory = tempfile.TemporaryDirectory()
+        with contextlib.redirect_stdout(io.StringIO()):
+            persistence = DataPersistence(filename=os.path.join(directory.name, "data"))
+        money_management = MoneyManagement()
+        persistence.attach(money_management, Goals())
+        return directory, persistence, money_management, list(transactions(count))
+
+    def run(state):
+        money_management, rows = state[2], state[3]
+        for on_date, amount, category in rows:
+            money_management.add_transaction(abs(amount), "i" if amount >= 0 else "e", on_date, category)
+        state[1].journal.commit()
+        return len(rows)
+
+    def teardown(state):
+        with contextlib.redirect_stdout(io.StringIO()):
+            _close(state)
+    return setup, run, teardown
+
+
+def _amount_texts(count: int, formatted: bool) -> list:
+    """
+    Returns the amounts of `count` synthetic transactions as text, like '-79.43' or formatted like '-$1,079.43'.
+    """
+    return [Money(amount).format() if formatted else f"{amount:.2f}" for _, amount, _ in transactions(count)]
+
+
+@benchmark("parse_amounts[float]", "transactions")
+def bench_parse_amounts_float(count: int):
+    # The baseline: bare float() on plain amounts, without any validation or rounding
+    def setup():
+        return _amount_texts(count, False)
+
+    def run(texts):
+        array('d', map(float, texts))
+        return len(texts)
+    return setup, run, None
+
+
+@benchmark("parse_amounts", "transactions")
+def bench_parse_amounts(count: int):
+    def setup():
+        return _amount_texts(count, False)
+
+    def run(texts):
+        parse_amounts(texts)
+        return len(texts)
+    return setup, run, None
+
+
+@benchmark("parse_amounts[formatted]", "transactions")
+def bench_parse_amounts_formatted(count: int):
+    def setup():
+        return _amount_texts(count, True)
+
+    def run(texts):
+        parse_amounts(texts)
+        return len(texts)
+    return setup, run, None
+
+
+@benchmark("get_yearly_income", "transactions")
+def bench_get_yearly_income(count: int):
+    def setup():
+        return filled_models(count)[0]
+
+    def run(money_management):
+        for _ in range(1000):
+            for year in range(FIRST_YEAR, FIRST_YEAR + 10):
+                money_management.get_yearly_income(year)
+        return 10000
+    return setup, run, None
+
+
+@benchmark("chart_data", "transactions")
+def bench_chart_data(count: int):
+    from financial_management_tool import GUI_management  # needs NumPy when run
+
+    def setup():
+        money_management, goals = filled_models(count)
+        return money_management.ledger.copy(), goals.copy()
+
+    def run(state):
+        GUI_management.chart_data(state[0], state[1], FIRST_YEAR)
+        return 1
+    return setup, run, None
+
+
+@benchmark("load_data", "years")
+def bench_load_data(years: int):
+    def setup():
+        return MoneyManagement(), Goals(), yearly_data(years)
+
+    def run(state):
+        load_models(*state)
+        return years
+    return setup, run, None
+
+
+def _persistence(kind: str):
+    directory = tempfile.TemporaryDirectory()
+    if kind == "sqlite":
+        backend = SQLiteBackend(os.path.join(directory.name, "data.sqlite3"))
+    else:
+        backend = ShelveBackend(os.path.join(directory.name, "data"))
+    return directory, DataPersistence(backend)
+
+
+def _close(state):
+    state[1].close()
+    state[0].cleanup()
+
+
+def _bench_update_database(kind: str):
+    def bench(years: int):
+        def setup():
+            return _persistence(kind) + (yearly_data(years),)
+
+        def run(state):
+            for year, data in state[2].items():
+                state[1].update_database(year=year, **data)
+            state[1].flush()
+            return years
+        return setup, run, _close
+    return bench
+
+
+def _bench_read_data(kind: str):
+    def bench(years: int):
+        def setup():
+            state = _persistence(kind)
+            for year, data in yearly_data(years).items():
+                state[1].update_database(year=year, **data)
+            state[1].flush()
+            return state
+
+        def run(state):
+            for year in range(FIRST_YEAR, FIRST_YEAR + years):
+                state[1].read_data(year)
+            return years
+        return setup, run, _close
+    return bench
+
+
+for _kind in ("shelve", "sqlite"):
+    benchmark(f"update_database[{_kind}]", "years")(_bench_update_database(_kind))
+    benchmark(f"read_data[{_kind}]", "years")(_bench_read_data(_kind))
+
+
+@benchmark("read_data[archive]", "years")
+def bench_read_data_archive(years: int):
+    def setup():
+        directory = tempfile.TemporaryDirectory()
+        path = os.path.join(directory.name, "history.fmarch")
+        write_archive(path, yearly_data(years))
+        return directory, DataPersistence(ColumnarArchive(path))
+
+    def run(state):
+        for year in range(FIRST_YEAR, FIRST_YEAR + years):
+            state[1].read_data(year)
+        return years
+    return setup, run, _close
+
+
+@benchmark("generate_report", "years")
+def bench_generate_report(years: int):
+    def setup():
+        money_management, goals = MoneyManagement(), Goals()
+        load_models(money_management, goals, yearly_data(years))
+        return money_management, goals
+
+    def run(state):
+        for year in range(FIRST_YEAR, FIRST_YEAR + years):
+            for month in range(1, 13):
+                generate_report(state[0], state[1], month, year)
+        return years * 12
+    return setup, run, None
+
+
+def measure(factory, size: int, repeat: int) -> dict:
+    """
+    Runs one benchmark at one size.
+
+    Args:
+        factory: The registered benchmark function.
+        size (int): The number of transactions or years.
+        repeat (int): The number of timed runs; each gets a fresh setup.
+
+    Returns:
+        dict: 'median_s' and 'min_s' per run, 'ops' per run, 'per_op_us' (median) and 'peak_bytes'.
+    """
+    setup, run, teardown = factory(size)
+    times = []
+    for _ in range(repeat):
+        state = setup()
+        try:
+            start = time.perf_counter()
+            ops = run(state)
+            times.append(time.perf_counter() - start)
+        finally:
+            if teardown is not None:
+                teardown(state)
+
+    # Peak memory is measured in its own run, as tracing slows everything down
+    state = setup()
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        run(state)
+        peak = tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+        if teardown is not None:
+            teardown(state)
+
+    median = statistics.median(times)
+    return {"median_s": median, "min_s": min(times), "ops": ops,
+            "per_op_us": median / ops * 1e6 if ops else 0.0, "peak_bytes": peak}
+
+
+def git_commit() -> str:
+    """
+    Returns the current git commit, or None outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list, baseline: list, threshold: float) -> list:
+    """
+    Compares results with an earlier run and prints the change of every benchmark found in both.
+
+    Args:
+        results (list): The results of this run.
+        baseline (list): The results of the earlier run.
+        threshold (float): Ratio of median times above which a benchmark counts as a regression.
+
+    Returns:
+        list: The (name, size) pairs that regressed.
+    """
+    earlier = {(result["name"], result["size"]): result for result in baseline}
+    regressions = []
+    for result in results:
+        old = earlier.get((result["name"], result["size"]))
+        if old is None or not old["median_s"]:
+            continue
+        ratio = result["median_s"] / old["median_s"]
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{result['name']:28} {result['size']:>9}  {ratio:6.2f}x time, "
+              f"{(result['peak_bytes'] - old['peak_bytes']) / 1024:+10.1f} KiB peak{flag}")
+        if flag:
+            regressions.append((result["name"], result["size"]))
+    return regressions
+
+
+def main(argv=None):
+    """
+    Command line entry point for running the benchmark suite.
+
+    Returns:
+        int: 0, or 1 if --fail-on-regression is given and a benchmark got slower than allowed.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the model, persistence and report hot paths.")
+    parser.add_argument("--transactions", type=int, nargs="+", default=[1, 1000, 100000],
+                        help="transaction counts for the transaction benchmarks")
+    parser.add_argument("--years", type=int, nargs="+", default=[1, 10, 50],
+                        help="years of data for the year benchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per benchmark and size")
+    parser.add_argument("--only", nargs="+", help="only run benchmarks whose name starts with one of these")
+    parser.add_argument("--output", help="save the results to this JSON file")
+    parser.add_argument("--compare", help="compare with the results in this JSON file")
+    parser.add_argument("--fail-on-regression", type=float, metavar="RATIO",
+                        help="exit with 1 if a median time grew by more than RATIO (e.g. 1.25)")
+    args = parser.parse_args(argv)
+
+    results = []
+    for name, (param, factory) in BENCHMARKS.items():
+        if args.only and not name.startswith(tuple(args.only)):
+            continue
+        for size in (args.transactions if param == "transactions" else args.years):
+            try:
+                # DataPersistence prints a line per update; keep it out of the report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = measure(factory, size, args.repeat)
+            except ImportError as e:
+                print(f"{name:28} skipped: {e}")
+                break
+            result.update(name=name, param=param, size=size)
+            results.append(result)
+            print(f"{name:28} {size:>9} {param:12}  median {result['median_s'] * 1000:10.3f} ms  "
+                  f"min {result['min_s'] * 1000:10.3f} ms  {result['per_op_us']:10.3f} us/op  "
+                  f"peak {result['peak_bytes'] / 1024:10.1f} KiB")
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump({"commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+                       "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, output, indent=2)
+        print(f"Saved {len(results)} results to '{args.output}'")
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            regressions = compare(results, json.load(baseline)["results"], args.fail_on_regression or float("inf"))
+        if args.fail_on_regression and regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Stress test for several processes writing the same shelve file in shared mode.
+
+Every writer process owns one month of the year. It repeatedly writes its month's income with
+`update_database` (passing the whole year's income, so the version check and the month merge are
+needed to keep the other writers' months) and its month's expenses with `save_changes`. At the end
+every month must hold the last value its writer wrote; anything else is a lost write. With
+--journal every writer also keeps its own crash-recovery journal, whose records are replayed when
+it saves and closes. Run from the repository root with:
+
+    python -m benchmarks.stress_persistence --processes 8 --writes 200 --journal
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from models import MoneyManagement, Goals
+from persistence import DataPersistence
+
+YEAR = 2024
+
+
+def _writer(filename: str, worker: int, writes: int, journal: bool = False) -> int:
+    """
+    Runs one writer process, with a journal of its own if `journal` is set.
+
+    Returns:
+        int: The number of conflicts the writer's DataPersistence reported.
+    """
+    month = worker + 1
+    money_management = MoneyManagement()
+    with contextlib.redirect_stdout(io.StringIO()):
+        with DataPersistence(filename=filename, journal=f"{filename}.{worker}.journal" if journal else False,
+                             shared=True) as persistence:
+            income = persistence.read_data(YEAR).get("income", {})
+            persistence.attach(money_management, Goals())
+            for step in range(1, writes + 1):
+                income[month] = float(step)
+                persistence.update_database(income=income, year=YEAR)
+                money_management.update_values("e", float(step), month, YEAR)
+                persistence.save_changes(money_management.get_changes())
+    return len(persistence.conflicts)
+
+
+def run_stress(filename: str, processes: int = 4, writes: int = 50, journal: bool = False) -> dict:
+    """
+    Runs the writer processes against a shelve file and checks that no write was lost.
+
+    Args:
+        filename (str): The shelve file, created if it doesn't exist.
+        processes (int, optional): Number of writer processes.
+        writes (int, optional): Number of income and expense writes per process.
+        journal (bool, optional): Give every writer a crash-recovery journal.
+
+    Returns:
+        dict: {'seconds', 'writes' (in total), 'lost' (months without their last value),
+            'conflicts' (reported by the writers)}.
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        conflicts = sum(pool.map(_writer, [filename] * processes, range(processes), [writes] * processes,
+                                 [journal] * processes))
+    seconds = time.perf_counter() - start
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        with DataPersistence(filename=filename, journal=False, shared=True) as persistence:
+            data = persistence.read_data(YEAR)
+    lost = sum(data.get(kind, {}).get(worker + 1) != float(writes)
+               for kind in ("income", "expenses") for worker in range(processes))
+    return {"seconds": seconds, "writes": 2 * processes * writes, "lost": lost, "conflicts": conflicts}
+
+
+def main(argv=None):
+    """
+    Command line entry point for the stress test.
+
+    Returns:
+        int: 0 if no write was lost, 1 otherwise.
+    """
+    parser = argparse.ArgumentParser(description="Run several processes writing the same data file.")
+    parser.add_argument("--processes", type=int, default=4, help="number of writer processes")
+    parser.add_argument("--writes", type=int, default=100, help="writes of each kind per process")
+    parser.add_argument("--journal", action="store_true", help="give every writer a crash-recovery journal")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = run_stress(os.path.join(directory, "data"), args.processes, args.writes, args.journal)
+    print(f"{results['writes']} writes from {args.processes} processes in {results['seconds']:.2f}s "
+          f"({results['writes'] / results['seconds']:.0f} writes/sec): {results['lost']} lost, "
+          f"{results['conflicts']} conflicts")
+    return 0 if not results["lost"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
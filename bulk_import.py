@@ -0,0 +1,196 @@
+import argparse
+import csv
+import re
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+
+from models import MoneyManagement
+from money import Money, parse_amount, parse_amounts
+from persistence import DataPersistence, SQLiteBackend, shared_requested
+
+
+_ofx_tag = re.compile(r"<(/?\w+)>([^<\r\n]*)")
+
+
+def read_csv_rows(path: str, date_column: str = "date", amount_column: str = "amount",
+                  category_column: str = "category", date_format: str = "%Y-%m-%d", locale: str = None,
+                  chunk_size: int = 10000):
+    """
+    Reads a CSV bank statement one row at a time.
+
+    The file needs a header row. Amounts are signed: positive amounts are income and negative
+    amounts are expenses. They may have currency symbols and thousands separators (see
+    `money.parse_amount`). The category column is optional. The file is read `chunk_size` rows at a
+    time, and the amounts of each chunk are parsed together with `money.parse_amounts`.
+
+    Args:
+        path (str): The CSV file to read.
+        date_column (str, optional): Name of the column holding the transaction date.
+        amount_column (str, optional): Name of the column holding the amount.
+        category_column (str, optional): Name of the column holding the category.
+        date_format (str, optional): `strptime` format of the dates.
+        locale (str, optional): Locale of the amounts, e.g. 'de_DE' for '1.234,56' (see `money.LOCALES`).
+        chunk_size (int, optional): Number of rows whose amounts are parsed at once.
+
+    Yields:
+        tuple: (date, amount, category) for every row, with the amount as Money.
+
+    Raises:
+        ValueError: If a row has a date or amount that can't be parsed.
+    """
+    with open(path, newline="") as statement:
+        for chunk in chunked(csv.DictReader(statement), chunk_size):
+            amounts = parse_amounts([row[amount_column] for row in chunk], locale)
+            for row, cents in zip(chunk, amounts):
+                on_date = datetime.strptime(row[date_column].strip(), date_format).date()
+                yield on_date, Money.from_cents(cents), (row.get(category_column) or "").strip()
+
+
+def read_ofx_rows(path: str):
+    """
+    Reads the transactions of an OFX bank statement one at a time.
+
+    Both the SGML (OFX 1.x) and the XML (OFX 2.x) variants are supported. Each <STMTTRN> block gives
+    one transaction; its <NAME> (or <MEMO>) is used as the category.
+
+    Args:
+        path (str): The OFX file to read.
+
+    Yields:
+        tuple: (date, amount, category) for every transaction, with the amount as Money.
+
+    Raises:
+        ValueError: If a transaction has a date or amount that can't be parsed.
+    """
+    transaction = None
+    with open(path, errors="replace") as statement:
+        for line in statement:
+            for tag, value in _ofx_tag.findall(line):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    transaction = {}
+                elif tag == "/STMTTRN" and transaction is not None:
+                    on_date = datetime.strptime(transaction["DTPOSTED"][:8], "%Y%m%d").date()
+                    amount = Money.from_cents(parse_amount(transaction["TRNAMT"]))
+                    yield on_date, amount, transaction.get("NAME") or transaction.get("MEMO", "")
+                    transaction = None
+                elif transaction is not None and not tag.startswith("/"):
+                    transaction[tag] = value.strip()
+
+
+def chunked(rows, size: int):
+    """
+    Groups an iterable into lists of at most `size` items without reading ahead.
+
+    Args:
+        rows: Any iterable.
+        size (int): The maximum number of items per chunk.
+
+    Yields:
+        list: The next chunk of items.
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_rows(rows, money_management: MoneyManagement, persistence: DataPersistence,
+                chunk_size: int = 10000, keep_transactions: bool = False, loaded_years: set = None) -> int:
+    """
+    Adds (date, amount, category) rows to MoneyManagement and saves the month totals chunk by chunk.
+
+    The stored totals of a year are loaded the first time a row of that year is seen, so imported
+    amounts are added to them. After every chunk the changed months are saved. Unless
+    `keep_transactions` is set, the ledger is then compacted so memory use stays constant however
+    many rows are imported.
+
+    Args:
+        rows: Iterable of (date, amount, category) tuples, e.g. from read_csv_rows. Amounts can be
+            Money values or numbers; they are added to the ledger in whole cents.
+        money_management (MoneyManagement): The object to add the transactions to.
+        persistence (DataPersistence): Where to save the month totals.
+        chunk_size (int, optional): Number of rows to process between saves.
+        keep_transactions (bool, optional): Keep every line item in the ledger.
+        loaded_years (set, optional): Years already loaded into `money_management`. It is updated
+            with the years loaded by this call, so it can be shared between calls.
+
+    Returns:
+        int: The number of imported rows.
+    """
+    if loaded_years is None:
+        loaded_years = set()
+    count = 0
+    for chunk in chunked(rows, chunk_size):
+        for year in {on_date.year for on_date, _, _ in chunk} - loaded_years:
+            data = persistence.read_data(year)
+            money_management.load_data(data, year)
+            loaded_years.add(year)
+        for on_date, amount, category in chunk:
+            amount = Money(amount)
+            if amount.cents >= 0:
+                money_management.add_transaction(amount, "i", on_date, category)
+            else:
+                money_management.add_transaction(-amount, "e", on_date, category)
+        persistence.save_changes(money_management.get_changes())
+        if not keep_transactions:
+            money_management.ledger.compact()
+        count += len(chunk)
+    return count
+
+
+def main(argv=None):
+    """
+    Command line entry point for importing CSV or OFX bank statements without the GUI.
+
+    Every statement is streamed into MoneyManagement and saved in chunks to the same store the GUI
+    uses (or to an SQLite database with --sqlite). The number of rows per second is printed at the end.
+
+    Returns:
+        int: 0 on success, 1 if a statement couldn't be read.
+    """
+    parser = argparse.ArgumentParser(description="Import CSV or OFX bank statements.")
+    parser.add_argument("files", nargs="+", help="statement files (.csv, .ofx or .qfx)")
+    parser.add_argument("--format", choices=("csv", "ofx"), help="file format (default: from the extension)")
+    parser.add_argument("--sqlite", help="store the data in this SQLite database instead of the shelve file")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="rows processed between saves")
+    parser.add_argument("--date-column", default="date")
+    parser.add_argument("--amount-column", default="amount")
+    parser.add_argument("--category-column", default="category")
+    parser.add_argument("--date-format", default="%Y-%m-%d")
+    parser.add_argument("--locale", help="locale of the CSV amounts, e.g. de_DE (default: inferred)")
+    parser.add_argument("--shared", action="store_true",
+                        help="lock the shelve file on every access, so other programs can use it at the same time")
+    args = parser.parse_args(argv)
+
+    money_management = MoneyManagement()
+    backend = SQLiteBackend(args.sqlite) if args.sqlite else None
+    loaded_years = set()
+    with DataPersistence(backend, shared=shared_requested(args.shared)) as persistence:
+        total = 0
+        start = time.perf_counter()
+        for path in args.files:
+            file_format = args.format or ("ofx" if path.lower().endswith((".ofx", ".qfx")) else "csv")
+            if file_format == "ofx":
+                rows = read_ofx_rows(path)
+            else:
+                rows = read_csv_rows(path, args.date_column, args.amount_column,
+                                     args.category_column, args.date_format, args.locale, args.chunk_size)
+            try:
+                count = import_rows(rows, money_management, persistence, args.chunk_size, loaded_years=loaded_years)
+            except (OSError, KeyError, ValueError) as e:
+                print(f"Error importing '{path}': {e}")
+                return 1
+            print(f"Imported {count} rows from '{path}'")
+            total += count
+        elapsed = time.perf_counter() - start
+
+    print(f"Imported {total} rows in {elapsed:.2f}s ({total / elapsed if elapsed else 0:.0f} rows/sec)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
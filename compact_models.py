@@ -0,0 +1,806 @@
+from array import array
+import heapq
+from datetime import datetime, date
+from operator import itemgetter
+from types import MappingProxyType
+
+from models import month_number
+from money import to_amount, to_cents
+
+
+_UNSET = float("nan")  # marks months and goals that were never set
+_TYPE_CODES = {"i": 0, "e": 1}
+
+
+def _month(month) -> int:
+    """
+    Returns the calendar month (1-12) of a month key, raising ValueError if it isn't one.
+    """
+    number = month_number(month)
+    if not number:
+        raise ValueError(f"Unknown month '{month}'")
+    return number
+
+
+def _is_set(value: float) -> bool:
+    return value == value  # NaN is the only value that isn't equal to itself
+
+
+
+class CompactMoneyManagement:
+    """
+    Memory-compact drop-in for MoneyManagement, for holding many years and categories at once.
+
+    Instead of a line item per transaction and dictionaries of floats per month, every year is one
+    `array('d')` laid out as [slot][type][month]: slot 0 holds the month totals and every further slot
+    the totals of one category. A new category only appends 24 doubles to each year, so nothing is
+    ever rearranged. Months that were never set are stored as NaN and left out of the returned
+    dictionaries. Amounts are added up in cents (see money.py), so every stored total is the float
+    closest to a whole number of cents and no rounding error builds up.
+
+    Tags get slots of their own in the same way, so `get_tag_totals` works as it does for
+    MoneyManagement.
+
+    The public API is the same as MoneyManagement's, with these differences:
+
+    * Month keys are normalized to month numbers (1-12).
+    * Individual line items aren't kept, so there is no `ledger`, and `find_transactions` raises
+      NotImplementedError.
+    * There is no archive; `is_archived` is always False.
+    * `aggregate` builds a new cube on every call instead of reusing the last one.
+    """
+
+    __slots__ = ("_blocks", "_slots", "_categories", "_category_index", "_tag_index", "_changed", "version", "_subscribers")
+
+    def __init__(self):
+        """
+        Initializes the class with no years and only the uncategorized ("") category.
+        """
+        self._blocks = {}  # year: array('d') of self._slots * 24 values
+        self._slots = 1  # the month totals, then one slot per category or tag
+        self._categories = []
+        self._category_index = {}  # category: slot
+        self._tag_index = {}  # tag: slot
+        self._category_slot("")
+        self._changed = set()  # (type, year, month) totals that haven't been saved yet
+        self.version = 0
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """
+        Registers a function to be called as `callback(type, year, month)` after every change of a
+        month total, like `MoneyManagement.subscribe`.
+
+        Returns:
+            The callback, so it can be passed to `unsubscribe` later.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback) -> None:
+        """
+        Stops calling a function registered with `subscribe`.
+        """
+        self._subscribers.remove(callback)
+
+    def _notify(self, type: str, year: int, month: int) -> None:
+        for callback in self._subscribers:
+            callback(type, year, month)
+
+    def _block(self, year: int) -> array:
+        """
+        Returns the array of a year, creating it if needed.
+        """
+        block = self._blocks.get(year)
+        if block is None:
+            block = self._blocks[year] = array('d', [_UNSET]) * 24 + array('d', bytes(8 * 24 * (self._slots - 1)))
+        return block
+
+    def _new_slot(self) -> int:
+        """
+        Adds a slot, appending 24 zeros to every year, and returns its number.
+        """
+        slot = self._slots
+        self._slots += 1
+        zeros = array('d', bytes(8 * 24))
+        for block in self._blocks.values():
+            block.extend(zeros)
+        return slot
+
+    def _category_slot(self, category: str) -> int:
+        """
+        Returns the slot of a category, adding one for a new category.
+        """
+        slot = self._category_index.get(category)
+        if slot is None:
+            slot = self._category_index[category] = self._new_slot()
+            self._categories.append(category)
+        return slot
+
+    def _tag_slot(self, tag: str) -> int:
+        """
+        Returns the slot of a tag, adding one for a new tag.
+        """
+        slot = self._tag_index.get(tag)
+        if slot is None:
+            slot = self._tag_index[tag] = self._new_slot()
+        return slot
+
+    def _add(self, type: str, amount, month: int, year: int, category: str = "", tags=()) -> None:
+        """
+        Adds an amount to a month's total, to its category and to each of its tags.
+
+        The sums are done in cents, so the stored totals stay exact multiples of a cent.
+        """
+        cents = to_cents(amount)
+        slots = [self._category_slot(category)] + [self._tag_slot(tag) for tag in sorted(set(tags))]
+        block = self._block(year)
+        offset = _TYPE_CODES[type] * 12 + month - 1
+        total = block[offset]
+        block[offset] = ((round(total * 100) if _is_set(total) else 0) + cents) / 100
+        for slot in slots:
+            block[slot * 24 + offset] = (round(block[slot * 24 + offset] * 100) + cents) / 100
+
+    def _set(self, type: str, value, month: int, year: int) -> None:
+        """
+        Sets a month's total, booking the difference as uncategorized.
+        """
+        cents = to_cents(value)
+        block = self._block(year)
+        offset = _TYPE_CODES[type] * 12 + month - 1
+        total = block[offset]
+        block[24 + offset] = (round(block[24 + offset] * 100) + cents - (round(total * 100) if _is_set(total) else 0)) / 100
+        block[offset] = cents / 100
+
+    @property
+    def income(self):
+        """
+        Read-only {month: total} view of the current year's income.
+        """
+        return self.get_year("i")
+
+    @income.setter
+    def income(self, values: dict) -> None:
+        self._replace_values("i", values)
+
+    @property
+    def expenses(self):
+        """
+        Read-only {month: total} view of the current year's expenses.
+        """
+        return self.get_year("e")
+
+    @expenses.setter
+    def expenses(self, values: dict) -> None:
+        self._replace_values("e", values)
+
+    def _replace_values(self, type: str, values: dict) -> None:
+        """
+        Sets every month of the current year to the values in `values`, and months missing from it to 0.
+        """
+        months = {_month(month) for month in values}
+        for month in self.get_year(type):
+            if month not in months:
+                self.update_values(type=type, value=0.0, month=month)
+        for month, value in values.items():
+            self.update_values(type=type, value=value, month=month)
+
+    def load_data(self, data: dict, year: int = None) -> None:
+        """
+        Loads income and expense data of one year from a dictionary.
+
+        Args:
+            data (dict): Dictionary with "income" and "expenses" {month: value} sub-dictionaries; missing ones are skipped.
+            year (int, optional): The year the data belongs to. Defaults to the current year.
+        """
+        year = year or datetime.now().year
+        for type, kind in (("i", "income"), ("e", "expenses")):
+            for month, value in (data.get(kind) or {}).items():
+                self._set(type, value, _month(month), year)
+        self.version += 1
+        if self._subscribers:
+            for type, kind in (("i", "income"), ("e", "expenses")):
+                for month in data.get(kind) or {}:
+                    self._notify(type, year, _month(month))
+
+    def get_changes(self) -> dict:
+        """
+        Returns the month totals that changed since the last call, and marks them as saved.
+
+        Returns:
+            dict: {year: {'income': {month: value}, 'expenses': {month: value}}} with only the
+                changed months, ready for `DataPersistence.save_changes`.
+        """
+        changes = {}
+        for type, year, month in self._changed:
+            kind = "income" if type == "i" else "expenses"
+            changes.setdefault(year, {}).setdefault(kind, {})[month] = self._blocks[year][_TYPE_CODES[type] * 12 + month - 1]
+        self._changed = set()
+        return changes
+
+    def has_changes(self) -> bool:
+        """
+        Returns True if there are month totals that haven't been saved yet.
+        """
+        return bool(self._changed)
+
+    def get_data(self, year: int = None):
+        """
+        Returns a tuple containing the income and expense dictionaries of a year.
+
+        Args:
+            year (int, optional): The year to return. Defaults to the current year.
+
+        Returns:
+            tuple: A tuple containing two dictionaries, the first for income and the second for expenses.
+        """
+        return dict(self.get_year("i", year)), dict(self.get_year("e", year))
+
+    def get_year(self, type: str, year: int = None):
+        """
+        Returns a read-only {month: total} view of one year's income or expenses.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int, optional): The year to return. Defaults to the current year.
+        """
+        block = self._blocks.get(year or datetime.now().year)
+        if block is None:
+            return MappingProxyType({})
+        offset = _TYPE_CODES[type] * 12
+        return MappingProxyType({month: value for month, value in enumerate(block[offset:offset + 12], 1) if _is_set(value)})
+
+    def get_range(self, type: str, start_year: int, end_year: int) -> dict:
+        """
+        Returns the month totals of every year from `start_year` to `end_year` (inclusive).
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            start_year (int): The first year of the range.
+            end_year (int): The last year of the range.
+
+        Returns:
+            dict: {year: {month: total}} for the years in the range that have data.
+        """
+        return {year: dict(self.get_year(type, year))
+                for year in range(start_year, end_year + 1) if self.get_year(type, year)}
+
+    def years(self) -> list:
+        """
+        Returns the sorted list of years that have data.
+        """
+        return sorted(self._blocks)
+
+    def get_category_totals(self, type: str, year: int = None, month=None) -> dict:
+        """
+        Returns the total of every category in a year or month.
+
+        Amounts set with `update_values` or `load_data` count as uncategorized ("").
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int, optional): The year to total. Defaults to the current year.
+            month (optional): Only total this month (a number or month name).
+
+        Returns:
+            dict: {category: total} for the categories with a non-zero total.
+        """
+        return self._slot_totals(self._category_index, type, year, month)
+
+    def get_tag_totals(self, type: str, year: int = None, month=None) -> dict:
+        """
+        Returns the total of every tag in a year or month, like `get_category_totals`.
+
+        A transaction with several tags counts towards each of them.
+        """
+        return self._slot_totals(self._tag_index, type, year, month)
+
+    def _slot_totals(self, index: dict, type: str, year: int, month) -> dict:
+        block = self._blocks.get(year or datetime.now().year)
+        if block is None:
+            return {}
+        first, last = (_month(month) - 1, _month(month)) if month else (0, 12)
+        totals = {}
+        for name, slot in index.items():
+            offset = slot * 24 + _TYPE_CODES[type] * 12
+            # Summed in whole cents, like _yearly_total
+            total = sum(round(value * 100) for value in block[offset + first:offset + last]) / 100
+            if total:
+                totals[name] = total
+        return totals
+
+    def top_categories(self, type: str, n: int = 10, year: int = None, month=None) -> list:
+        """
+        Returns the categories with the largest totals in a year or month, largest first, like
+        `MoneyManagement.top_categories`.
+        """
+        totals = self.get_category_totals(type, year, month)
+        return heapq.nlargest(n, ((category, total) for category, total in totals.items() if category and total > 0),
+                              key=itemgetter(1))
+
+    def get_category_history(self, type: str, category: str, months: int = 6, year: int = None, month=None) -> list:
+        """
+        Returns a category's total for each of the last `months` months, oldest first, as
+        (year, month, total) tuples like `MoneyManagement.get_category_history`.
+        """
+        return self._history(self._category_index.get(category), type, months, year, month)
+
+    def get_tag_history(self, type: str, tag: str, months: int = 6, year: int = None, month=None) -> list:
+        """
+        Returns a tag's total for each of the last `months` months, like `get_category_history`.
+        """
+        return self._history(self._tag_index.get(tag), type, months, year, month)
+
+    def _history(self, slot, type: str, months: int, year: int, month) -> list:
+        now = datetime.now()
+        last = (year or now.year) * 12 + (_month(month) if month else now.month) - 1
+        history = []
+        for period in range(last - months + 1, last + 1):
+            year_, month_ = divmod(period, 12)
+            block = self._blocks.get(year_)
+            total = 0.0
+            if block is not None and slot is not None:
+                total = block[slot * 24 + _TYPE_CODES[type] * 12 + month_]
+            history.append((year_, month_ + 1, total))
+        return history
+
+    def find_transactions(self, category: str = None, tag: str = None, year: int = None, month=None) -> list:
+        """
+        Not supported: only totals are kept, not the line items.
+
+        Raises:
+            NotImplementedError: Always. Use MoneyManagement to look up individual transactions.
+        """
+        raise NotImplementedError("CompactMoneyManagement only keeps totals, not individual transactions; "
+                                  "use MoneyManagement to look them up")
+
+    def add_transaction(self, amount: float, type: str, on_date: date = None, category: str = "", tags=()) -> None:
+        """
+        Adds a single income or expense line item to its month's, its category's and its tags' totals.
+
+        Args:
+            amount (float): The amount of the transaction.
+            type (str): "i" for income, "e" for expenses.
+            on_date (date, optional): The date of the transaction. Defaults to today.
+            category (str, optional): The category of the transaction (e.g. 'Groceries').
+            tags (optional): Tags of the transaction (e.g. ('vacation',)).
+        """
+        if on_date is None:
+            on_date = datetime.now().date()
+        self._add(type, amount, on_date.month, on_date.year, category, tags)
+        self._changed.add((type, on_date.year, on_date.month))
+        self.version += 1
+        self._notify(type, on_date.year, on_date.month)
+
+    def update_values(self, type: str, value: float, month, year: int = None) -> None:
+        """
+        Sets the income or expense total of a month.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            value (float): The new total.
+            month: The month, as a number or a month name.
+            year (int, optional): The year of the month. Defaults to the current year.
+        """
+        year = year or datetime.now().year
+        month = _month(month)
+        self._set(type, value, month, year)
+        self._changed.add((type, year, month))
+        self.version += 1
+        self._notify(type, year, month)
+
+    def change_monthly_vals(self, value: str, type: str) -> None:
+        """
+        Sets the current month's income or expense total from user input.
+
+        Args:
+            value (str): The new total, e.g. '$1,200.50' (see `money.parse_amount`).
+            type (str): "i" for income, "e" for expenses.
+
+        Raises:
+            ValueError: If the value isn't a valid amount.
+        """
+        self.update_values(type, value, datetime.now().month)
+
+    def get_monthly_vals(self, value: str, month=None, year: int = None) -> float:
+        """
+        Returns the income or expense total of a month.
+
+        Args:
+            value (str): "i" for income, "e" for expenses.
+            month (optional): The month. Defaults to the current month.
+            year (int, optional): The year of the month. Defaults to the current year.
+
+        Returns:
+            float: The total.
+
+        Raises:
+            KeyError: If the month has no total.
+        """
+        return self.get_year("e" if value == "e" else "i", year)[_month(month or datetime.now().month)]
+
+    def _yearly_total(self, type: str, year: int = None) -> float:
+        block = self._blocks.get(year or datetime.now().year)
+        if block is None:
+            return 0.0
+        offset = _TYPE_CODES[type] * 12
+        # Summed in whole cents, so the total matches MoneyManagement's instead of collecting float error
+        return sum(to_cents(value) for value in block[offset:offset + 12] if _is_set(value)) / 100
+
+    def get_yearly_income(self, year: int = None) -> float:
+        """Get the total income for a year.
+
+        Args:
+            year (int, optional): The year to total. Defaults to the current year.
+
+        Returns:
+            float: The total income for the year.
+        """
+        return self._yearly_total("i", year)
+
+    def is_archived(self, year: int) -> bool:
+        """
+        Returns False: CompactMoneyManagement has no archive (see `MoneyManagement.is_archived`).
+        """
+        return False
+
+    def copy(self):
+        """
+        Returns an independent copy of the income and expenses, without any unsaved changes or
+        subscribers, that another thread can read while this object keeps changing.
+        """
+        money_management = CompactMoneyManagement()
+        money_management._blocks = {year: block[:] for year, block in self._blocks.items()}
+        money_management._slots = self._slots
+        money_management._categories = list(self._categories)
+        money_management._category_index = dict(self._category_index)
+        money_management._tag_index = dict(self._tag_index)
+        money_management.version = self.version
+        return money_management
+
+    def aggregate(self, goals=None):
+        """
+        Builds a NumPy aggregation cube of the totals (see `aggregation.py`), like `MoneyManagement.aggregate`.
+
+        Args:
+            goals (Goals, optional): Goals to include in the cube for goal variance rollups.
+
+        Returns:
+            AggregationCube: Dense (year x month x category) arrays of income, expenses and goals.
+        """
+        from aggregation import AggregationCube
+        years = set(self._blocks)
+        if goals is not None:
+            years.update(goals.years())
+        cube = AggregationCube(sorted(years), self._categories)
+        for row, year in enumerate(cube.years):
+            block = self._blocks.get(year)
+            if block is None:
+                continue
+            for column, category in enumerate(self._categories):
+                offset = self._category_index[category] * 24
+                cube.income[row, :, column] = block[offset:offset + 12]
+                cube.expenses[row, :, column] = block[offset + 12:offset + 24]
+        if goals is not None:
+            cube.add_goals(goals)
+        return cube
+
+    def get_yearly_expenses(self, year: int = None) -> float:
+        """Get the total expenses for a year.
+
+        Args:
+            year (int, optional): The year to total. Defaults to the current year.
+
+        Returns:
+            float: The total expenses for the year.
+        """
+        return self._yearly_total("e", year)
+
+
+
+class CompactGoals:
+    """
+    Memory-compact drop-in for Goals.
+
+    Every year is one `array('d')` of 26 values: the twelve monthly income goals, the twelve monthly
+    expense goals, then the yearly income and expense goals. Goals that were never set are stored as
+    NaN and left out of the returned dictionaries. As with CompactMoneyManagement, month keys are
+    normalized to month numbers (1-12). The current year's goals (`income_goal` etc.) are read-only
+    views; assign a whole dictionary or use `update_monthly_goal` to change them.
+    """
+
+    __slots__ = ("_blocks", "_changed", "version", "_subscribers")
+
+    _kinds = ("income_goal", "expense_goal")
+    _yearly_kinds = ("yearly_income_goal", "yearly_expense_goal")
+
+    def __init__(self):
+        """
+        Initializes the class with no goals.
+        """
+        self._blocks = {}  # year: array('d') of 26 goals
+        self._changed = set()  # (kind, year, month) goals that haven't been saved yet, month is None for yearly goals
+        self.version = 0
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """
+        Registers a function to be called as `callback(type, year, month)` after every change of a
+        goal, like `Goals.subscribe`; month is None when a yearly goal changed.
+
+        Returns:
+            The callback, so it can be passed to `unsubscribe` later.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback) -> None:
+        """
+        Stops calling a function registered with `subscribe`.
+        """
+        self._subscribers.remove(callback)
+
+    def _notify(self, type: str, year: int, month) -> None:
+        for callback in self._subscribers:
+            callback(type, year, month)
+
+    def _block(self, year: int) -> array:
+        block = self._blocks.get(year)
+        if block is None:
+            block = self._blocks[year] = array('d', [_UNSET]) * 26
+        return block
+
+    def _replace_goals(self, type: str, values: dict) -> None:
+        year = datetime.now().year
+        block = self._block(year)
+        code = _TYPE_CODES[type]
+        offset = code * 12
+        block[offset:offset + 12] = array('d', [_UNSET]) * 12
+        for month, goal in values.items():
+            block[offset + _month(month) - 1] = to_amount(goal)
+            self._changed.add((self._kinds[code], year, _month(month)))
+        self.version += 1
+        if self._subscribers:
+            for month in range(1, 13):
+                self._notify(type, datetime.now().year, month)
+
+    @property
+    def income_goal(self):
+        """
+        Read-only {month: goal} view of the current year's monthly income goals.
+        """
+        return self.get_monthly_goals("i")
+
+    @income_goal.setter
+    def income_goal(self, values: dict) -> None:
+        self._replace_goals("i", values)
+
+    @property
+    def expense_goal(self):
+        """
+        Read-only {month: goal} view of the current year's monthly expense goals.
+        """
+        return self.get_monthly_goals("e")
+
+    @expense_goal.setter
+    def expense_goal(self, values: dict) -> None:
+        self._replace_goals("e", values)
+
+    @property
+    def yearly_income_goal(self) -> float:
+        """
+        The current year's income goal, 0.0 if none was set.
+        """
+        return self.get_yearly_goal("i")
+
+    @yearly_income_goal.setter
+    def yearly_income_goal(self, goal: float) -> None:
+        self.update_yearly_goal(goal, "i")
+
+    @property
+    def yearly_expense_goal(self) -> float:
+        """
+        The current year's expense goal, 0.0 if none was set.
+        """
+        return self.get_yearly_goal("e")
+
+    @yearly_expense_goal.setter
+    def yearly_expense_goal(self, goal: float) -> None:
+        self.update_yearly_goal(goal, "e")
+
+    def load_data(self, data, year: int = None) -> None:
+        """
+        Loads income and expense goal data of one year from a dictionary.
+
+        Args:
+            data (dict): Dictionary with "income_goal" and "expense_goal" {month: goal} sub-dictionaries
+                (missing ones are skipped), and optionally "yearly_income_goal" and "yearly_expense_goal".
+            year (int, optional): The year the goals belong to. Defaults to the current year.
+        """
+        year = year or datetime.now().year
+        block = self._block(year)
+        for code, kind in enumerate(self._kinds):
+            for month, goal in (data.get(kind) or {}).items():
+                block[code * 12 + _month(month) - 1] = to_amount(goal)
+        for position, kind in enumerate(self._yearly_kinds, 24):
+            if data.get(kind) is not None:
+                block[position] = to_amount(data[kind])
+        self.version += 1
+        if self._subscribers:
+            for code, kind in enumerate(self._kinds):
+                for month in data.get(kind) or {}:
+                    self._notify("ie"[code], year, _month(month))
+            for code, kind in enumerate(self._yearly_kinds):
+                if data.get(kind) is not None:
+                    self._notify("ie"[code], year, None)
+
+    def get_data(self, year: int = None):
+        """
+        Returns a tuple containing all income and expense goal data of a year.
+
+        Args:
+            year (int, optional): The year to return. Defaults to the current year.
+
+        Returns:
+            tuple: (income_goal dict, expense_goal dict, yearly income goal, yearly expense goal).
+        """
+        year = year or datetime.now().year
+        return (dict(self.get_monthly_goals("i", year)), dict(self.get_monthly_goals("e", year)),
+                self.get_yearly_goal("i", year), self.get_yearly_goal("e", year))
+
+    def get_monthly_goals(self, type: str, year: int = None):
+        """
+        Returns a read-only {month: goal} view of one year's monthly income or expense goals.
+
+        Args:
+            type (str): Specifies whether income[i] or expense[e]
+            year (int, optional): The year to return. Defaults to the current year.
+        """
+        block = self._blocks.get(year or datetime.now().year)
+        if block is None:
+            return MappingProxyType({})
+        offset = _TYPE_CODES[type.lower()] * 12
+        return MappingProxyType({month: goal for month, goal in enumerate(block[offset:offset + 12], 1) if _is_set(goal)})
+
+    def get_range(self, type: str, start_year: int, end_year: int) -> dict:
+        """
+        Returns the monthly goals of every year from `start_year` to `end_year` (inclusive).
+
+        Args:
+            type (str): Specifies whether income[i] or expense[e]
+            start_year (int): The first year of the range.
+            end_year (int): The last year of the range.
+
+        Returns:
+            dict: {year: {month: goal}} for the years in the range that have goals.
+        """
+        return {year: dict(self.get_monthly_goals(type, year))
+                for year in range(start_year, end_year + 1) if self.get_monthly_goals(type, year)}
+
+    def years(self) -> list:
+        """
+        Returns the sorted list of years that have at least one goal.
+        """
+        return sorted(year for year, block in self._blocks.items() if any(_is_set(goal) for goal in block))
+
+    def copy(self):
+        """
+        Returns an independent copy of the goals, without any unsaved changes.
+        """
+        goals = CompactGoals()
+        goals._blocks = {year: block[:] for year, block in self._blocks.items()}
+        goals.version = self.version
+        return goals
+
+    def get_changes(self) -> dict:
+        """
+        Returns the goals that changed since the last call, and marks them as saved.
+
+        Returns:
+            dict: {year: data} where data only holds the changed monthly goals (under 'income_goal'
+                and 'expense_goal') and yearly goals, ready for `DataPersistence.save_changes`.
+        """
+        changes = {}
+        for kind, year, month in self._changed:
+            data = changes.setdefault(year, {})
+            block = self._blocks[year]
+            if month is None:
+                data[kind] = block[24 + self._yearly_kinds.index(kind)]
+            else:
+                data.setdefault(kind, {})[month] = block[self._kinds.index(kind) * 12 + month - 1]
+        self._changed = set()
+        return changes
+
+    def has_changes(self) -> bool:
+        """
+        Returns True if there are goals that haven't been saved yet.
+        """
+        return bool(self._changed)
+
+    def update_monthly_goal(self, goal: str, type: str, month=None, year: int = None) -> None:
+        """Update the monthly income or expense goal of a month.
+
+        Args:
+            goal (str): The new monthly goal.
+            type (str): Specifies whether income[i] or expense[e]
+            month (optional): The month, as a number or a month name. Defaults to the current month.
+            year (int, optional): The year of the month. Defaults to the current year.
+        """
+        year = year or datetime.now().year
+        month = _month(month or datetime.now().month)
+        code = _TYPE_CODES[type]
+        self._block(year)[code * 12 + month - 1] = to_amount(goal)
+        self._changed.add((self._kinds[code], year, month))
+        self.version += 1
+        self._notify("ie"[code], year, month)
+
+    def get_monthly_goal(self, type: str, month=None, year: int = None) -> float:
+        """Get the monthly income or expense goal of a month.
+
+        Args:
+            type (str): Specifies whether income[i] or expense[e]
+            month (optional): The month to look up. Defaults to the current month.
+            year (int, optional): The year to look up. Defaults to the current year.
+
+        Returns:
+            float: The monthly goal.
+
+        Raises:
+            KeyError: If no goal was set for the month.
+        """
+        return self.get_monthly_goals(type, year)[_month(month or datetime.now().month)]
+
+    def update_yearly_goal(self, goal: str, type: str, year: int = None) -> None:
+        """Update the yearly income or expense goal.
+
+        Args:
+            goal (str): The new yearly goal.
+            type (str): Specifies whether income[i] or expense[e]
+            year (int, optional): The year of the goal. Defaults to the current year.
+        """
+        year = year or datetime.now().year
+        code = _TYPE_CODES[type.lower()]
+        self._block(year)[24 + code] = to_amount(goal)
+        self._changed.add((self._yearly_kinds[code], year, None))
+        self.version += 1
+        self._notify("ie"[code], year, None)
+
+    def get_yearly_goal(self, type: str, year: int = None) -> float:
+        """Get the yearly income or expense goal.
+
+        Args:
+            type (str): Specifies whether income[i] or expense[e]
+            year (int, optional): The year of the goal. Defaults to the current year.
+
+        Returns:
+            float: The yearly goal, 0.0 if none was set.
+        """
+        block = self._blocks.get(year or datetime.now().year)
+        goal = block[24 + _TYPE_CODES[type.lower()]] if block is not None else _UNSET
+        return goal if _is_set(goal) else 0.0
+
+    def get_variance(self, money_management, year: int = None) -> dict:
+        """Get how far each month's income and expenses are from their goals.
+
+        Positive values mean the goal was beaten: income above the income goal, or expenses below it.
+        Unlike Goals.get_variance this doesn't need NumPy, and works with MoneyManagement as well as
+        CompactMoneyManagement.
+
+        Args:
+            money_management: The income and expenses to compare.
+            year (int, optional): The year to compare. Defaults to the current year.
+
+        Returns:
+            dict: {'income': list, 'expenses': list} with twelve monthly variances each.
+        """
+        year = year or datetime.now().year
+        monthly = {}
+        for type in ("i", "e"):
+            values = [0.0] * 12
+            for month, value in money_management.get_year(type, year).items():
+                if month_number(month):
+                    values[month_number(month) - 1] += value
+            monthly[type] = values
+        goals = {type: [self.get_monthly_goals(type, year).get(month, 0.0) for month in range(1, 13)] for type in ("i", "e")}
+        return {"income": [value - goal for value, goal in zip(monthly["i"], goals["i"])],
+                "expenses": [goal - value for value, goal in zip(monthly["e"], goals["e"])]}
@@ -1,337 +1,15 @@
 from tkinter import *
 from tkinter import ttk
 from datetime import datetime
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt 
-
-import shelve
-
-
-
-class DataPersistence:
-    """
-    This class handles data persistence for the financial management application.
-
-    It uses the `shelve` module to store and retrieve data from a file named 'financial_management_data'.
-    """
-    _filename = 'financial_management_data'
-
-    def __init__(self):
-        """
-        Opens the data file in create mode ('c').
-
-        If the file doesn't exist, it will be created with an empty dictionary as the default data.
-
-        Raises:
-            shelve.ShelfError: If there's an error opening the file.
-        """
-        try:        
-            with shelve.open(self._filename, 'c') as db:
-                db.setdefault('data', {})
-            print(f"File '{self._filename}' opened")
-        except shelve.ShelfError as e:
-            print(f"Error opening: {e}")
-    
-    def update_database(self, income=None, expenses=None, 
-                        income_goal=None, expense_goal=None, 
-                        yearly_income_goal=None, yearly_expense_goal=None) -> None:
-        """
-        Updates the shelve file with income, expense, and goal data.
-
-        Args:
-            income (float, optional): The user's monthly income.
-            expenses (float, optional): The user's monthly expenses.
-            income_goal (float, optional): The user's monthly income goal.
-            expense_goal (float, optional): The user's monthly expense goal.
-            yearly_income_goal (float, optional): The user's yearly income goal.
-            yearly_expense_goal (float, optional): The user's yearly expense goal.
-        """
-
-        data = {}
-        if income is not None:
-            data['income'] = income
-        if expenses is not None:
-            data['expenses'] = expenses
-        if income_goal is not None:
-            data['income_goal'] = income_goal
-        if expense_goal is not None:
-            data['expense_goal'] = expense_goal
-        if yearly_income_goal is not None:
-            data['yearly_income_goal'] = yearly_income_goal
-        if yearly_expense_goal is not None:
-            data['yearly_expense_goal'] = yearly_expense_goal
-
-        if data:
-            try:
-                with shelve.open(self._filename) as db:
-                    db['data'] = data
-                    print(f"Data updated")
-            except shelve.ShelfError as e:
-                print(f"Error updating data")
-
-    def read_data(self):
-        """
-        Reads and returns the stored financial data from the shelve file.
-
-        Returns:
-            dict: A dictionary containing the stored financial data.
-        """
-
-        try:
-            with shelve.open(self._filename) as db:
-                data = db.get('data', {})
-                return data
-        except shelve.ShelfError as e:
-            print(f"Error reading data: {e}")
-            return {}
-
-
-
-class MoneyManagement:
-    """
-    This class manages income and expenses for the financial management application.
-
-    It stores income and expenses as dictionaries, where the key is the month (as a string)
-    and the value is the amount (as a float).
-    """
-
-    def __init__(self):
-        """
-        Initializes the class with empty dictionaries for income and expenses.
-        """
-        self.income = {}
-        self.expenses = {}
-
-    def load_data(self, data: dict) -> None:
-        """
-        Loads income and expense data from a dictionary.
-
-        The dictionary should have keys "income" and "expenses", each containing sub-dictionaries 
-        with month (as string) keys and corresponding values (as float).
-
-        Args:
-            data (dict): Dictionary containing income and expense data.
-        """
-
-        income = data.get("income")
-        for info in income.items():
-            self.update_values(type="i", value=info[1], month=info[0])
-
-        expenses = data.get("expenses")
-        for info in expenses.items():
-            self.update_values(type="e", value=info[1], month=info[0])
-
-    def get_data(self):
-        """
-        Returns a tuple containing the income and expense dictionaries.
-
-        Returns:
-            tuple: A tuple containing two dictionaries, the first for income and the second for expenses.
-        """
-        return self.income, self.expenses
-
-    def update_values(self, type: str, value: float, month: str) -> None:
-        """
-        Updates the income or expense dictionary based on the provided type, value, and month.
-
-        Args:
-            type (str): "i" for income, "e" for expenses.
-            value (float): The amount to update.
-            month (str): The month (as a string) for which to update the value.
-        """
-
-        if type == "i":
-            self.income[month] = value
-        else:
-            self.expenses[month] = value
-
-    def change_monthly_vals(self, value: str, type: str) -> None:
-        """Change the monthly income/expenses for the current month.
-
-        Args:
-            value (str): The new income value.
-
-        """
-
-        if type == "i":
-            income = float(value)
-            currMonth = datetime.now().month
-            self.income[currMonth] = income
-        else:
-            expenses = float(value)
-            currMonth = datetime.now().month
-            self.expenses[currMonth] = expenses
-
-    def get_monthly_vals(self, value: str) -> None:
-        """Get the monthly income/expenses for the current month.
-
-        Returns:
-            float: The monthly income.
-            float: The monthly expenses.
-
-        """
-        if value == "e":
-            curr_month = datetime.now().month
-
-            return self.expenses[curr_month]
-            
-        else:
-            curr_month = datetime.now().month
-            
-            return self.income[curr_month]
-            
-    def get_yearly_income(self) -> float:
-        """Get the total income for the current year.
-
-        Returns:
-            float: The total income for the current year.
-
-        """
-        total_income = 0.0
-        for month in self.income:
-            total_income += self.income[month]
-        return total_income
-    
-    def get_yearly_expenses(self) -> float:
-        """Get the total expenses for the current year.
-
-        Returns:
-            float: The total expenses for the current year.
-
-        """
-        total_expenses = 0.0
-        for month in self.expenses:
-            total_expenses += self.expenses[month]
-        return total_expenses
-    
-  
-    
-class Goals:
-    """
-    This class manages financial goals for the financial management application.
-
-    It stores monthly income and expense goals as dictionaries, where the key is the month (as a string)
-    and the value is the goal amount (as a float). Additionally, it stores yearly income and expense goals 
-    as separate variables.
-    """
-
-    def __init__(self):
-        """
-        Initializes the class with empty dictionaries for monthly income and expense goals,
-        and sets yearly goals to 0.0.
-        """
-        self.expense_goal = {} # Add button to allow setting a reduction in expenses
-        self.income_goal = {}
-
-        self.yearly_income_goal = 0.0 # Can be adjusted to handle multiple years
-        self.yearly_expense_goal = 0.0
-
-    def load_data(self, data) -> None:
-        """
-        Loads income and expense goal data from a dictionary.
-
-        The dictionary should have keys "income_goal" and "expense_goal", each containing sub-dictionaries 
-        with month (as string) keys and corresponding goal values (as float). It can also optionally have 
-        keys "yearly_income_goal" and "yearly_expense_goal" for yearly goals.
-
-        Args:
-            data (dict): Dictionary containing income and expense goal data.
-        """
-
-        income = data.get("income_goal")
-        for info in income.items():
-            self.update_monthly_goal(goal=info[1], type="i", month=info[0])
-        
-        expense = data.get("expense_goal")
-        for info in expense.items():
-            self.update_monthly_goal(goal=info[1], type="e", month=info[0])
-
-        #Get and set yearly data
-        yearly_income = data.get("yearly_income_goal")
-        yearly_expense = data.get("yearly_expense_goal")
-
-        self.yearly_income_goal = yearly_income
-        self.yearly_expense_goal = yearly_expense
-
-    def get_data(self) -> None:
-        """
-        Returns a tuple containing all income and expense goal data.
-
-        Returns:
-            tuple: A tuple containing four elements:
-                - income_goal (dict): Dictionary of monthly income goals (month: goal amount).
-                - expense_goal (dict): Dictionary of monthly expense goals (month: goal amount).
-                - yearly_income_goal (float): The yearly income goal.
-                - yearly_expense_goal (float): The yearly expense goal.
-        """
-
-        return self.income_goal, self.expense_goal, self.yearly_income_goal, self.yearly_expense_goal
-    
-
-    def update_monthly_goal(self, goal: str, type: str, month: str = None) -> None:
-        """Update the monthly income goal for the current month.
-
-        Args:
-            goal (str): The new monthly income goal.
-            type (str): Specifies whether income[i] or expense[e]
-            month (str, optional): Specifies the month to update the goal for (e.g., 'January', 'February', etc.).
-                If not provided, the current month is used.
-        """
-
-        currMonth = datetime.now().month
-        if month:
-            month_num = month
-        else:
-            month_num = currMonth
-        if type == "i":
-            self.income_goal[month_num] = float(goal)
-        else:
-            self.expense_goal[month_num] = float(goal)
-    
-
-    def get_monthly_goal(self, type: str) -> float:
-        """Get the monthly income goal for the current month.
-        Args:
-            type (str): Specifies whether income[i] or expense[e]
-
-        Returns:
-            float: The monthly income goal.
-            float: The monthly expense goal.
-        """
-        
-        currMonth = datetime.now().month
-        if type.lower() == "i":
-            return self.income_goal[currMonth]
-        else:
-            return self.expense_goal[currMonth]
-    
-    def update_yearly_goal(self, goal: str, type: str) -> None:
-        """Update the yearly income goal.
-
-        Args:
-            goal (str): The new yearly income goal.
-            type (str): Specifies whether income[i] or expense[e]
-        """
-
-        if type.lower() == "i":
-            self.yearly_income_goal = float(goal)
-        else:
-            self.yearly_expense_goal = float(goal)
-    
-    def get_yearly_goal(self, type: str) -> float:
-        """Get the yearly income goal.
-
-        Returns:
-            float: The yearly income goal.
-        """
-
-        if type.lower() == "i":
-            return self.yearly_income_goal
-        else:
-            return self.yearly_expense_goal
-    
+import sys
 
+from models import Transaction, TransactionLedger, MoneyManagement, Goals
+from persistence import DataPersistence, StorageBackend, ShelveBackend, SQLiteBackend, StorageError, shared_requested
+from reports import ReportEngine, generate_report, draw_monthly_chart
+from tasks import TaskRunner
+from workspaces import Workspace, WorkspaceManager
+from goal_monitor import GoalMonitor, format_alert
+from instrumentation import timed
 
 
 
@@ -343,7 +21,7 @@ class GUI_management:
     related to updating income, expenses, and goals.
     """
 
-    def __init__(self, money_management, goals, persistence):
+    def __init__(self, money_management, goals, persistence, autosave_interval=30000, poll_interval=50):
         """
         Initializes the GUI by creating the main window, setting its title, and storing references 
         to the money_management, goals, and persistence objects.
@@ -352,6 +30,8 @@ class GUI_management:
             money_management (MoneyManagement): An instance of the MoneyManagement class.
             goals (Goals): An instance of the Goals class.
             persistence (DataPersistence): An instance of the DataPersistence class.
+            autosave_interval (int, optional): Milliseconds between autosaves of changed values.
+            poll_interval (int, optional): Milliseconds between checks for finished background tasks.
         """
         self.window = Tk()
         self.window.title("Financial Management Tool")
@@ -359,6 +39,17 @@ class GUI_management:
         self.money_management = money_management
         self.goals = goals
         self.persistence = persistence
+        self.report_engine = ReportEngine(money_management, goals)
+        # Alerts when a month or the year crosses 80% or 100% of its goal, checked on every update
+        self.goal_monitor = GoalMonitor(money_management, goals, on_alert=self.show_alert)
+        self.goal_monitor.prime([datetime.now().year])
+        self.alert_label = None
+
+        self.autosave_interval = autosave_interval
+        self.poll_interval = poll_interval
+        self.tasks = TaskRunner()
+        self.busy_indicator = None
+        self.chart_canvas = None
 
 
 
@@ -401,10 +92,14 @@ class GUI_management:
         This method retrieves the income value entered by the user from the income_var StringVar,
         and calls the change_monthly_vals function (assuming it exists) in the money_management object
         to update the income data with the provided value and type ("i" for income).
+        Amounts like '$1,200.50' are accepted; anything that isn't an amount is reported and ignored.
         """
 
         income_value = self.income_var.get()
-        self.money_management.change_monthly_vals(income_value, "i")
+        try:
+            self.money_management.change_monthly_vals(income_value, "i")
+        except ValueError as e:
+            print(f"Error: {e}")
 
 
     def expenses_widgets(self):
@@ -432,10 +127,14 @@ class GUI_management:
         This method retrieves the expense value entered by the user from the expenses_var StringVar,
         and calls the change_monthly_vals function (assuming it exists) in the money_management object
         to update the expense data with the provided value and type ("e" for expense).
+        Amounts like '$1,200.50' are accepted; anything that isn't an amount is reported and ignored.
         """
         
         expenses_value = self.expenses_var.get()
-        self.money_management.change_monthly_vals(expenses_value, "e")
+        try:
+            self.money_management.change_monthly_vals(expenses_value, "e")
+        except ValueError as e:
+            print(f"Error: {e}")
 
     def goals_widgets(self):
         """
@@ -464,135 +163,212 @@ class GUI_management:
 
         This method retrieves the goal value entered by the user from the goals_var StringVar,
         checks the provided type ("i" for income, "e" for expense), and calls the update_monthly_goal function 
-        in the goals object to update the corresponding goal data.
+        in the goals object to update the corresponding goal data. Goals that aren't amounts are reported and ignored.
         """
 
         goal_value = self.goals_var.get()
-        if type.lower() == "i":
-            self.goals.update_monthly_goal(goal_value, "i")
-        else:
-            self.goals.update_monthly_goal(goal_value, "e")
+        try:
+            if type.lower() == "i":
+                self.goals.update_monthly_goal(goal_value, "i")
+            else:
+                self.goals.update_monthly_goal(goal_value, "e")
+        except ValueError as e:
+            print(f"Error: {e}")
+
+    def autosave(self):
+        """
+        Saves the values changed since the last save in the background and schedules the next autosave.
+
+        The changes are collected on the Tk thread, so the worker thread only writes them. If the
+        previous save is still running, this round is skipped and the changes are picked up next time.
+        """
+
+        if not self.tasks.running("save"):
+            if self.money_management.has_changes() or self.goals.has_changes():
+                changes = (self.money_management.get_changes(), self.goals.get_changes())
+                self.tasks.submit("save", self.persistence.save_changes, *changes)
+        self.window.after(self.autosave_interval, self.autosave)
+
+    def poll_tasks(self):
+        """
+        Hands the results of finished background tasks to their callbacks and schedules the next check.
+
+        The busy indicator runs while any task is queued or running.
+        """
+
+        self.tasks.poll()
+        if self.busy_indicator is not None:
+            if self.tasks.busy:
+                self.busy_indicator.grid()
+                self.busy_indicator.start(10)
+            else:
+                self.busy_indicator.stop()
+                self.busy_indicator.grid_remove()
+        self.window.after(self.poll_interval, self.poll_tasks)
 
     def on_closing(self):
         """
         Saves financial data to the persistence layer and closes the GUI window on exit.
 
-        This method retrieves income, expense, income goal, expense goal, yearly income goal, and yearly expense goal data,
-        and calls the update_database function in the persistence object to save this data persistently.
-        Finally, it destroys the GUI window.
+        This method drops any pending chart or report, waits for a running autosave, then retrieves
+        only the income, expense and goal values changed since the last save and calls the save_changes
+        function in the persistence object to save them. Finally, it destroys the GUI window.
         """
 
-        income, expenses = self.money_management.get_data()
-        income_goal, expense_goal, yearly_income_goal, yearly_expense_goal = self.goals.get_data()
-
-        self.persistence.update_database(income, expenses, income_goal, expense_goal,yearly_income_goal, yearly_expense_goal)
+        self.tasks.cancel("chart")
+        self.tasks.cancel("report")
+        self.tasks.shutdown()
+        self.goal_monitor.close()
+        self.persistence.save_changes(self.money_management.get_changes(), self.goals.get_changes())
         self.window.destroy()
 
-    def plot_chart(self):
+    def create_chart(self):
         """
-        Generates a bar chart to visualize income, expenses, income goals, and expense goals for all months.
+        Creates the chart window with an embedded Matplotlib figure and keeps its artists for later updates.
 
-        This method retrieves income, expense, income goal, and expense goal data for each month.
-        It then creates a bar chart using Matplotlib, where income and expenses are displayed as bars,
-        and income and expense goals are displayed as scatter plots with different markers.
-        The chart includes labels, titles, and legends for better readability.
+        The figure is drawn on a FigureCanvasTkAgg inside a Toplevel window, so it runs in the Tk mainloop
+        instead of blocking in plt.show(). Closing the window only hides it, so the same figure, bars and
+        scatter plots are reused by every call to plot_chart.
         """
 
-        # Get monthly income and expenses data
-        months = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
-        income_data = [self.money_management.income.get(month, 0) for month in range(1, 13)]
-        expenses_data = [self.money_management.expenses.get(month, 0) for month in range(1, 13)]
-        income_goals = [self.goals.income_goal.get(month,0) for month in range(1, 13)]
-        expense_goals = [self.goals.expense_goal.get(month,0) for month in range(1, 13)]   
+        # matplotlib is slow to import, so it is only loaded once a chart is requested
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        zeros = [0] * 12
 
-        # Create a bar chart
-        fig, ax = plt.subplots()
-        bar_width = 0.35
+        self.chart_window = Toplevel(self.window)
+        self.chart_window.title("Monthly Chart")
+        self.chart_window.protocol("WM_DELETE_WINDOW", self.chart_window.withdraw)
 
-        # Create a list of positions for expense bars with an offset that are side-by-side
-        index = range(1, 13)
-        bar1 = ax.bar(index, income_data, bar_width, label='Income')
-        bar2 = ax.bar([i + bar_width for i in index], expenses_data, bar_width, label='Expenses')
+        figure = Figure(figsize=(9, 5))
+        artists = draw_monthly_chart(figure, zeros, zeros, zeros, zeros)
+        self.income_bars = artists["income_bars"]
+        self.expense_bars = artists["expense_bars"]
+        self.income_goal_points = artists["income_goal_points"]
+        self.expense_goal_points = artists["expense_goal_points"]
 
-        ax.scatter(index, income_goals, color='red', marker='*', label='Income Goal')
-        ax.scatter([i + bar_width for i in index], expense_goals, color='red', marker='s', label='Expense Goal')
+        self.chart_axes = artists["axes"]
+        self.chart_canvas = FigureCanvasTkAgg(figure, master=self.chart_window)
+        self.chart_canvas.get_tk_widget().pack(fill=BOTH, expand=True)
 
+    @staticmethod
+    @timed("chart.chart_data")
+    def chart_data(money_management, goals, year: int) -> dict:
+        """
+        Computes the monthly income, expenses and goals shown in the chart from the aggregation cube.
 
-        ax.set_xlabel('Month')
-        ax.set_ylabel('Amount')
-        ax.set_title('Monthly Income and Expenses')
-        ax.set_xticks([i + bar_width / 2 for i in index])
-        ax.set_xticklabels(months)
-        ax.legend()
+        This runs on a worker thread, so it is given copies of the income, expenses and goals.
 
-        plt.show()
+        Args:
+            money_management (MoneyManagement): A copy of the income and expenses.
+            goals (Goals): A copy of the goals.
+            year (int): The year to chart.
 
-    def open_info_window(self):
+        Returns:
+            dict: {kind: twelve monthly values} for 'income', 'expenses', 'income_goal' and 'expense_goal'.
         """
-        Opens a new window to display a monthly financial report.
+        cube = money_management.aggregate(goals)
+        return {kind: cube.monthly(kind, year).tolist() for kind in cube.kinds}
 
-        This method creates a new Toplevel window titled "Monthly Report". It then retrieves 
-        various financial data for the current month, including income, expenses, income goal, 
-        and expense goal. Based on these values, it dynamically generates a text report 
-        analyzing the user's financial situation and progress towards their goals. The report 
-        includes details like income vs. expense comparison, goal achievement status, and 
-        suggestions for improvement. Finally, it displays the generated report in a Label widget 
-        within the newly created window.
+    def plot_chart(self, year: int = None):
         """
+        Shows a bar chart to visualize income, expenses, income goals, and expense goals for all months.
 
-        info_window = Toplevel(self.window)
-        info_window.title("Monthly Report")
+        The monthly data is computed from MoneyManagement's aggregation cube on a worker thread, from copies
+        of the income, expenses and goals taken here, and drawn by draw_chart once it is ready. Pressing the button
+        again before that supersedes the earlier request, so only the latest data is drawn.
+        A year that is only in MoneyManagement's archive is read from the archive and drawn right away.
 
-        curr_expenses = self.money_management.get_monthly_vals("e")
-        curr_income = self.money_management.get_monthly_vals("i")
+        Args:
+            year (int, optional): The year to chart. Defaults to the current year.
+        """
 
-        yearly_income = self.money_management.get_yearly_income()
-        yearly_expenses = self.money_management.get_yearly_expenses()
+        year = year or datetime.now().year
+        if self.money_management.is_archived(year):
+            self.tasks.cancel("chart")
+            self.draw_chart(self.money_management.archive.chart_data(year))
+            return
+        self.tasks.submit("chart", self.chart_data, self.money_management.copy(), self.goals.copy(), year,
+                          callback=self.draw_chart)
 
-        income_goal = self.goals.get_monthly_goal("i")
-        expense_goal = self.goals.get_monthly_goal("e")
+    @timed("chart.draw_chart")
+    def draw_chart(self, data: dict):
+        """
+        Draws the data computed for plot_chart.
 
-        if curr_expenses > curr_income:
-            percentage_text = f"Currently, your expenses are higher than your income by {curr_income/curr_expenses*100:.2f}%. "  
-            income_goal_text = f"You set an income goal of ${income_goal:.2f}. "
+        The chart window is created the first time (see create_chart); after that the existing bars and
+        scatter plots are updated in place with set_height and set_offsets and redrawn with draw_idle,
+        so refreshing the chart is fast and doesn't create new figures.
 
-            info_text = percentage_text + income_goal_text
+        Args:
+            data (dict): {kind: twelve monthly values} as returned by chart_data.
+        """
 
-            if income_goal > curr_income:
-                info_text += "\n     * It looks like you might need to work a little harder to reach your income goal this month."
-            else:
-                info_text += "\n     * Keep up the good work! You surpassed your goal."
-            
-            info_text += f"\n\nYou set an expense goal of ${expense_goal:.2f}. Here's how it looks:"
+        income_data = data['income']
+        expenses_data = data['expenses']
+        income_goals = data['income_goal']
+        expense_goals = data['expense_goal']
 
-            if expense_goal < curr_expenses:
-                info_text += "\n    * It looks like you might need to adjust your spending habits to get lower your expenses and reach your goal. What innessential things can you cut out of your spending this month(i.e. Subscriptions, eating out, etc)."
-            else:
-                info_text += "\n    * Keep up the good work! You reduced your expenses below the goal"
-        else:
-            #This text occurs when their income > than monthly expenses
-            percentage_text = f"Currently, your income is higher than your expenses by {curr_expenses/curr_income*100:.2f}%. "  
-            income_goal_text = f"You set an income goal of ${income_goal:.2f}. "
+        if self.chart_canvas is None:
+            self.create_chart()
 
-            info_text = percentage_text + income_goal_text + "You're doing great so far by surpassing your current expenses, but lets check how far you are on achieving your goals:"
+        for bar, value in zip(self.income_bars, income_data):
+            bar.set_height(value)
+        for bar, value in zip(self.expense_bars, expenses_data):
+            bar.set_height(value)
+        self.income_goal_points.set_offsets([(bar.get_x() + bar.get_width() / 2, goal) for bar, goal in zip(self.income_bars, income_goals)])
+        self.expense_goal_points.set_offsets([(bar.get_x() + bar.get_width() / 2, goal) for bar, goal in zip(self.expense_bars, expense_goals)])
 
-            if income_goal > curr_income:
-                info_text += "\n    * It looks like you might need to work a little harder to reach your income goal this month."
-            else:
-                info_text += "\n    * Keep up the good work! You surpassed your goal."
+        # Scatter offsets aren't picked up by autoscaling, so set the amount range from the data
+        highest = max(income_data + expenses_data + income_goals + expense_goals)
+        lowest = min(income_data + expenses_data + income_goals + expense_goals)
+        self.chart_axes.set_ylim(min(lowest * 1.1, 0), max(highest * 1.1, 1))
 
-            info_text += f"\n\nYou set an expense goal of ${expense_goal:.2f}. Here's how it looks:"
+        self.chart_canvas.draw_idle()
+        self.chart_window.deiconify()
+        self.chart_window.lift()
 
-            if expense_goal < curr_expenses:
-                info_text += "\n    * It looks like you might need to adjust your spending habits to get lower your expenses and reach your goal. What innessential things can you cut out of your spending this month(i.e. Subscriptions, eating out, etc). Although you are making more than you are losing, it never hurts to have more money"
-            else:
-                info_text += "\n    * Keep up the good work! You reduced your expenses below the goal"
+    def open_info_window(self):
+        """
+        Generates the monthly financial report in the background and opens a window to display it.
+
+        The report is generated by the ReportEngine (see reports.py) on a worker thread, from copies of
+        the income, expenses and goals taken here, like the chart. The engine reuses the last report as
+        long as no income, expense or goal changed. show_report displays it once it is ready.
+        """
 
+        snapshot = (self.money_management.copy(), self.goals.copy())
+        self.tasks.submit("report", self.report_engine.report, None, None, snapshot, callback=self.show_report)
+
+    def show_report(self, info_text: str):
+        """
+        Opens a new Toplevel window titled "Monthly Report" and displays the report in a Label widget.
+
+        Args:
+            info_text (str): The report text.
+        """
+
+        info_window = Toplevel(self.window)
+        info_window.title("Monthly Report")
 
         info_label = Label(info_window, text=info_text, justify=LEFT, wraplength=300)
         info_label.pack(padx=10, pady=10)
 
 
+    def show_alert(self, alert):
+        """
+        Shows a goal alert raised by the GoalMonitor below the buttons, or prints it before the window is started.
+
+        Args:
+            alert (GoalAlert): The alert.
+        """
+
+        if self.alert_label is None:
+            print(format_alert(alert))
+        else:
+            self.alert_label.config(text=format_alert(alert))
+
     def start(self):
         """
         Initializes the GUI window and launches the main application loop.
@@ -604,8 +380,11 @@ class GUI_management:
             4. Creates UI elements for setting income and expense goals (calls goals_widgets).
             5. Adds a button to trigger the plot_chart function for visualizing financial data.
             6. Adds a button to open a new window displaying a monthly financial report (calls open_info_window).
-            7. Binds the on_closing function to the window's close event to save data and close the window gracefully.
-            8. Starts the main event loop for the GUI, which listens for user interactions and updates the UI accordingly.
+            7. Adds a busy indicator that runs while background tasks are working (see poll_tasks),
+               and a label showing the latest goal alert (see show_alert).
+            8. Binds the on_closing function to the window's close event to save data and close the window gracefully.
+               Changed values are also autosaved every `autosave_interval` milliseconds.
+            9. Starts the main event loop for the GUI, which listens for user interactions and updates the UI accordingly.
         """
 
         self.content_frame()
@@ -619,21 +398,36 @@ class GUI_management:
         info_button = Button(self.mainframe, text="Monthly Report", command=self.open_info_window)
         info_button.grid(column=3, row=3, sticky=E)
 
+        # Shown while saves, charts or reports are being prepared in the background
+        self.busy_indicator = ttk.Progressbar(self.mainframe, mode="indeterminate", length=120)
+        self.busy_indicator.grid(column=0, row=4, columnspan=4, sticky=W+E)
+        self.busy_indicator.grid_remove()
+
+        self.alert_label = Label(self.mainframe, text="", justify=LEFT, wraplength=400)
+        self.alert_label.grid(column=0, row=5, columnspan=4, sticky=W)
+
         self.window.protocol("WM_DELETE_WINDOW", self.on_closing)
+        self.window.after(self.autosave_interval, self.autosave)
+        self.window.after(self.poll_interval, self.poll_tasks)
 
         self.window.mainloop()
 
 
 
-def main():
+def main(workspace: str = None):
     """
     Entry point for the financial management application.
 
+    With a workspace name (`python financial_management_tool.py <workspace>`), the finances of that
+    workspace are opened instead (see workspaces.py) and steps 1-3 below are replaced by loading it.
+
     This function performs the following steps:
-        1. Creates instances of MoneyManagement, Goals, and DataPersistence classes.
+        1. Creates instances of MoneyManagement, Goals, and DataPersistence classes. The data file is
+           opened in shared mode if the FINANCIAL_TOOL_SHARED environment variable is set.
         2. Attempts to read financial data from the persistence layer using DataPersistence.read_data().
         3. If data is retrieved successfully:
             - Loads the retrieved data into MoneyManagement and Goals objects for proper initialization.
+           Then attaches the objects to the persistence journal, so every edit is recorded as it is made.
         4. Creates an instance of the GUI_management class, providing the necessary objects for GUI interactions and data management.
         5. Calls methods from GUI_management to:
             - Create the main content frame of the GUI.
@@ -641,27 +435,49 @@ def main():
             - Create UI elements for expense input and update.
             - Create UI elements for setting income and expense goals.
         6. Starts the main event loop of the GUI using gui.start(), enabling user interaction and data visualization.
+        7. Closes the persistence layer, which writes any batched updates to disk.
 
-    This function returns 0 to indicate successful execution.
+    Args:
+        workspace (str, optional): The name of the workspace to open.
+
+    This function returns 0 to indicate successful execution, or 1 if the data file can't be opened.
     """
-    
+
+    if workspace:
+        with WorkspaceManager(max_open=1, shared=shared_requested()) as workspaces:
+            try:
+                current = workspaces.open(workspace)
+            except StorageError as e:
+                print(f"Error opening: {e}")
+                return 1
+            gui = GUI_management(current.money_management, current.goals, current.persistence)
+            gui.window.title(f"Financial Management Tool - {workspace}")
+            gui.start()
+        return 0
+
     money_management = MoneyManagement()
     goals = Goals()
-    persistence = DataPersistence()
-    data = persistence.read_data()
-    if data:
-        money_management.load_data(data)
-        goals.load_data(data)
-
-    gui = GUI_management(money_management, goals, persistence)
-    gui.content_frame()
-    gui.income_widgets()
-    gui.expenses_widgets()
-    gui.goals_widgets()
-    gui.start()
+    try:
+        persistence = DataPersistence(shared=shared_requested())
+    except StorageError as e:
+        print(f"Error opening: {e}")
+        return 1
+    with persistence:
+        data = persistence.read_data()
+        if data:
+            money_management.load_data(data)
+            goals.load_data(data)
+        persistence.attach(money_management, goals)
+
+        gui = GUI_management(money_management, goals, persistence)
+        gui.content_frame()
+        gui.income_widgets()
+        gui.expenses_widgets()
+        gui.goals_widgets()
+        gui.start()
     return 0
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
 
 
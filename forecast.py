@@ -0,0 +1,233 @@
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from models import MONTH_NAMES, month_number
+
+
+METHODS = ("trend", "moving_average", "seasonal_naive")
+
+
+def monthly_history(money_management, type: str, year: int, history_years: int = 5) -> np.ndarray:
+    """
+    Returns the month totals of a year and the years before it as a (years x 12) array.
+
+    Month keys stored as names or numbers are both found (see `month_number`); months without a total
+    are 0. Earlier years without any data are left out.
+
+    Args:
+        money_management (MoneyManagement): The income and expenses.
+        type (str): "i" for income, "e" for expenses.
+        year (int): The last year, the one to forecast.
+        history_years (int, optional): How many years before `year` to include.
+
+    Returns:
+        np.ndarray: One row per year, oldest first; the last row is always `year`.
+    """
+    by_year = money_management.get_range(type, year - history_years, year)
+    rows = [year_ for year_ in sorted(by_year) if year_ != year] + [year]
+    history = np.zeros((len(rows), 12))
+    for row, year_ in enumerate(rows):
+        for month, value in by_year.get(year_, {}).items():
+            number = month_number(month)
+            if number:
+                history[row, number - 1] += value
+    return history
+
+
+def _trend_fit(history: np.ndarray, through_month: int) -> tuple:
+    """
+    Fits a straight line through every observed month of the history.
+
+    Returns:
+        tuple: (slope, intercept, residuals), with time counted in months from the first observed one.
+    """
+    series = np.concatenate([history[:-1].ravel(), history[-1, :through_month]])
+    if len(series) < 2:
+        return 0.0, float(series.mean()) if len(series) else 0.0, np.zeros(1)
+    time = np.arange(len(series))
+    slope, intercept = np.polyfit(time, series, 1)
+    return slope, intercept, series - (slope * time + intercept)
+
+
+def project_months(history: np.ndarray, through_month: int, method: str = "trend", window: int = 3) -> np.ndarray:
+    """
+    Projects the months after `through_month` of the last year of a history.
+
+    Args:
+        history (np.ndarray): (years x 12) month totals from `monthly_history`.
+        through_month (int): The last month (1-12) of the last year that has happened.
+        method (str, optional): 'trend' extends a straight line fitted through all observed months,
+            'moving_average' repeats the mean of the last `window` observed months, and
+            'seasonal_naive' repeats the same months of the year before.
+        window (int, optional): Number of months averaged by 'moving_average'.
+
+    Returns:
+        np.ndarray: The projected totals of the remaining 12 - `through_month` months, never negative.
+    """
+    remaining = 12 - through_month
+    if method == "trend":
+        slope, intercept, _ = _trend_fit(history, through_month)
+        start = (len(history) - 1) * 12 + through_month
+        projection = slope * np.arange(start, start + remaining) + intercept
+    elif method == "moving_average":
+        observed = np.concatenate([history[:-1].ravel(), history[-1, :through_month]])[-window:]
+        projection = np.full(remaining, observed.mean() if len(observed) else 0.0)
+    elif method == "seasonal_naive":
+        if len(history) < 2:
+            return project_months(history, through_month, "moving_average", window)
+        projection = history[-2, through_month:].copy()
+    else:
+        raise ValueError(f"Unknown method '{method}'")
+    return np.maximum(projection, 0.0)
+
+
+def _simulate(seed, base: np.ndarray, residuals: np.ndarray, actual: float, runs: int) -> np.ndarray:
+    """
+    Returns the year-end totals of `runs` simulated years.
+
+    Every simulated month is the projected month plus a residual drawn (with replacement) from the
+    errors of the trend fit, so the spread of the results follows the spread of the history.
+    """
+    rng = np.random.default_rng(seed)
+    months = base + rng.choice(residuals, size=(runs, len(base)))
+    return actual + np.maximum(months, 0.0).sum(axis=1)
+
+
+def simulate_year(history: np.ndarray, through_month: int, runs: int = 10000, method: str = "trend",
+                  seed: int = None, workers: int = 1) -> np.ndarray:
+    """
+    Runs a Monte Carlo simulation of the rest of the year.
+
+    All runs are computed as one (runs x months) array. With more than one worker the runs are split
+    into equal chunks that are simulated in parallel by a pool of processes, each with its own
+    independent random stream, so the result doesn't depend on the number of workers.
+
+    Args:
+        history (np.ndarray): (years x 12) month totals from `monthly_history`.
+        through_month (int): The last month (1-12) of the last year that has happened.
+        runs (int, optional): Number of simulated years.
+        method (str, optional): The projection the simulated months vary around (see `project_months`).
+        seed (int, optional): Seed for reproducible runs.
+        workers (int, optional): Number of worker processes.
+
+    Returns:
+        np.ndarray: The year-end total of every run.
+    """
+    actual = float(history[-1, :through_month].sum())
+    base = project_months(history, through_month, method)
+    residuals = _trend_fit(history, through_month)[2]
+    chunks = max(1, min(workers, runs))
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    sizes = [runs // chunks + (chunk < runs % chunks) for chunk in range(chunks)]
+    if chunks == 1:
+        return _simulate(seeds[0], base, residuals, actual, runs)
+    with ProcessPoolExecutor(max_workers=chunks) as pool:
+        results = pool.map(_simulate, seeds, [base] * chunks, [residuals] * chunks, [actual] * chunks, sizes)
+        return np.concatenate(list(results))
+
+
+def forecast_year(money_management, goals, year: int = None, through_month: int = None, runs: int = 2000,
+                  seed: int = 0, history_years: int = 5, workers: int = 1) -> dict:
+    """
+    Projects the year-end income and expenses and the chance of reaching the yearly goals.
+
+    Args:
+        money_management (MoneyManagement): The income and expenses.
+        goals (Goals): The yearly goals.
+        year (int, optional): The year to forecast. Defaults to the current year.
+        through_month (int, optional): The last month that has happened. Defaults to the current month
+            for the current year and December for past years.
+        runs (int, optional): Number of Monte Carlo runs.
+        seed (int, optional): Seed of the simulation; the same data always gives the same forecast.
+        history_years (int, optional): How many earlier years the projections learn from.
+        workers (int, optional): Number of processes for the simulation.
+
+    Returns:
+        dict: {'year', 'through_month', 'income': {...}, 'expenses': {...}} where each type holds the
+            'actual' total so far, the year-end projection of every method in METHODS, the 'goal'
+            and the 'probability' of reaching it (None without a goal).
+    """
+    now = datetime.now()
+    year = year or now.year
+    if through_month is None:
+        through_month = now.month if year == now.year else 12
+    result = {"year": year, "through_month": through_month}
+    for type, kind in (("i", "income"), ("e", "expenses")):
+        history = monthly_history(money_management, type, year, history_years)
+        actual = float(history[-1, :through_month].sum())
+        values = {"actual": actual}
+        for method in METHODS:
+            values[method] = actual + float(project_months(history, through_month, method).sum())
+
+        goal = goals.get_yearly_goal(type, year)
+        values["goal"] = goal
+        values["probability"] = None
+        if goal:
+            totals = simulate_year(history, through_month, runs, seed=seed, workers=workers)
+            # Income goals are reached from above, expense goals by staying below them
+            values["probability"] = float(np.mean(totals >= goal if type == "i" else totals <= goal))
+        result[kind] = values
+    return result
+
+
+def forecast_text(forecast: dict) -> str:
+    """
+    Builds the year-end forecast section of the monthly report.
+
+    Args:
+        forecast (dict): The result of `forecast_year`.
+
+    Returns:
+        str: The text, starting with a blank line.
+    """
+    through = MONTH_NAMES[forecast["through_month"] - 1]
+    parts = [f"\n\nYear-end forecast for {forecast['year']} (based on the months through {through}):"]
+    for kind, goal_name in (("income", "income"), ("expenses", "expense")):
+        values = forecast[kind]
+        parts.append(f"\n    * Projected {kind}: ${values['trend']:.2f} by trend, "
+                     f"${values['moving_average']:.2f} by moving average, "
+                     f"${values['seasonal_naive']:.2f} by last year's pattern.")
+        if values["probability"] is not None:
+            parts.append(f" Chance of meeting your yearly {goal_name} goal of ${values['goal']:.2f}: "
+                         f"{values['probability']:.0%}.")
+    return "".join(parts)
+
+
+def main(argv=None):
+    """
+    Command line entry point for forecasting a year from the stored data.
+
+    Returns:
+        int: 0 on success.
+    """
+    from persistence import DataPersistence, SQLiteBackend, shared_requested
+    from models import MoneyManagement, Goals
+
+    parser = argparse.ArgumentParser(description="Forecast the year-end income and expenses.")
+    parser.add_argument("--year", type=int, help="the year to forecast (default: this year)")
+    parser.add_argument("--through", type=int, help="the last month that has happened (1-12)")
+    parser.add_argument("--runs", type=int, default=100000, help="number of Monte Carlo runs")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes for the simulation")
+    parser.add_argument("--history", type=int, default=5, help="number of earlier years to learn from")
+    parser.add_argument("--sqlite", help="read this SQLite database instead of the shelve file")
+    parser.add_argument("--shared", action="store_true",
+                        help="lock the shelve file on every access, so other programs can use it at the same time")
+    args = parser.parse_args(argv)
+
+    year = args.year or datetime.now().year
+    money_management, goals = MoneyManagement(), Goals()
+    with DataPersistence(SQLiteBackend(args.sqlite) if args.sqlite else None,
+                         shared=shared_requested(args.shared)) as persistence:
+        for year_, data in persistence.read_range(year - args.history, year).items():
+            money_management.load_data(data, year_)
+            goals.load_data(data, year_)
+    forecast = forecast_year(money_management, goals, year, args.through, args.runs, None, args.history, args.workers)
+    print(forecast_text(forecast).strip())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
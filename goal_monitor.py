@@ -0,0 +1,168 @@
+"""
+Incremental goal tracking with threshold alerts.
+
+A GoalMonitor subscribes to MoneyManagement and Goals and, after every change, re-evaluates only the
+changed month and its year against their goals. Each evaluation is a handful of dictionary lookups
+(the ledger keeps yearly totals up to date), so the cost per update doesn't grow with the amount of
+data and the monitor keeps up with bulk imports:
+
+    monitor = GoalMonitor(money_management, goals, thresholds=(0.8, 1.0), on_alert=print)
+    money_management.update_values("e", 950.0, 3, 2024)   # prints an alert if 80% of the goal was reached
+"""
+from bisect import bisect_right
+from collections import deque, namedtuple
+from datetime import datetime
+
+from models import MONTH_NAMES, month_number
+
+
+GoalAlert = namedtuple("GoalAlert", ["type", "year", "month", "value", "goal", "ratio", "threshold", "rising"])
+GoalAlert.__doc__ = """
+An income or expense total crossing a threshold of its goal.
+
+`month` is None for yearly goals. `rising` is True when the total reached the threshold and False
+when it fell back below it.
+"""
+
+
+def format_alert(alert: GoalAlert) -> str:
+    """
+    Returns a one-line description of an alert, e.g. for the GUI.
+    """
+    kind = "Income" if alert.type == "i" else "Expenses"
+    if alert.month is None:
+        period = str(alert.year)
+    else:
+        number = month_number(alert.month)
+        period = f"{MONTH_NAMES[number - 1] if number else alert.month} {alert.year}"
+    change = "reached" if alert.rising else "fell below"
+    return (f"{kind} for {period} {change} {alert.threshold:.0%} of the goal "
+            f"(${alert.value:.2f} of ${alert.goal:.2f})")
+
+
+class GoalMonitor:
+    """
+    This class evaluates income and expenses against their goals as they change, and raises alerts
+    when a total crosses a threshold of its goal.
+
+    For every (type, year, month) it only keeps the number of thresholds reached, so an alert is
+    raised once per crossing rather than on every update. Months without a goal are never alerted on.
+    Totals that were already past a threshold before the monitor was created count as crossing it on
+    their next change, unless `prime` is called first.
+    """
+
+    def __init__(self, money_management, goals, thresholds=(0.8, 1.0), on_alert=None, history: int = 100):
+        """
+        Initializes the monitor and subscribes it to changes of the income, expenses and goals.
+
+        Args:
+            money_management (MoneyManagement): The income and expenses to watch.
+            goals (Goals): The goals to compare them with.
+            thresholds (tuple, optional): Fractions of a goal that raise an alert when crossed.
+            on_alert (optional): Function called with every GoalAlert.
+            history (int, optional): Number of recent alerts kept in `alerts`.
+        """
+        self.money_management = money_management
+        self.goals = goals
+        self.thresholds = tuple(sorted(thresholds))
+        self.on_alert = on_alert
+        self.alerts = deque(maxlen=history)
+        self._levels = {}  # (type, year, month): number of thresholds reached, month is None for yearly goals
+        money_management.subscribe(self._value_changed)
+        goals.subscribe(self.evaluate)
+
+    def close(self) -> None:
+        """
+        Stops watching the income, expenses and goals.
+        """
+        self.money_management.unsubscribe(self._value_changed)
+        self.goals.unsubscribe(self.evaluate)
+
+    def _value_changed(self, type: str, year: int, month) -> None:
+        self.evaluate(type, year, month)
+        self.evaluate(type, year, None)
+
+    def progress(self, type: str, year: int = None, month=None) -> tuple:
+        """
+        Returns a month's or year's total and its goal.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int, optional): The year. Defaults to the current year.
+            month (optional): The month, or None for the yearly total and goal.
+
+        Returns:
+            tuple: (total, goal), 0.0 for either if it isn't set.
+        """
+        year = year or datetime.now().year
+        if month is None:
+            if type == "i":
+                value = self.money_management.get_yearly_income(year)
+            else:
+                value = self.money_management.get_yearly_expenses(year)
+            return value, self.goals.get_yearly_goal(type, year)
+        return (self.money_management.get_year(type, year).get(month, 0.0),
+                self.goals.get_monthly_goals(type, year).get(month, 0.0))
+
+    def variance(self, type: str, year: int = None, month=None) -> float:
+        """
+        Returns how far a month's or year's total is from its goal.
+
+        Positive values mean the goal was beaten, as in `Goals.get_variance`: income above the income
+        goal, or expenses below the expense goal.
+        """
+        value, goal = self.progress(type, year, month)
+        return value - goal if type == "i" else goal - value
+
+    def evaluate(self, type: str, year: int, month=None, notify: bool = True) -> list:
+        """
+        Re-evaluates one month or year against its goal and raises alerts for the thresholds crossed.
+
+        Called for every change through the subscriptions made in `__init__`. When several
+        thresholds are crossed at once only the furthest one is alerted on.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int): The year.
+            month (optional): The month, or None for the yearly goal.
+            notify (bool, optional): If False, the state is updated without raising alerts.
+
+        Returns:
+            list: The alerts raised (at most one).
+        """
+        value, goal = self.progress(type, year, month)
+        ratio = value / goal if goal > 0 else 0.0
+        level = bisect_right(self.thresholds, ratio) if goal > 0 else 0
+        key = (type, year, month)
+        previous = self._levels.get(key, 0)
+        if level == previous:
+            return []
+        if level:
+            self._levels[key] = level
+        else:
+            del self._levels[key]
+        if not notify:
+            return []
+
+        rising = level > previous
+        alert = GoalAlert(type, year, month, value, goal, ratio,
+                          self.thresholds[level - 1] if rising else self.thresholds[level], rising)
+        self.alerts.append(alert)
+        if self.on_alert is not None:
+            self.on_alert(alert)
+        return [alert]
+
+    def prime(self, years) -> None:
+        """
+        Records which thresholds the stored totals of some years have already reached, without
+        raising alerts, so only later crossings are alerted on.
+
+        Args:
+            years: The years to look at.
+        """
+        for year in years:
+            for type in ("i", "e"):
+                months = set(self.money_management.get_year(type, year)) | set(self.goals.get_monthly_goals(type, year))
+                for month in months:
+                    self.evaluate(type, year, month, notify=False)
+                self.evaluate(type, year, None, notify=False)
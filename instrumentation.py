@@ -0,0 +1,254 @@
+"""
+Opt-in timing, call count and storage I/O instrumentation, with stats dumps and cProfile sessions.
+
+Instrumentation is off unless the FINANCIAL_TOOL_INSTRUMENT environment variable is set (to anything
+but '0'), or `enable()` is called, before the application modules are imported. When it is off, `timed`
+returns the decorated function unchanged, so there is no overhead at all. The easiest way to turn it
+on for one run is this module's command line, which enables it, runs a script and saves the results:
+
+    python instrumentation.py --prometheus stats.prom --profile session.prof bulk_import.py statement.csv
+    FINANCIAL_TOOL_INSTRUMENT=1 python financial_management_tool.py   # prints the stats on exit
+"""
+import argparse
+import atexit
+import functools
+import os
+import runpy
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+ENV_VAR = "FINANCIAL_TOOL_INSTRUMENT"
+
+enabled = os.environ.get(ENV_VAR, "") not in ("", "0")
+
+_stats = {}  # operation: [calls, seconds, max seconds, bytes read, bytes written]
+_lock = threading.Lock()
+_running = threading.local()  # .operations: the timed operations running on this thread, innermost last
+
+
+def enable() -> None:
+    """
+    Turns instrumentation on for the modules imported from now on.
+    """
+    global enabled
+    enabled = True
+
+
+def _entry(operation: str) -> list:
+    entry = _stats.get(operation)
+    if entry is None:
+        entry = _stats[operation] = [0, 0.0, 0.0, 0, 0]
+    return entry
+
+
+def record(operation: str, seconds: float) -> None:
+    """
+    Adds one call of an operation to the stats.
+
+    Args:
+        operation (str): The name of the operation, e.g. 'persistence.read_data'.
+        seconds (float): The wall time of the call.
+    """
+    with _lock:
+        entry = _entry(operation)
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = max(entry[2], seconds)
+
+
+def count_io(read: int = 0, written: int = 0, fallback: str = "storage") -> None:
+    """
+    Adds bytes a storage backend read from or wrote to its file to the innermost timed operation
+    running on this thread, e.g. the shelve bytes loaded by 'persistence.read_data'.
+
+    Backends call this where they already have the bytes (or row values) at hand, and only while
+    `enabled` is set, so nothing is serialized again just to be measured.
+
+    Args:
+        read (int, optional): Bytes read.
+        written (int, optional): Bytes written.
+        fallback (str, optional): The operation to count under when no timed operation is running,
+            e.g. for writes of a background thread.
+    """
+    operations = getattr(_running, "operations", None)
+    with _lock:
+        entry = _entry(operations[-1] if operations else fallback)
+        entry[3] += read
+        entry[4] += written
+
+
+def timed(operation: str):
+    """
+    Decorator recording the wall time and calls of a function under `operation`.
+
+    Bytes the storage backends read and write while the function runs are counted under it too
+    (see `count_io`). Returns the function unchanged if instrumentation is off when it is decorated.
+
+    Args:
+        operation (str): The name to record the calls under.
+    """
+    def decorate(function):
+        if not enabled:
+            return function
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            operations = getattr(_running, "operations", None)
+            if operations is None:
+                operations = _running.operations = []
+            operations.append(operation)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                record(operation, time.perf_counter() - start)
+                operations.pop()
+        return wrapper
+    return decorate
+
+
+def stats() -> dict:
+    """
+    Returns a copy of the recorded stats.
+
+    Returns:
+        dict: {operation: {'calls', 'seconds', 'max_seconds', 'bytes_read', 'bytes_written'}}
+    """
+    with _lock:
+        return {operation: dict(zip(("calls", "seconds", "max_seconds", "bytes_read", "bytes_written"), entry))
+                for operation, entry in _stats.items()}
+
+
+def reset() -> None:
+    """
+    Clears the recorded stats.
+    """
+    with _lock:
+        _stats.clear()
+
+
+def format_stats() -> str:
+    """
+    Returns the recorded stats as a table, slowest operation first.
+    """
+    lines = [f"{'operation':36} {'calls':>9} {'total ms':>11} {'mean us':>10} {'max ms':>9} {'read KiB':>10} {'written KiB':>12}"]
+    for operation, entry in sorted(stats().items(), key=lambda item: -item[1]["seconds"]):
+        lines.append(f"{operation:36} {entry['calls']:9d} {entry['seconds'] * 1000:11.3f} "
+                     f"{entry['seconds'] / entry['calls'] * 1e6 if entry['calls'] else 0.0:10.2f} "
+                     f"{entry['max_seconds'] * 1000:9.3f} "
+                     f"{entry['bytes_read'] / 1024:10.1f} {entry['bytes_written'] / 1024:12.1f}")
+    return "\n".join(lines)
+
+
+def prometheus_text() -> str:
+    """
+    Returns the recorded stats in the Prometheus text exposition format.
+    """
+    metrics = (
+        ("financial_tool_calls_total", "counter", "Number of calls.", "calls"),
+        ("financial_tool_seconds_total", "counter", "Wall time spent in calls.", "seconds"),
+        ("financial_tool_seconds_max", "gauge", "Slowest single call.", "max_seconds"),
+        ("financial_tool_bytes_read_total", "counter", "Bytes read from storage files.", "bytes_read"),
+        ("financial_tool_bytes_written_total", "counter", "Bytes written to storage files.", "bytes_written"),
+    )
+    current = stats()
+    lines = []
+    for name, kind, help_text, key in metrics:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for operation, entry in sorted(current.items()):
+            lines.append(f'{name}{{operation="{operation}"}} {entry[key]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path: str) -> None:
+    """
+    Writes the stats to a Prometheus text file, replacing it in one step so a collector never reads
+    half a file (as the node exporter's textfile collector expects).
+
+    Args:
+        path (str): The file to write.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "w") as output:
+        output.write(prometheus_text())
+    os.replace(temporary, path)
+
+
+@contextmanager
+def profile_session(path: str):
+    """
+    Context manager that runs its block under cProfile and saves the profile to `path`.
+
+    The saved file can be read with `python -m pstats <path>` or tools like snakeviz.
+
+    Args:
+        path (str): The file to save the profile to.
+    """
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
+
+
+def _print_on_exit() -> None:
+    if _stats:
+        print(format_stats(), file=sys.stderr)
+
+
+if enabled:
+    atexit.register(_print_on_exit)
+
+
+def main(argv=None):
+    """
+    Command line entry point that runs a script with instrumentation on and saves the results.
+
+    Returns:
+        int: The exit status of the script.
+    """
+    parser = argparse.ArgumentParser(description="Run a script with timing instrumentation and optional cProfile.")
+    parser.add_argument("--stats", help="write the stats table to this file (default: print it)")
+    parser.add_argument("--prometheus", help="write the stats to this Prometheus text file")
+    parser.add_argument("--profile", help="run the script under cProfile and save the profile here")
+    parser.add_argument("script", help="the script to run, e.g. bulk_import.py")
+    parser.add_argument("arguments", nargs=argparse.REMAINDER, help="arguments for the script")
+    args = parser.parse_args(argv)
+
+    enable()
+    atexit.unregister(_print_on_exit)
+    sys.argv = [args.script] + args.arguments
+    sys.path.insert(0, os.path.dirname(os.path.abspath(args.script)))
+    status = 0
+    profiler = profile_session(args.profile) if args.profile else None
+    try:
+        if profiler is not None:
+            with profiler:
+                runpy.run_path(args.script, run_name="__main__")
+        else:
+            runpy.run_path(args.script, run_name="__main__")
+    except SystemExit as e:
+        status = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+
+    if args.stats:
+        with open(args.stats, "w") as output:
+            output.write(format_stats() + "\n")
+    else:
+        print(format_stats())
+    if args.prometheus:
+        write_prometheus(args.prometheus)
+    if args.profile:
+        print(f"Profile saved to '{args.profile}'")
+    return status
+
+if __name__ == "__main__":
+    # Run main() in the importable module, so the stats it prints are the ones the application records
+    import instrumentation
+    sys.exit(instrumentation.main())
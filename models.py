@@ -0,0 +1,1237 @@
+from datetime import datetime, date
+from array import array
+import heapq
+from collections import namedtuple
+from operator import itemgetter
+from types import MappingProxyType
+
+from instrumentation import timed
+from money import to_amount, to_cents
+
+
+Transaction = namedtuple("Transaction", ["date", "amount", "category", "type", "year", "month", "tags"], defaults=((),))
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September', 'October', 'November', 'December']
+
+
+def month_number(month) -> int:
+    """
+    Returns the calendar month (1-12) of a month key, or 0 if the key isn't a calendar month.
+
+    Args:
+        month: A month key as used by MoneyManagement and Goals, e.g. 4, '4' or 'April'.
+
+    Returns:
+        int: The month number, or 0.
+    """
+    if isinstance(month, str):
+        if month in MONTH_NAMES:
+            return MONTH_NAMES.index(month) + 1
+        if not month.isdigit():
+            return 0
+    try:
+        number = int(month)
+    except (TypeError, ValueError):
+        return 0
+    return number if 1 <= number <= 12 else 0
+
+
+class TransactionLedger:
+    """
+    This class stores every income and expense line item for the financial management application.
+
+    Transactions are kept column by column in compact `array` buffers, so appending is O(1) amortized
+    and a line item costs a few dozen bytes instead of a Python object per field. Per-month totals are
+    kept alongside the columns, together with a running total per year, and both are updated
+    incrementally on every insert so reads never have to scan the ledger. Amounts and totals are kept
+    in integer cents (see money.py), so no rounding error builds up however many transactions are
+    added; they are handed out as floats equal to cents / 100.
+
+    Every line item also has a category and any number of tags. Inverted indexes map each category,
+    tag and (year, calendar month) to its rows and keep running totals per category and tag for every
+    month and year, so breakdowns and filtered queries only touch the entries they return.
+    """
+
+    _type_codes = {"i": 0, "e": 1}
+    _type_names = ("i", "e")
+
+    def __init__(self):
+        """
+        Initializes the class with empty columns and empty running totals.
+        """
+        self._dates = array('l')       # date ordinal, 0 when the entry has no date
+        self._amounts = array('q')     # cents
+        self._types = array('b')
+        self._categories = array('l')  # index into self._category_names
+        self._years = array('l')
+        self._months = array('l')      # index into self._month_keys
+        self._tags = array('l')        # index into self._tag_sets
+
+        self._category_names = []
+        self._category_index = {}
+        self._month_keys = []
+        self._month_index = {}
+        self._month_numbers = []       # calendar month of each month key, 0 if it isn't one
+        self._tag_sets = [()]
+        self._tag_set_index = {(): 0}
+
+        # Rows of every category, tag and (year, calendar month)
+        self._rows = {"category": {}, "tag": {}, "month": {}}
+        # One {(year, month): {name: total}} and one {year: {name: total}} dictionary per transaction type
+        self._dimension_monthly = {"category": ({}, {}), "tag": ({}, {})}
+        self._dimension_yearly = {"category": ({}, {}), "tag": ({}, {})}
+
+        # One {year: {month: total}} and one {year: total} dictionary per transaction type, in cents
+        self._monthly = ({}, {})
+        self._yearly = ({}, {})
+        # The month totals as floats, kept up to date with self._monthly so they can be handed out as is
+        self._monthly_amounts = ({}, {})
+        # Totals of the transactions dropped by compact(), in the same layout
+        self._opening_monthly = ({}, {})
+        self._opening_yearly = ({}, {})
+
+    def __len__(self) -> int:
+        """
+        Returns the number of transactions in the ledger.
+        """
+        return len(self._amounts)
+
+    def __iter__(self):
+        """
+        Yields every transaction in insertion order as a `Transaction` tuple.
+        """
+        for row in range(len(self._amounts)):
+            yield self[row]
+
+    def __getitem__(self, row: int) -> Transaction:
+        """
+        Returns the transaction stored at the given position.
+
+        Args:
+            row (int): Position of the transaction in the ledger.
+
+        Returns:
+            Transaction: The stored transaction.
+        """
+        ordinal = self._dates[row]
+        return Transaction(
+            date.fromordinal(ordinal) if ordinal else None,
+            self._amounts[row] / 100,
+            self._category_names[self._categories[row]],
+            self._type_names[self._types[row]],
+            self._years[row],
+            self._month_keys[self._months[row]],
+            self._tag_sets[self._tags[row]],
+        )
+
+    def _intern(self, value, names: list, index: dict) -> int:
+        """
+        Returns the integer id of a category or month key, adding it if it is new.
+        """
+        key = index.get(value)
+        if key is None:
+            key = index[value] = len(names)
+            names.append(value)
+        return key
+
+    def append(self, type: str, amount: float, month, year: int,
+               on_date: date = None, category: str = "", tags=()) -> None:
+        """
+        Appends a transaction and adds its amount to the running month total and to the indexes.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            amount: The amount of the transaction, as a float, Money or string (see `money.to_cents`).
+            month: The month key the transaction belongs to.
+            year (int): The year the transaction belongs to.
+            on_date (date, optional): The date of the transaction.
+            category (str, optional): The category of the transaction.
+            tags (optional): Tags of the transaction, e.g. ('vacation', 'shared').
+
+        Raises:
+            ValueError: If the amount isn't a valid amount.
+        """
+        self._append(self._type_codes[type], to_cents(amount), month, year, on_date, category, tags)
+
+    def _append(self, code: int, amount: int, month, year: int, on_date: date, category: str, tags) -> None:
+        """
+        Appends a transaction of `amount` cents, see `append`.
+        """
+        row = len(self._amounts)
+        tags = tuple(sorted(set(tags))) if tags else ()
+        month_id = self._intern(month, self._month_keys, self._month_index)
+        if month_id == len(self._month_numbers):
+            self._month_numbers.append(month_number(month))
+        self._dates.append(on_date.toordinal() if on_date else 0)
+        self._amounts.append(amount)
+        self._types.append(code)
+        self._categories.append(self._intern(category, self._category_names, self._category_index))
+        self._years.append(year)
+        self._months.append(month_id)
+        self._tags.append(self._intern(tags, self._tag_sets, self._tag_set_index))
+
+        totals = self._monthly[code].setdefault(year, {})
+        total = totals[month] = totals.get(month, 0) + amount
+        self._monthly_amounts[code].setdefault(year, {})[month] = total / 100
+        self._yearly[code][year] = self._yearly[code].get(year, 0) + amount
+
+        period = (year, self._month_numbers[month_id])
+        rows = self._rows
+        rows["month"].setdefault(period, array('l')).append(row)
+        # Categories are indexed inline, as every transaction has one; tags go through _index
+        rows["category"].setdefault(category, array('l')).append(row)
+        totals = self._dimension_monthly["category"][code].setdefault(period, {})
+        totals[category] = totals.get(category, 0) + amount
+        totals = self._dimension_yearly["category"][code].setdefault(year, {})
+        totals[category] = totals.get(category, 0) + amount
+        for tag in tags:
+            self._index("tag", tag, row, code, amount, period)
+
+    def _index(self, dimension: str, name: str, row: int, code: int, amount: int, period: tuple) -> None:
+        """
+        Adds a row to the index of a tag (or category), and its amount to the tag's totals.
+        """
+        self._rows[dimension].setdefault(name, array('l')).append(row)
+        totals = self._dimension_monthly[dimension][code].setdefault(period, {})
+        totals[name] = totals.get(name, 0) + amount
+        totals = self._dimension_yearly[dimension][code].setdefault(period[0], {})
+        totals[name] = totals.get(name, 0) + amount
+
+    def adjust_to(self, type: str, value: float, month, year: int, category: str = "") -> None:
+        """
+        Appends an adjustment so that the month total becomes exactly `value`.
+
+        Earlier transactions are left untouched, so the history of the month is preserved.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            value: The new total for the month, as a float, Money or string (see `money.to_cents`).
+            month: The month key to adjust.
+            year (int): The year to adjust.
+            category (str, optional): The category recorded for the adjustment.
+
+        Raises:
+            ValueError: If the value isn't a valid amount.
+        """
+        code = self._type_codes[type]
+        value = to_cents(value)
+        current = self._monthly[code].get(year, {}).get(month)
+        if current == value:
+            return
+        self._append(code, value - (current or 0), month, year, None, category, ())
+
+    def monthly_totals(self, type: str, year: int) -> dict:
+        """
+        Returns the running {month: total} dictionary for one type and year.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int): The year to look up.
+
+        Returns:
+            dict: The month totals. This is the ledger's own dictionary and must not be modified.
+        """
+        return self._monthly_amounts[self._type_codes[type]].get(year, {})
+
+    def yearly_total(self, type: str, year: int) -> float:
+        """
+        Returns the running total of one type for a year.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int): The year to look up.
+
+        Returns:
+            float: The total, or 0.0 if the year has no transactions.
+        """
+        return self._yearly[self._type_codes[type]].get(year, 0) / 100
+
+    def recompute_totals(self) -> tuple:
+        """
+        Recomputes the month and year totals from scratch by scanning every transaction.
+
+        This is slow and only meant for checking the running totals. Transactions removed by
+        `compact` are included through their opening balances.
+
+        Returns:
+            tuple: ({year: {month: total}}, {year: total}) dictionaries for each type, in the same
+                layout (and in cents) as the running totals.
+        """
+        monthly = tuple({year: dict(totals) for year, totals in opening.items()} for opening in self._opening_monthly)
+        yearly = tuple(dict(opening) for opening in self._opening_yearly)
+        for amount, code, year, month in zip(self._amounts, self._types, self._years, self._months):
+            totals = monthly[code].setdefault(year, {})
+            month_key = self._month_keys[month]
+            totals[month_key] = totals.get(month_key, 0) + amount
+            yearly[code][year] = yearly[code].get(year, 0) + amount
+        return monthly, yearly
+
+    def compact(self) -> None:
+        """
+        Folds every transaction into opening balances and frees their rows.
+
+        The running totals, including those per category and tag, don't change, but the individual
+        line items are no longer available (`find` won't return them). This keeps memory constant when
+        streaming large imports whose totals have been saved.
+        """
+        self._opening_monthly, self._opening_yearly = self.recompute_totals()
+        for column in (self._dates, self._amounts, self._types, self._categories, self._years, self._months, self._tags):
+            del column[:]
+        self._rows = {"category": {}, "tag": {}, "month": {}}
+
+    def check_totals(self) -> None:
+        """
+        Verifies the running totals against a full recompute.
+
+        Raises:
+            ValueError: If a running month or year total doesn't match the recomputed one.
+        """
+        monthly, yearly = self.recompute_totals()
+        for code, type in enumerate(self._type_names):
+            for year, total in self._yearly[code].items():
+                if total != yearly[code].get(year, 0):
+                    raise ValueError(f"Running {type} total for {year} is {total / 100}, "
+                                     f"expected {yearly[code].get(year, 0) / 100}")
+                for month, value in self._monthly[code][year].items():
+                    expected = monthly[code].get(year, {}).get(month, 0)
+                    if value != expected or self._monthly_amounts[code][year][month] != value / 100:
+                        raise ValueError(f"Running {type} total for {month}/{year} is "
+                                         f"{self._monthly_amounts[code][year][month]}, expected {expected / 100}")
+
+    def years(self) -> list:
+        """
+        Returns the sorted list of years that have at least one transaction.
+        """
+        return sorted(set(self._monthly[0]) | set(self._monthly[1]))
+
+    def dimension_totals(self, dimension: str, type: str, year: int, month: int = None) -> dict:
+        """
+        Returns the running {name: total} dictionary of every category or tag in a year or month.
+
+        Args:
+            dimension (str): "category" or "tag".
+            type (str): "i" for income, "e" for expenses.
+            year (int): The year to look up.
+            month (int, optional): The calendar month (1-12) to look up, or None for the whole year.
+
+        Returns:
+            dict: The totals, as a new dictionary.
+        """
+        code = self._type_codes[type]
+        if month is None:
+            totals = self._dimension_yearly[dimension][code].get(year, {})
+        else:
+            totals = self._dimension_monthly[dimension][code].get((year, month), {})
+        return {name: total / 100 for name, total in totals.items()}
+
+    def find(self, category: str = None, tag: str = None, year: int = None, month: int = None) -> list:
+        """
+        Returns the transactions matching every given filter, in insertion order.
+
+        Only the rows of the most selective index are looked at: the category's, the tag's or the
+        month's rows, or those of the twelve months of the year when nothing else is given.
+
+        Args:
+            category (str, optional): Only transactions of this category.
+            tag (str, optional): Only transactions with this tag.
+            year (int, optional): Only transactions of this year.
+            month (int, optional): Only transactions of this calendar month (1-12); needs `year`.
+
+        Returns:
+            list: The matching `Transaction` tuples.
+        """
+        candidates = []
+        if category is not None:
+            candidates.append(self._rows["category"].get(category, ()))
+        if tag is not None:
+            candidates.append(self._rows["tag"].get(tag, ()))
+        if year is not None and (month is not None or not candidates):
+            by_month = self._rows["month"]
+            months = [month] if month is not None else range(13)
+            candidates.append([row for number in months for row in by_month.get((year, number), ())])
+        if not candidates:
+            rows = range(len(self._amounts))
+        else:
+            rows = sorted(min(candidates, key=len))
+
+        category_id = self._category_index.get(category)
+        matches = []
+        for row in rows:
+            if category is not None and self._categories[row] != category_id:
+                continue
+            if tag is not None and tag not in self._tag_sets[self._tags[row]]:
+                continue
+            if year is not None and self._years[row] != year:
+                continue
+            if month is not None and self._month_numbers[self._months[row]] != month:
+                continue
+            matches.append(self[row])
+        return matches
+
+    def columns(self) -> dict:
+        """
+        Returns the raw column buffers of the ledger for vectorized consumers such as `aggregation.py`.
+
+        The 'amount' column holds integer cents, the 'type' column 0 for income and 1 for expenses,
+        and 'category' and 'month' hold indexes
+        into `category_names` and `month_keys`. The buffers support the buffer protocol, so they can be
+        wrapped without copying (e.g. with `numpy.frombuffer`). They must not be modified.
+
+        Returns:
+            dict: The 'date', 'amount', 'type', 'category', 'year' and 'month' columns, plus the
+                'category_names' and 'month_keys' lookup lists.
+        """
+        return {"date": self._dates, "amount": self._amounts, "type": self._types,
+                "category": self._categories, "year": self._years, "month": self._months,
+                "category_names": self._category_names, "month_keys": self._month_keys}
+
+    def copy(self):
+        """
+        Returns an independent copy of the ledger.
+
+        Copying the columns is a plain memory copy, so this is cheap compared to aggregating them.
+        It lets another thread read the copy while this ledger keeps changing.
+
+        Returns:
+            TransactionLedger: The copy.
+        """
+        ledger = TransactionLedger()
+        ledger._dates, ledger._amounts, ledger._types = self._dates[:], self._amounts[:], self._types[:]
+        ledger._categories, ledger._years, ledger._months = self._categories[:], self._years[:], self._months[:]
+        ledger._category_names, ledger._category_index = list(self._category_names), dict(self._category_index)
+        ledger._month_keys, ledger._month_index = list(self._month_keys), dict(self._month_index)
+        ledger._tags, ledger._month_numbers = self._tags[:], list(self._month_numbers)
+        ledger._tag_sets, ledger._tag_set_index = list(self._tag_sets), dict(self._tag_set_index)
+        ledger._rows = {dimension: {key: rows[:] for key, rows in index.items()} for dimension, index in self._rows.items()}
+        for name in ("_dimension_monthly", "_dimension_yearly"):
+            setattr(ledger, name, {dimension: tuple({key: dict(totals) for key, totals in by_period.items()} for by_period in by_type)
+                                   for dimension, by_type in getattr(self, name).items()})
+        for name in ("_monthly", "_monthly_amounts", "_opening_monthly"):
+            setattr(ledger, name, tuple({year: dict(totals) for year, totals in by_year.items()} for by_year in getattr(self, name)))
+        for name in ("_yearly", "_opening_yearly"):
+            setattr(ledger, name, tuple(dict(by_year) for by_year in getattr(self, name)))
+        return ledger
+
+    def opening_totals(self, type: str) -> dict:
+        """
+        Returns the {year: {month: total}} balances of the transactions removed by `compact`.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+        """
+        return {year: {month: total / 100 for month, total in totals.items()}
+                for year, totals in self._opening_monthly[self._type_codes[type]].items()}
+
+
+
+class MoneyManagement:
+    """
+    This class manages income and expenses for the financial management application.
+
+    Every change is recorded as a line item in a `TransactionLedger`, keyed by (year, month). The
+    `income` and `expenses` attributes are read-only views of the ledger's running totals for the
+    current year, where the key is the month and the value is the amount (as a float); other years are
+    available through `get_year` and `get_range`.
+    """
+
+    def __init__(self, check_totals: bool = False, archive=None):
+        """
+        Initializes the class with an empty transaction ledger.
+
+        Args:
+            check_totals (bool, optional): If True, every yearly total that is read is first verified
+                against a full recompute of the ledger. Meant for tests.
+            archive (ColumnarArchive, optional): Past years exported with archive.py. The yearly totals
+                and the chart of a year that has no transactions in the ledger are read from it.
+        """
+        self.ledger = TransactionLedger()
+        self.check_totals = check_totals
+        self.archive = archive
+        self._changed = set()  # (type, year, month) totals that haven't been saved yet
+        self.version = 0  # bumped on every change, so caches like reports.ReportEngine know when to refresh
+        self._subscribers = []
+        self._cube = None  # (version, goals, goals version, cube) of the last `aggregate` call
+
+    def subscribe(self, callback):
+        """
+        Registers a function to be called after every change of a month total.
+
+        The function is called as `callback(type, year, month)` with the type ("i" or "e") and the
+        month that changed, so it only has to look at that month (see goal_monitor.py).
+
+        Args:
+            callback: The function to call.
+
+        Returns:
+            The callback, so it can be passed to `unsubscribe` later.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback) -> None:
+        """
+        Stops calling a function registered with `subscribe`.
+        """
+        self._subscribers.remove(callback)
+
+    def _notify(self, type: str, year: int, month) -> None:
+        for callback in self._subscribers:
+            callback(type, year, month)
+
+    @property
+    def income(self):
+        """
+        Read-only {month: total} view of the current year's income.
+        """
+        return MappingProxyType(self.ledger.monthly_totals("i", datetime.now().year))
+
+    @income.setter
+    def income(self, values: dict) -> None:
+        self._replace_values("i", values)
+
+    @property
+    def expenses(self):
+        """
+        Read-only {month: total} view of the current year's expenses.
+        """
+        return MappingProxyType(self.ledger.monthly_totals("e", datetime.now().year))
+
+    @expenses.setter
+    def expenses(self, values: dict) -> None:
+        self._replace_values("e", values)
+
+    def _replace_values(self, type: str, values: dict) -> None:
+        """
+        Sets every month of the current year to the values in `values`, and months missing from it to 0.
+        """
+        current = self.income if type == "i" else self.expenses
+        for month in list(current):
+            if month not in values:
+                self.update_values(type=type, value=0.0, month=month)
+        for month, value in values.items():
+            self.update_values(type=type, value=value, month=month)
+
+    @timed("money_management.load_data")
+    def load_data(self, data: dict, year: int = None) -> None:
+        """
+        Loads income and expense data of one year from a dictionary.
+
+        The dictionary can have keys "income" and "expenses", each containing sub-dictionaries 
+        with month (as string) keys and corresponding values (as float). Missing keys are skipped, as
+        a year saved with `DataPersistence.save_changes` may only hold some of them.
+
+        Args:
+            data (dict): Dictionary containing income and expense data.
+            year (int, optional): The year the data belongs to. Defaults to the current year.
+        """
+
+        year = year or datetime.now().year
+        income = data.get("income") or {}
+        for info in income.items():
+            self.ledger.adjust_to("i", info[1], info[0], year)
+
+        expenses = data.get("expenses") or {}
+        for info in expenses.items():
+            self.ledger.adjust_to("e", info[1], info[0], year)
+        self.version += 1
+        if self._subscribers:
+            for month in income:
+                self._notify("i", year, month)
+            for month in expenses:
+                self._notify("e", year, month)
+
+    def copy(self):
+        """
+        Returns an independent copy of the income and expenses, without any unsaved changes or
+        subscribers, that another thread can read while this object keeps changing.
+
+        Returns:
+            MoneyManagement: The copy.
+        """
+        money_management = MoneyManagement(self.check_totals, self.archive)
+        money_management.ledger = self.ledger.copy()
+        money_management.version = self.version
+        return money_management
+
+    def get_changes(self) -> dict:
+        """
+        Returns the month totals that changed since the last call, and marks them as saved.
+
+        Values loaded with `load_data` don't count as changes.
+
+        Returns:
+            dict: {year: {'income': {month: value}, 'expenses': {month: value}}} with only the
+                changed months, ready for `DataPersistence.save_changes`.
+        """
+        changes = {}
+        for type, year, month in self._changed:
+            kind = "income" if type == "i" else "expenses"
+            changes.setdefault(year, {}).setdefault(kind, {})[month] = self.ledger.monthly_totals(type, year)[month]
+        self._changed = set()
+        return changes
+
+    def has_changes(self) -> bool:
+        """
+        Returns True if there are month totals that haven't been saved yet.
+        """
+        return bool(self._changed)
+
+    def get_data(self, year: int = None):
+        """
+        Returns a tuple containing the income and expense dictionaries of a year.
+
+        Args:
+            year (int, optional): The year to return. Defaults to the current year.
+
+        Returns:
+            tuple: A tuple containing two dictionaries, the first for income and the second for expenses.
+        """
+        return dict(self.get_year("i", year)), dict(self.get_year("e", year))
+
+    def get_year(self, type: str, year: int = None):
+        """
+        Returns a read-only {month: total} view of one year's income or expenses.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int, optional): The year to return. Defaults to the current year.
+        """
+        return MappingProxyType(self.ledger.monthly_totals(type, year or datetime.now().year))
+
+    def get_range(self, type: str, start_year: int, end_year: int) -> dict:
+        """
+        Returns the month totals of every year from `start_year` to `end_year` (inclusive).
+
+        Totals are indexed by year, so only the requested years are looked at, however much history
+        has been loaded.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            start_year (int): The first year of the range.
+            end_year (int): The last year of the range.
+
+        Returns:
+            dict: {year: {month: total}} for the years in the range that have data.
+        """
+        return {year: dict(self.ledger.monthly_totals(type, year))
+                for year in range(start_year, end_year + 1) if self.ledger.monthly_totals(type, year)}
+
+    @timed("money_management.add_transaction")
+    def add_transaction(self, amount: float, type: str, on_date: date = None, category: str = "", tags=()) -> None:
+        """
+        Records a single income or expense line item and adds it to its month's total.
+
+        Args:
+            amount (float): The amount of the transaction. Money values and strings are accepted too.
+            type (str): "i" for income, "e" for expenses.
+            on_date (date, optional): The date of the transaction. Defaults to today.
+            category (str, optional): The category of the transaction (e.g. 'Groceries').
+            tags (optional): Tags of the transaction (e.g. ('vacation',)).
+
+        Raises:
+            ValueError: If the amount isn't a valid amount.
+        """
+
+        if on_date is None:
+            on_date = datetime.now().date()
+        self.ledger.append(type, amount, on_date.month, on_date.year, on_date, category, tags)
+        self._changed.add((type, on_date.year, on_date.month))
+        self.version += 1
+        if self._subscribers:
+            self._notify(type, on_date.year, on_date.month)
+
+    def get_category_totals(self, type: str, year: int = None, month=None) -> dict:
+        """
+        Returns the total of every category in a year or month.
+
+        Amounts set with `update_values` or `load_data` count as uncategorized ("").
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            year (int, optional): The year to total. Defaults to the current year.
+            month (optional): Only total this month (a number or month name).
+
+        Returns:
+            dict: {category: total} for the categories with a non-zero total.
+        """
+        totals = self.ledger.dimension_totals("category", type, year or datetime.now().year,
+                                              month_number(month) if month else None)
+        return {category: total for category, total in totals.items() if total}
+
+    def get_tag_totals(self, type: str, year: int = None, month=None) -> dict:
+        """
+        Returns the total of every tag in a year or month, like `get_category_totals`.
+
+        A transaction with several tags counts towards each of them.
+        """
+        totals = self.ledger.dimension_totals("tag", type, year or datetime.now().year,
+                                              month_number(month) if month else None)
+        return {tag: total for tag, total in totals.items() if total}
+
+    def top_categories(self, type: str, n: int = 10, year: int = None, month=None) -> list:
+        """
+        Returns the categories with the largest totals in a year or month, e.g. the top 10 expenses.
+
+        Uncategorized amounts are left out.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            n (int, optional): The number of categories to return.
+            year (int, optional): The year. Defaults to the current year.
+            month (optional): Only look at this month (a number or month name).
+
+        Returns:
+            list: (category, total) pairs, largest first.
+        """
+        totals = self.ledger.dimension_totals("category", type, year or datetime.now().year,
+                                              month_number(month) if month else None)
+        return heapq.nlargest(n, ((category, total) for category, total in totals.items() if category and total > 0),
+                              key=itemgetter(1))
+
+    def get_category_history(self, type: str, category: str, months: int = 6, year: int = None, month=None) -> list:
+        """
+        Returns a category's total for each of the last `months` months, e.g. dining over the last 6 months.
+
+        Each month is a single lookup in the ledger's category index, so this doesn't depend on how
+        many transactions there are.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            category (str): The category.
+            months (int, optional): The number of months.
+            year (int, optional): The year of the last month. Defaults to the current year.
+            month (optional): The last month. Defaults to the current month.
+
+        Returns:
+            list: (year, month, total) tuples, oldest first.
+        """
+        return self._history("category", type, category, months, year, month)
+
+    def get_tag_history(self, type: str, tag: str, months: int = 6, year: int = None, month=None) -> list:
+        """
+        Returns a tag's total for each of the last `months` months, like `get_category_history`.
+        """
+        return self._history("tag", type, tag, months, year, month)
+
+    def _history(self, dimension: str, type: str, name: str, months: int, year: int, month) -> list:
+        now = datetime.now()
+        last = (year or now.year) * 12 + (month_number(month) if month else now.month) - 1
+        history = []
+        for period in range(last - months + 1, last + 1):
+            year_, month_ = divmod(period, 12)
+            history.append((year_, month_ + 1, self.ledger.dimension_totals(dimension, type, year_, month_ + 1).get(name, 0.0)))
+        return history
+
+    def find_transactions(self, category: str = None, tag: str = None, year: int = None, month=None) -> list:
+        """
+        Returns the line items matching every given filter (see `TransactionLedger.find`).
+
+        Args:
+            category (str, optional): Only transactions of this category.
+            tag (str, optional): Only transactions with this tag.
+            year (int, optional): Only transactions of this year.
+            month (optional): Only transactions of this month (a number or month name) of `year`.
+
+        Returns:
+            list: The matching `Transaction` tuples.
+        """
+        return self.ledger.find(category, tag, year, month_number(month) if month else None)
+
+    @timed("money_management.update_values")
+    def update_values(self, type: str, value: float, month: str, year: int = None) -> None:
+        """
+        Updates the income or expense total based on the provided type, value, month and year.
+
+        The change is recorded in the ledger as an adjustment, so earlier entries for the month are kept.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            value (float): The amount to update. Money values and strings are accepted too (see `money.to_cents`).
+            month (str): The month (as a string) for which to update the value.
+            year (int, optional): The year of the month. Defaults to the current year.
+
+        Raises:
+            ValueError: If the value isn't a valid amount.
+        """
+
+        year = year or datetime.now().year
+        self.ledger.adjust_to(type, value, month, year)
+        self._changed.add((type, year, month))
+        self.version += 1
+        if self._subscribers:
+            self._notify(type, year, month)
+
+    def change_monthly_vals(self, value: str, type: str) -> None:
+        """Change the monthly income/expenses for the current month.
+
+        Args:
+            value (str): The new income value, as typed by the user (e.g. '$1,200.50', see `money.parse_amount`).
+
+        Raises:
+            ValueError: If the value isn't a valid amount.
+        """
+
+        currMonth = datetime.now().month
+        if type == "i":
+            self.update_values(type="i", value=value, month=currMonth)
+        else:
+            self.update_values(type="e", value=value, month=currMonth)
+
+    def get_monthly_vals(self, value: str, month=None, year: int = None) -> None:
+        """Get the monthly income/expenses for the current month, or for another month and year.
+
+        Args:
+            value (str): "i" for income, "e" for expenses.
+            month (optional): The month to look up. Defaults to the current month.
+            year (int, optional): The year to look up. Defaults to the current year.
+
+        Returns:
+            float: The monthly income.
+            float: The monthly expenses.
+
+        """
+        curr_month = month or datetime.now().month
+        if value == "e":
+            return self.get_year("e", year)[curr_month]
+        else:
+            return self.get_year("i", year)[curr_month]
+            
+    def is_archived(self, year: int) -> bool:
+        """
+        Returns True if a year is only available in the archive, i.e. it has no transactions in the
+        ledger but is stored in the archive passed to the constructor.
+        """
+        return self.archive is not None and year in self.archive and year not in self.ledger.years()
+
+    def get_yearly_income(self, year: int = None) -> float:
+        """Get the total income for a year.
+
+        The total is kept up to date by the ledger on every change, so this doesn't loop over the months.
+        Years that are only archived are totaled from the archive.
+
+        Args:
+            year (int, optional): The year to total. Defaults to the current year.
+
+        Returns:
+            float: The total income for the year.
+
+        """
+        year = year or datetime.now().year
+        if self.is_archived(year):
+            return self.archive.yearly_total("i", year)
+        if self.check_totals:
+            self.ledger.check_totals()
+        return self.ledger.yearly_total("i", year)
+    
+    def get_yearly_expenses(self, year: int = None) -> float:
+        """Get the total expenses for a year.
+
+        The total is kept up to date by the ledger on every change, so this doesn't loop over the months.
+        Years that are only archived are totaled from the archive.
+
+        Args:
+            year (int, optional): The year to total. Defaults to the current year.
+
+        Returns:
+            float: The total expenses for the year.
+
+        """
+        year = year or datetime.now().year
+        if self.is_archived(year):
+            return self.archive.yearly_total("e", year)
+        if self.check_totals:
+            self.ledger.check_totals()
+        return self.ledger.yearly_total("e", year)
+
+    def aggregate(self, goals=None):
+        """
+        Builds a NumPy aggregation cube of the ledger (see `aggregation.py`).
+
+        NumPy is only imported when this is called, so the rest of the class works without it.
+        The cube is reused until the income, expenses or the given goals change (see `version`), so
+        repeated rollups and variances don't rebuild it. Callers must not modify it.
+
+        Args:
+            goals (Goals, optional): Goals to include in the cube for goal variance rollups.
+
+        Returns:
+            AggregationCube: Dense (year x month x category) arrays of income, expenses and goals.
+        """
+        key = (self.version, goals, goals.version if goals is not None else None)
+        if self._cube is not None and self._cube[0] == key[0] and self._cube[1] is goals and self._cube[2] == key[2]:
+            return self._cube[3]
+        from aggregation import AggregationCube
+        cube = AggregationCube.from_ledger(self.ledger, goals)
+        self._cube = (*key, cube)
+        return cube
+
+    def get_rollup(self, type: str, period: str = "monthly", year: int = None) -> list:
+        """Get income/expense totals rolled up by month, quarter or year.
+
+        Args:
+            type (str): "i" for income, "e" for expenses.
+            period (str, optional): "monthly", "quarterly" or "yearly".
+            year (int, optional): The year for monthly and quarterly rollups. Defaults to the current year.
+
+        Returns:
+            list: 12 monthly or 4 quarterly totals, or for "yearly" one (year, total) pair per year.
+        """
+        cube = self.aggregate()
+        kind = "income" if type == "i" else "expenses"
+        year = year or datetime.now().year
+        if period == "monthly":
+            return cube.monthly(kind, year).tolist()
+        if period == "quarterly":
+            return cube.quarterly(kind, year).tolist()
+        if period == "yearly":
+            return list(zip(cube.years, cube.yearly(kind).tolist()))
+        raise ValueError(f"Unknown period '{period}'")
+    
+  
+    
+class Goals:
+    """
+    This class manages financial goals for the financial management application.
+
+    It stores monthly income and expense goals per year, as {year: {month: goal}} dictionaries where the
+    month key is the month (as a string) and the value is the goal amount (as a float). Additionally, it
+    stores yearly income and expense goals as {year: goal} dictionaries. The `income_goal`,
+    `expense_goal`, `yearly_income_goal` and `yearly_expense_goal` attributes give the current year's goals.
+    """
+
+    def __init__(self):
+        """
+        Initializes the class with empty per-year indexes for monthly and yearly income and expense goals.
+        """
+        self._monthly_goals = {"income_goal": {}, "expense_goal": {}} # Add button to allow setting a reduction in expenses
+        self._yearly_goals = {"yearly_income_goal": {}, "yearly_expense_goal": {}}
+
+        self._changed = set() # (kind, year, month) goals that haven't been saved yet, month is None for yearly goals
+        self.version = 0 # bumped on every change, like MoneyManagement.version
+        self._subscribers = []
+
+    def subscribe(self, callback):
+        """
+        Registers a function to be called after every change of a goal.
+
+        The function is called as `callback(type, year, month)` with the type ("i" or "e") of the goal,
+        like `MoneyManagement.subscribe`; month is None when a yearly goal changed.
+
+        Args:
+            callback: The function to call.
+
+        Returns:
+            The callback, so it can be passed to `unsubscribe` later.
+        """
+        self._subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, callback) -> None:
+        """
+        Stops calling a function registered with `subscribe`.
+        """
+        self._subscribers.remove(callback)
+
+    def _notify(self, type: str, year: int, month) -> None:
+        for callback in self._subscribers:
+            callback(type, year, month)
+
+    def _replace_goals(self, kind: str, values: dict) -> None:
+        year = datetime.now().year
+        previous = self._monthly_goals[kind].get(year, {})
+        self._monthly_goals[kind][year] = {month: to_amount(goal) for month, goal in values.items()}
+        # Months that were dropped have no value to save, so only the ones set here are marked unsaved
+        self._changed.update((kind, year, month) for month in values)
+        self.version += 1
+        for month in set(previous) | set(values):
+            self._notify("i" if kind == "income_goal" else "e", year, month)
+
+    def _replace_yearly_goal(self, kind: str, goal: float) -> None:
+        year = datetime.now().year
+        self._yearly_goals[kind][year] = to_amount(goal)
+        self._changed.add((kind, year, None))
+        self.version += 1
+        self._notify("i" if kind == "yearly_income_goal" else "e", year, None)
+
+    @property
+    def income_goal(self):
+        """
+        Read-only {month: goal} view of the current year's monthly income goals.
+        """
+        return self.get_monthly_goals("i")
+
+    @income_goal.setter
+    def income_goal(self, values: dict) -> None:
+        self._replace_goals("income_goal", values)
+
+    @property
+    def expense_goal(self):
+        """
+        Read-only {month: goal} view of the current year's monthly expense goals.
+        """
+        return self.get_monthly_goals("e")
+
+    @expense_goal.setter
+    def expense_goal(self, values: dict) -> None:
+        self._replace_goals("expense_goal", values)
+
+    @property
+    def yearly_income_goal(self) -> float:
+        """
+        The current year's income goal, 0.0 if none was set.
+        """
+        return self._yearly_goals["yearly_income_goal"].get(datetime.now().year, 0.0)
+
+    @yearly_income_goal.setter
+    def yearly_income_goal(self, goal: float) -> None:
+        self._replace_yearly_goal("yearly_income_goal", goal)
+
+    @property
+    def yearly_expense_goal(self) -> float:
+        """
+        The current year's expense goal, 0.0 if none was set.
+        """
+        return self._yearly_goals["yearly_expense_goal"].get(datetime.now().year, 0.0)
+
+    @yearly_expense_goal.setter
+    def yearly_expense_goal(self, goal: float) -> None:
+        self._replace_yearly_goal("yearly_expense_goal", goal)
+
+    @timed("goals.load_data")
+    def load_data(self, data, year: int = None) -> None:
+        """
+        Loads income and expense goal data of one year from a dictionary.
+
+        The dictionary can have keys "income_goal" and "expense_goal", each containing sub-dictionaries 
+        with month (as string) keys and corresponding goal values (as float). It can also optionally have 
+        keys "yearly_income_goal" and "yearly_expense_goal" for yearly goals. Missing keys are skipped.
+
+        Args:
+            data (dict): Dictionary containing income and expense goal data.
+            year (int, optional): The year the goals belong to. Defaults to the current year.
+        """
+
+        year = year or datetime.now().year
+        income = data.get("income_goal") or {}
+        for info in income.items():
+            self._monthly_goals["income_goal"].setdefault(year, {})[info[0]] = to_amount(info[1])
+        
+        expense = data.get("expense_goal") or {}
+        for info in expense.items():
+            self._monthly_goals["expense_goal"].setdefault(year, {})[info[0]] = to_amount(info[1])
+
+        #Get and set yearly data
+        yearly_income = data.get("yearly_income_goal")
+        yearly_expense = data.get("yearly_expense_goal")
+
+        if yearly_income is not None:
+            self._yearly_goals["yearly_income_goal"][year] = to_amount(yearly_income)
+        if yearly_expense is not None:
+            self._yearly_goals["yearly_expense_goal"][year] = to_amount(yearly_expense)
+        self.version += 1
+        if self._subscribers:
+            for month in income:
+                self._notify("i", year, month)
+            for month in expense:
+                self._notify("e", year, month)
+            if yearly_income is not None:
+                self._notify("i", year, None)
+            if yearly_expense is not None:
+                self._notify("e", year, None)
+
+    def get_data(self, year: int = None) -> None:
+        """
+        Returns a tuple containing all income and expense goal data of a year.
+
+        Args:
+            year (int, optional): The year to return. Defaults to the current year.
+
+        Returns:
+            tuple: A tuple containing four elements:
+                - income_goal (dict): Dictionary of monthly income goals (month: goal amount).
+                - expense_goal (dict): Dictionary of monthly expense goals (month: goal amount).
+                - yearly_income_goal (float): The yearly income goal.
+                - yearly_expense_goal (float): The yearly expense goal.
+        """
+
+        year = year or datetime.now().year
+        return (dict(self.get_monthly_goals("i", year)), dict(self.get_monthly_goals("e", year)),
+                self.get_yearly_goal("i", year), self.get_yearly_goal("e", year))
+
+    def get_monthly_goals(self, type: str, year: int = None):
+        """
+        Returns a read-only {month: goal} view of one year's monthly income or expense goals.
+
+        Args:
+            type (str): Specifies whether income[i] or expense[e]
+            year (int, optional): The year to return. Defaults to the current year.
+        """
+        kind = "income_goal" if type.lower() == "i" else "expense_goal"
+        return MappingProxyType(self._monthly_goals[kind].get(year or datetime.now().year, {}))
+
+    def get_range(self, type: str, start_year: int, end_year: int) -> dict:
+        """
+        Returns the monthly goals of every year from `start_year` to `end_year` (inclusive).
+
+        Goals are indexed by year, so only the requested years are looked at.
+
+        Args:
+            type (str): Specifies whether income[i] or expense[e]
+            start_year (int): The first year of the range.
+            end_year (int): The last year of the range.
+
+        Returns:
+            dict: {year: {month: goal}} for the years in the range that have goals.
+        """
+        return {year: dict(self.get_monthly_goals(type, year))
+                for year in range(start_year, end_year + 1) if self.get_monthly_goals(type, year)}
+
+    def years(self) -> list:
+        """
+        Returns the sorted list of years that have at least one goal.
+        """
+        years = set()
+        for goals in self._monthly_goals.values():
+            years.update(year for year, months in goals.items() if months)
+        for goals in self._yearly_goals.values():
+            years.update(goals)
+        return sorted(years)
+
+    def copy(self):
+        """
+        Returns an independent copy of the goals, without any unsaved changes.
+
+        Returns:
+            Goals: The copy.
+        """
+        goals = Goals()
+        goals._monthly_goals = {kind: {year: dict(months) for year, months in by_year.items()}
+                                for kind, by_year in self._monthly_goals.items()}
+        goals._yearly_goals = {kind: dict(by_year) for kind, by_year in self._yearly_goals.items()}
+        goals.version = self.version
+        return goals
+
+    def get_changes(self) -> dict:
+        """
+        Returns the goals that changed since the last call, and marks them as saved.
+
+        Goals loaded with `load_data` don't count as changes.
+
+        Returns:
+            dict: {year: data} where data only holds the changed monthly goals (under 'income_goal'
+                and 'expense_goal') and yearly goals, ready for `DataPersistence.save_changes`.
+        """
+        changes = {}
+        for kind, year, month in self._changed:
+            data = changes.setdefault(year, {})
+            if month is None:
+                data[kind] = self._yearly_goals[kind][year]
+            else:
+                data.setdefault(kind, {})[month] = self._monthly_goals[kind][year][month]
+        self._changed = set()
+        return changes
+
+    def has_changes(self) -> bool:
+        """
+        Returns True if there are goals that haven't been saved yet.
+        """
+        return bool(self._changed)
+    
+
+    @timed("goals.update_monthly_goal")
+    def update_monthly_goal(self, goal: str, type: str, month: str = None, year: int = None) -> None:
+        """Update the monthly income goal for the current month.
+
+        Args:
+            goal (str): The new monthly income goal, e.g. '$1,200.50' (see `money.parse_amount`), or a number.
+            type (str): Specifies whether income[i] or expense[e]
+            month (str, optional): Specifies the month to update the goal for (e.g., 'January', 'February', etc.).
+                If not provided, the current month is used.
+            year (int, optional): Specifies the year of the month. If not provided, the current year is used.
+
+        Raises:
+            ValueError: If the goal isn't a valid amount.
+        """
+
+        currMonth = datetime.now().month
+        if month:
+            month_num = month
+        else:
+            month_num = currMonth
+        year = year or datetime.now().year
+        kind = "income_goal" if type == "i" else "expense_goal"
+        self._monthly_goals[kind].setdefault(year, {})[month_num] = to_amount(goal)
+        self._changed.add((kind, year, month_num))
+        self.version += 1
+        if self._subscribers:
+            self._notify("i" if kind == "income_goal" else "e", year, month_num)
+    
+
+    def get_monthly_goal(self, type: str, month=None, year: int = None) -> float:
+        """Get the monthly income goal for the current month, or for another month and year.
+        Args:
+            type (str): Specifies whether income[i] or expense[e]
+            month (optional): The month to look up. Defaults to the current month.
+            year (int, optional): The year to look up. Defaults to the current year.
+
+        Returns:
+            float: The monthly income goal.
+            float: The monthly expense goal.
+        """
+        
+        currMonth = month or datetime.now().month
+        return self.get_monthly_goals(type, year)[currMonth]
+    
+    @timed("goals.update_yearly_goal")
+    def update_yearly_goal(self, goal: str, type: str, year: int = None) -> None:
+        """Update the yearly income goal.
+
+        Args:
+            goal (str): The new yearly income goal, e.g. '$15,000' (see `money.parse_amount`), or a number.
+            type (str): Specifies whether income[i] or expense[e]
+            year (int, optional): The year of the goal. Defaults to the current year.
+
+        Raises:
+            ValueError: If the goal isn't a valid amount.
+        """
+
+        year = year or datetime.now().year
+        kind = "yearly_income_goal" if type.lower() == "i" else "yearly_expense_goal"
+        self._yearly_goals[kind][year] = to_amount(goal)
+        self._changed.add((kind, year, None))
+        self.version += 1
+        if self._subscribers:
+            self._notify("i" if type.lower() == "i" else "e", year, None)
+    
+    def get_yearly_goal(self, type: str, year: int = None) -> float:
+        """Get the yearly income goal.
+
+        Args:
+            type (str): Specifies whether income[i] or expense[e]
+            year (int, optional): The year of the goal. Defaults to the current year.
+
+        Returns:
+            float: The yearly income goal.
+        """
+
+        year = year or datetime.now().year
+        if type.lower() == "i":
+            return self._yearly_goals["yearly_income_goal"].get(year, 0.0)
+        else:
+            return self._yearly_goals["yearly_expense_goal"].get(year, 0.0)
+
+    def get_variance(self, money_management, year: int = None) -> dict:
+        """Get how far each month's income and expenses are from their goals.
+
+        Positive values mean the goal was beaten: income above the income goal, or expenses below it.
+
+        Args:
+            money_management (MoneyManagement): The income and expenses to compare.
+            year (int, optional): The year to compare. Defaults to the current year.
+
+        Returns:
+            dict: {'income': list, 'expenses': list} with twelve monthly variances each.
+        """
+        year = year or datetime.now().year
+        cube = money_management.aggregate(self)
+        return {kind: variance.tolist() for kind, variance in cube.goal_variance(year).items()}
@@ -0,0 +1,337 @@
+"""
+Exact money amounts for the financial management application.
+
+Amounts typed into the GUI, posted to the API or read from bank statements are parsed into integer
+cents instead of going through `float()`, so "$1,200.50", "1.200,50 €" and "(45.00)" are accepted
+and totals built from many amounts don't pick up binary rounding errors:
+
+    parse_amount("$1,200.50")              # 120050
+    parse_amount("1 200,50", "fr_FR")      # 120050
+    Money("19.99") * 3                     # Money('59.97')
+"""
+import numbers
+import re
+from array import array
+from decimal import Decimal, ROUND_HALF_UP
+from functools import total_ordering
+
+
+# (decimal separator, grouping separators) of the locales amounts can be parsed in
+LOCALES = {
+    "en_US": (".", ","),
+    "en_GB": (".", ","),
+    "ja_JP": (".", ","),
+    "de_DE": (",", "."),
+    "es_ES": (",", "."),
+    "it_IT": (",", "."),
+    "nl_NL": (",", "."),
+    "pt_BR": (",", "."),
+    "fr_FR": (",", "\u00a0\u202f "),
+    "sv_SE": (",", "\u00a0\u202f "),
+    "de_CH": (".", "'’"),
+}
+
+# Amounts such as "1200.5", "-45" or "-$1,079.43", the forms almost every amount has, skip the general parser
+_simple = re.compile(r"([-+]?)\$?(\d{1,3}(?:,\d{3})+|\d+)(?:\.(\d\d?))?").fullmatch
+_SIMPLE_LOCALES = {None} | {locale for locale, (decimal, grouping) in LOCALES.items() if decimal == "." and "," in grouping}
+# Finds the first line of a newline-separated batch that isn't such an amount with at most 13 digits
+# before the point, which `float` reads closely enough for amount * 100 to round to the exact cents.
+# Searching line by line, rather than matching the whole batch with a repeated group, keeps no
+# backtracking points between amounts.
+_simple_batch_error = re.compile(r"^(?![-+]?\$?(?:\d{1,3}(?:,\d{3}){1,3}|\d{1,13})(?:\.\d\d?)?$)", re.MULTILINE).search
+
+_CURRENCY = r"[A-Z]{3}|[A-Z]{0,2}[$€£¥₹₩₽₺₪฿₫₴₦]|kr\.?|Fr\.|zł|Rs\.?"
+_amount = re.compile(rf"""\s*
+    (?P<open>\()?\s*
+    (?P<sign>[-+−])?\s*
+    (?:(?P<prefix>{_CURRENCY})\s*)?
+    (?P<inner_sign>[-+−])?\s*
+    (?P<number>[.,]?\d[\d.,'’\u00a0\u202f ]*?)\s*
+    (?:(?P<suffix>{_CURRENCY})\s*)?
+    (?P<trailing_sign>-)?\s*
+    (?P<close>\))?\s*""", re.VERBOSE).fullmatch
+_SEPARATORS = ".,'’\u00a0\u202f "
+
+
+def _invalid(text) -> ValueError:
+    return ValueError(f"Invalid amount {text!r}")
+
+
+def _number_cents(number: str, decimal: str, grouping: str, text: str) -> int:
+    """
+    Returns the cents of an unsigned number once its decimal separator is known, checking that the
+    grouping separators split the whole part into groups of three digits.
+    """
+    if decimal and number.count(decimal) > 1:
+        raise _invalid(text)
+    whole, _, fraction = number.rpartition(decimal) if decimal and decimal in number else (number, "", "")
+    if not fraction.isdigit() and fraction:
+        raise _invalid(text)
+    separators = {character for character in whole if not character.isdigit()}
+    if separators:
+        if len(separators) > 1 or not separators <= set(grouping):
+            raise _invalid(text)
+        groups = whole.split(separators.pop())
+        if not 1 <= len(groups[0]) <= 3 or any(len(group) != 3 for group in groups[1:]) \
+                or not all(group.isdigit() for group in groups):
+            raise _invalid(text)
+        whole = "".join(groups)
+    elif not whole:
+        if not fraction:
+            raise _invalid(text)
+        whole = "0"
+    cents = int(whole + fraction[:2].ljust(2, "0"))
+    if fraction[2:3] >= "5":
+        cents += 1  # halves are rounded away from zero
+    return cents
+
+
+def parse_amount(text: str, locale: str = None) -> int:
+    """
+    Parses a money amount typed by a user or read from a file into integer cents.
+
+    Currency symbols and codes ('$', '€', 'USD', 'CHF'...), thousands separators and negative amounts
+    written as '-12', '12-' or '(12)' are accepted. Without a locale the decimal separator is inferred:
+    when both '.' and ',' appear the last one is the decimal separator, a single ',' followed by
+    exactly three digits groups thousands ('1,200'), and a single '.' is always a decimal point.
+    Amounts with more than two decimals are rounded to the nearest cent, halves away from zero.
+
+    Args:
+        text (str): The amount, e.g. '1200.50', '$1,200.50' or '1.200,50 €'.
+        locale (str, optional): A key of `LOCALES` (e.g. 'de_DE') giving the decimal and grouping
+            separators, for amounts like '1.200' that are ambiguous otherwise.
+
+    Returns:
+        int: The amount in cents.
+
+    Raises:
+        ValueError: If the text isn't an amount, or the locale is unknown.
+    """
+    if locale in _SIMPLE_LOCALES:
+        match = _simple(text)
+        if match is not None:
+            sign, whole, fraction = match.groups()
+            if "," in whole:
+                whole = whole.replace(",", "")
+            cents = int(whole + fraction.ljust(2, "0")) if fraction else int(whole) * 100
+            return -cents if sign == "-" else cents
+
+    match = _amount(text) if isinstance(text, str) else None
+    if match is None or bool(match["open"]) != bool(match["close"]) or (match["prefix"] and match["suffix"]):
+        raise _invalid(text)
+    signs = [sign for sign in (match["sign"], match["inner_sign"], match["trailing_sign"]) if sign]
+    if len(signs) > 1 or (signs and match["open"]):
+        raise _invalid(text)
+    number = match["number"]
+
+    if locale is not None:
+        if locale not in LOCALES:
+            raise ValueError(f"Unknown locale '{locale}'")
+        decimal, grouping = LOCALES[locale]
+    else:
+        grouping = _SEPARATORS
+        last_point, last_comma = number.rfind("."), number.rfind(",")
+        if last_point >= 0 and last_comma >= 0:
+            decimal = "." if last_point > last_comma else ","
+        elif last_comma >= 0:
+            decimal = "," if number.count(",") == 1 and len(number) - last_comma - 1 != 3 else ""
+        elif last_point >= 0:
+            decimal = "." if number.count(".") == 1 else ""
+        else:
+            decimal = ""
+        grouping = grouping.replace(decimal, "") if decimal else grouping
+
+    cents = _number_cents(number, decimal, grouping, text)
+    return -cents if match["open"] or (signs and signs[0] != "+") else cents
+
+
+def parse_amounts(texts, locale: str = None) -> array:
+    """
+    Parses many amounts at once, e.g. a column of a bank statement.
+
+    When every amount has one of the common forms like '-45.5' or '$1,079.43', the whole batch is
+    checked with one regular expression and converted with `float`, which is exact for such amounts;
+    otherwise every amount goes through `parse_amount`.
+
+    Args:
+        texts: Iterable of amounts as accepted by `parse_amount`.
+        locale (str, optional): The locale of every amount (see `parse_amount`).
+
+    Returns:
+        array: The amounts in cents, as an `array('q')`.
+
+    Raises:
+        ValueError: If one of the texts isn't an amount.
+    """
+    if not isinstance(texts, (list, tuple)):
+        texts = list(texts)
+    if locale in _SIMPLE_LOCALES:
+        batch = "\n".join(texts)
+        if batch.count("\n") == len(texts) - 1 and _simple_batch_error(batch) is None:
+            if "$" in batch or "," in batch:
+                texts = batch.replace("$", "").replace(",", "").split("\n")
+            return array('q', map(round, map((100.0).__mul__, map(float, texts))))
+    if locale is None:
+        return array('q', map(parse_amount, texts))
+    return array('q', (parse_amount(text, locale) for text in texts))
+
+
+def to_cents(amount, locale: str = None) -> int:
+    """
+    Returns an amount in cents, whatever form it was given in.
+
+    Floats and Decimals are rounded to the nearest cent, strings are parsed with `parse_amount`.
+
+    Args:
+        amount: A float, int, Decimal, Money or str.
+        locale (str, optional): The locale of string amounts (see `parse_amount`).
+
+    Returns:
+        int: The amount in cents.
+
+    Raises:
+        ValueError: If the amount is a string that isn't an amount, or isn't finite.
+        TypeError: If the amount isn't a number or a string.
+    """
+    if isinstance(amount, float):
+        try:
+            return round(amount * 100)
+        except OverflowError:
+            raise _invalid(amount) from None
+    if isinstance(amount, str):
+        return parse_amount(amount, locale)
+    if isinstance(amount, Money):
+        return amount.cents
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, Decimal):
+        if not amount.is_finite():
+            raise _invalid(amount)
+        return int((amount * 100).to_integral_value(ROUND_HALF_UP))
+    if isinstance(amount, numbers.Real):
+        return to_cents(float(amount))
+    raise TypeError(f"Invalid amount {amount!r}")
+
+
+def to_amount(amount, locale: str = None) -> float:
+    """
+    Returns an amount as the float the rest of the application stores, rounded to the cent.
+
+    Args:
+        amount: A float, int, Decimal, Money or str (see `to_cents`).
+        locale (str, optional): The locale of string amounts (see `parse_amount`).
+
+    Returns:
+        float: The amount, exactly cents / 100.
+
+    Raises:
+        ValueError: If the amount isn't a valid amount.
+        TypeError: If the amount isn't a number or a string.
+    """
+    return to_cents(amount, locale) / 100
+
+
+@total_ordering
+class Money:
+    """
+    This class is an exact money amount, stored as integer cents.
+
+    Money values can be added, subtracted, compared and multiplied by numbers (rounding to the cent),
+    and are accepted everywhere an amount is, e.g. `MoneyManagement.add_transaction(Money("$4.50"), "e")`.
+    `float(money)` gives the amount in the units the rest of the application uses.
+    """
+
+    __slots__ = ("cents",)
+
+    def __init__(self, amount=0, locale: str = None):
+        """
+        Initializes the amount.
+
+        Args:
+            amount (optional): A float, int, Decimal, Money or str (see `to_cents`). Defaults to 0.
+            locale (str, optional): The locale of a string amount (see `parse_amount`).
+
+        Raises:
+            ValueError: If the amount isn't a valid amount.
+            TypeError: If the amount isn't a number or a string.
+        """
+        self.cents = to_cents(amount, locale)
+
+    @classmethod
+    def from_cents(cls, cents: int):
+        """
+        Returns the Money value of an integer number of cents.
+        """
+        money = cls.__new__(cls)
+        money.cents = int(cents)
+        return money
+
+    def __repr__(self) -> str:
+        return f"Money('{self}')"
+
+    def __str__(self) -> str:
+        sign = "-" if self.cents < 0 else ""
+        whole, cents = divmod(abs(self.cents), 100)
+        return f"{sign}{whole}.{cents:02d}"
+
+    def format(self, locale: str = "en_US", symbol: str = "$") -> str:
+        """
+        Returns the amount for display, e.g. '$1,200.50', or '1.200,50' for de_DE without a symbol.
+
+        Args:
+            locale (str, optional): A key of `LOCALES` giving the separators. Defaults to 'en_US'.
+            symbol (str, optional): Currency symbol put in front of the number. Defaults to '$'.
+        """
+        decimal, grouping = LOCALES[locale]
+        sign = "-" if self.cents < 0 else ""
+        whole, cents = divmod(abs(self.cents), 100)
+        grouped = f"{whole:,}".replace(",", grouping[0])
+        return f"{sign}{symbol}{grouped}{decimal}{cents:02d}"
+
+    def __float__(self) -> float:
+        return self.cents / 100
+
+    def __bool__(self) -> bool:
+        return self.cents != 0
+
+    def __hash__(self) -> int:
+        return hash(self.cents)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Money):
+            return self.cents == other.cents
+        return NotImplemented
+
+    def __lt__(self, other) -> bool:
+        if isinstance(other, Money):
+            return self.cents < other.cents
+        return NotImplemented
+
+    def __add__(self, other):
+        if isinstance(other, Money):
+            return Money.from_cents(self.cents + other.cents)
+        if other == 0:  # so sum() works without a start value
+            return self
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Money):
+            return Money.from_cents(self.cents - other.cents)
+        return NotImplemented
+
+    def __neg__(self):
+        return Money.from_cents(-self.cents)
+
+    def __abs__(self):
+        return Money.from_cents(abs(self.cents))
+
+    def __mul__(self, factor):
+        if isinstance(factor, int):
+            return Money.from_cents(self.cents * factor)
+        if isinstance(factor, (float, Decimal)):
+            return Money.from_cents(to_cents(Decimal(self.cents) * Decimal(factor) / 100))
+        return NotImplemented
+
+    __rmul__ = __mul__
@@ -0,0 +1,1494 @@
+import bisect
+import contextlib
+import dbm
+import os
+import pickle
+import shelve
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+
+import instrumentation
+from instrumentation import timed
+from money import to_amount
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+MONTHLY_KINDS = ('income', 'expenses', 'income_goal', 'expense_goal')
+YEARLY_KINDS = ('yearly_income_goal', 'yearly_expense_goal')
+SHARED_ENV_VAR = "FINANCIAL_TOOL_SHARED"
+
+
+def shared_requested(flag: bool = False) -> bool:
+    """
+    Returns whether shared mode (see ShelveBackend) was asked for, with a command line flag or the
+    FINANCIAL_TOOL_SHARED environment variable (set to anything but '0').
+
+    Args:
+        flag (bool, optional): The value of a `--shared` command line flag.
+    """
+    return flag or os.environ.get(SHARED_ENV_VAR, "") not in ("", "0")
+
+
+class StorageError(Exception):
+    """
+    Raised by a storage backend when the underlying file or database can't be used.
+    """
+
+
+
+class StorageBackend:
+    """
+    This class defines the interface shared by the storage backends used by DataPersistence.
+
+    Data is exchanged in the same layout `DataPersistence.update_database` builds: a dictionary with
+    optional keys 'income', 'expenses', 'income_goal' and 'expense_goal' (each a {month: value}
+    dictionary) and 'yearly_income_goal' and 'yearly_expense_goal' (each a float).
+
+    Backends with `shared` set may be written by other processes at the same time; they keep a
+    version per year, and DataPersistence uses it to merge its writes with theirs.
+    """
+    shared = False
+
+    def read(self, year: int) -> dict:
+        """
+        Returns all stored data for a year.
+
+        Args:
+            year (int): The year to read.
+
+        Returns:
+            dict: The stored data, or an empty dictionary if there is none.
+        """
+        raise NotImplementedError
+
+    def years(self) -> list:
+        """
+        Returns the sorted list of years that have stored data.
+        """
+        raise NotImplementedError
+
+    def read_range(self, start_year: int, end_year: int) -> dict:
+        """
+        Returns the stored data of every year from `start_year` to `end_year` (inclusive).
+
+        Only the requested years are read, however many years are stored.
+
+        Args:
+            start_year (int): The first year of the range.
+            end_year (int): The last year of the range.
+
+        Returns:
+            dict: {year: data} for the years in the range that have data.
+        """
+        years = self.years()
+        selected = years[bisect.bisect_left(years, start_year):bisect.bisect_right(years, end_year)]
+        return {year: self.read(year) for year in selected}
+
+    def read_month(self, year: int, month) -> dict:
+        """
+        Returns the stored values of a single month.
+
+        Args:
+            year (int): The year to read.
+            month: The month key to read.
+
+        Returns:
+            dict: A {kind: value} dictionary, e.g. {'income': 1000.0, 'expenses': 400.0}.
+        """
+        data = self.read(year)
+        return {kind: data[kind][month] for kind in MONTHLY_KINDS if month in data.get(kind, {})}
+
+    def write(self, data: dict, year: int) -> None:
+        """
+        Stores data for a year. Kinds present in `data` replace the stored ones, other kinds are kept.
+
+        Args:
+            data (dict): The data to store.
+            year (int): The year the data belongs to.
+        """
+        raise NotImplementedError
+
+    def update(self, data: dict, year: int) -> None:
+        """
+        Merges changed values for a year into the stored data, month by month.
+
+        Unlike `write`, months that are missing from `data` are left as they are.
+
+        Args:
+            data (dict): The changed values, in the same layout as for `write`.
+            year (int): The year the values belong to.
+        """
+        stored = self.read(year)
+        merged = {}
+        for kind, value in data.items():
+            if kind in MONTHLY_KINDS:
+                merged[kind] = {**stored.get(kind, {}), **value}
+            else:
+                merged[kind] = value
+        self.write(merged, year)
+
+    def version(self, year: int) -> int:
+        """
+        Returns a number that changes whenever the year's data is written.
+
+        Backends that aren't `shared` don't track versions and always return 0.
+        """
+        return 0
+
+    def read_versioned(self, year: int) -> tuple:
+        """
+        Returns all stored data for a year together with its version, read at the same time.
+
+        Returns:
+            tuple: (data, version)
+        """
+        version = self.version(year)
+        return self.read(year), version
+
+    def compare_and_write(self, data: dict, year: int, version: int):
+        """
+        Stores data for a year as `write` does, but only if the year is still at `version`.
+
+        Args:
+            data (dict): The data to store.
+            year (int): The year the data belongs to.
+            version (int): The version the data is based on, from `read_versioned`.
+
+        Returns:
+            int: The new version, or None if the year was written in the meantime and nothing was stored.
+        """
+        if self.version(year) != version:
+            return None
+        self.write(data, year)
+        return self.version(year)
+
+    def flush(self) -> None:
+        """
+        Makes sure everything written so far has reached the disk.
+        """
+
+    def close(self) -> None:
+        """
+        Flushes and releases any resources held by the backend.
+        """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+
+class _CountingStore:
+    """
+    Wraps the dbm file under a shelf and counts the pickled bytes going through it.
+    """
+
+    def __init__(self, store):
+        self._store = store
+
+    def __getitem__(self, key):
+        value = self._store[key]
+        instrumentation.count_io(read=len(value), fallback="shelve")
+        return value
+
+    def __setitem__(self, key, value):
+        instrumentation.count_io(written=len(value), fallback="shelve")
+        self._store[key] = value
+
+    def __delitem__(self, key):
+        del self._store[key]
+
+    def __contains__(self, key):
+        return key in self._store
+
+    def __iter__(self):
+        return iter(self._store)
+
+    def __len__(self):
+        return len(self._store)
+
+    def __getattr__(self, name):
+        return getattr(self._store, name)
+
+
+def _counted(shelf):
+    """
+    Returns a shelf whose file I/O is counted while instrumentation is on.
+    """
+    if instrumentation.enabled:
+        shelf.dict = _CountingStore(shelf.dict)
+    return shelf
+
+
+class ShelveBackend(StorageBackend):
+    """
+    This class stores the data of each year as a dictionary under its own 'year:<year>' key of a
+    `shelve` file, with a sorted list of the stored years under the 'years' key as an index, so a year
+    can be read without unpickling the others.
+
+    Files written by older versions keep everything under a single 'data' key; that data is moved to
+    the current year when the file is opened. The shelve file is opened once, with `writeback=True`, and kept open until `close` is called.
+    Writes only change the cached dictionary; it is written to the file on `flush`, on `close`, or
+    after every `sync_every` writes, so frequent updates are coalesced into one physical write.
+
+    That cache is private to the process, so with `shared=True` the backend can be used by several
+    processes at once (e.g. the GUI and a script) instead: every call opens the shelve file under a
+    lock on '<filename>.lock', shared for reads and exclusive for writes, and closes it again before
+    the lock is released, so each write reads and changes the latest stored data. Every write then
+    also increments the year's version under 'version:<year>' (see `compare_and_write`). All processes
+    using the file have to open it in shared mode.
+    """
+
+    def __init__(self, filename: str, sync_every: int = 100, shared: bool = False):
+        """
+        Opens the shelve file in create mode ('c') and makes sure the 'years' index exists.
+
+        With instrumentation on, the pickled bytes loaded from and stored in the file are counted
+        (see `instrumentation.count_io`).
+
+        Args:
+            filename (str): The name of the shelve file.
+            sync_every (int, optional): Number of writes after which the file is synced
+                automatically. 0 only syncs on `flush` and `close`.
+            shared (bool, optional): If True, lock the file for every call instead of keeping it
+                open, so several processes can use it at the same time. Needs `fcntl`; where it is
+                missing (Windows) a warning is printed and the file is opened for this process only.
+
+        Raises:
+            StorageError: If the file can't be opened or locked.
+        """
+        if shared and fcntl is None:
+            print("Warning: shared access needs file locks (fcntl), which this platform doesn't have; "
+                  "other programs must not use the file at the same time")
+            shared = False
+        self.filename = filename
+        self.sync_every = sync_every
+        self.shared = shared
+        self._unsynced = 0
+        self._lock = threading.RLock()
+        self._db = None
+        self._lock_file = None
+        if shared:
+            try:
+                self._lock_file = open(f"{filename}.lock", "ab")
+            except OSError as e:
+                raise StorageError(e) from e
+        else:
+            try:
+                self._db = _counted(shelve.open(self.filename, 'c', writeback=True))
+            except dbm.error as e:
+                raise StorageError(e) from e
+        with self._opened(exclusive=True) as db:
+            db.setdefault('years', [])
+            if 'data' in db:
+                legacy = db.pop('data')
+                if legacy:
+                    self._put(db, legacy, datetime.now().year, replace=True)
+
+    @contextlib.contextmanager
+    def _opened(self, exclusive: bool = False):
+        """
+        Context manager that yields the open shelf, locked for this call in shared mode.
+
+        Args:
+            exclusive (bool, optional): True for calls that write.
+        """
+        with self._lock:
+            try:
+                if not self.shared:
+                    yield self._db
+                    return
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                try:
+                    db = _counted(shelve.open(self.filename, 'c' if exclusive else 'r'))
+                    try:
+                        yield db
+                    finally:
+                        db.close()
+                finally:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+            except (*dbm.error, ValueError) as e:
+                raise StorageError(e) from e
+
+    def years(self) -> list:
+        with self._opened() as db:
+            return list(db['years'])
+
+    def read(self, year: int = None) -> dict:
+        return self.read_versioned(year)[0]
+
+    def read_versioned(self, year: int = None) -> tuple:
+        year = year or datetime.now().year
+        with self._opened() as db:
+            return self._copy(db.get(f'year:{year}', {})), db.get(f'version:{year}', 0)
+
+    def read_range(self, start_year: int, end_year: int) -> dict:
+        with self._opened() as db:
+            years = db['years']
+            selected = years[bisect.bisect_left(years, start_year):bisect.bisect_right(years, end_year)]
+            return {year: self._copy(db.get(f'year:{year}', {})) for year in selected}
+
+    def version(self, year: int = None) -> int:
+        with self._opened() as db:
+            return db.get(f'version:{year or datetime.now().year}', 0)
+
+    @staticmethod
+    def _copy(data: dict) -> dict:
+        # Copy so callers can't modify the cached dictionary behind the shelf's back
+        return {kind: dict(value) if isinstance(value, dict) else value for kind, value in data.items()}
+
+    def write(self, data: dict, year: int = None) -> None:
+        with self._opened(exclusive=True) as db:
+            self._put(db, data, year, replace=True)
+
+    def update(self, data: dict, year: int = None) -> None:
+        with self._opened(exclusive=True) as db:
+            self._put(db, data, year, replace=False)
+
+    def compare_and_write(self, data: dict, year: int, version: int):
+        with self._opened(exclusive=True) as db:
+            if db.get(f'version:{year}', 0) != version:
+                return None
+            return self._put(db, data, year, replace=True)
+
+    def _put(self, db, data: dict, year: int = None, replace: bool = True) -> int:
+        """
+        Stores data for a year in the open shelf and returns the year's new version.
+
+        Adds the year to the index if it is new. With `replace`, kinds in `data` replace the stored
+        ones (as in `write`); otherwise months are merged into them (as in `update`).
+        """
+        year = year or datetime.now().year
+        key = f'year:{year}'
+        if key not in db:
+            db[key] = {}
+            years = db['years']
+            bisect.insort(years, year)
+            db['years'] = years
+        # With writeback the cached dictionary is changed in place and written on sync; otherwise
+        # the changed dictionary has to be stored again
+        stored = db[key]
+        for kind, value in data.items():
+            if replace or kind not in MONTHLY_KINDS:
+                stored[kind] = dict(value) if isinstance(value, dict) else value
+            else:
+                stored.setdefault(kind, {}).update(value)
+        self._written()
+        if not self.shared:
+            return 0
+        db[key] = stored
+        version = db[f'version:{year}'] = db.get(f'version:{year}', 0) + 1
+        return version
+
+    def _written(self) -> None:
+        """
+        Counts a write and syncs the shelf once `sync_every` writes have piled up.
+
+        In shared mode every call already ends by closing the file, so there is nothing to sync.
+        """
+        if self.shared:
+            return
+        self._unsynced += 1
+        if self.sync_every and self._unsynced >= self.sync_every:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if not self._unsynced:
+                return
+            try:
+                self._db.sync()
+            except (*dbm.error, ValueError) as e:
+                raise StorageError(e) from e
+            self._unsynced = 0
+
+    def close(self) -> None:
+        with self._lock:
+            try:
+                if self.shared:
+                    self._lock_file.close()
+                else:
+                    self._db.close()
+            except (*dbm.error, ValueError) as e:
+                raise StorageError(e) from e
+            self._unsynced = 0
+
+
+
+def _row_bytes(rows) -> int:
+    """
+    Returns the size of the values of SQLite rows: 8 bytes for numbers, the UTF-8 length of text.
+    """
+    return sum(len(value.encode()) if isinstance(value, str) else 8 for row in rows for value in row)
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    This class stores data in an SQLite database with one row per (workspace, year, month, kind) value.
+
+    The database runs in WAL mode, rows are indexed by their (workspace, year, month, kind) primary key,
+    and the backend remembers what it last wrote so that `write` only touches rows whose value changed.
+    Each backend reads and writes one workspace; several workspaces can share a database file, and with
+    a ConnectionPool also a single connection. The connection can be used from a background thread;
+    access to it is serialized with a lock.
+    """
+
+    # Version 1 added the workspace column; the version is kept in PRAGMA user_version
+    _schema_version = 1
+    _schema = (
+        """CREATE TABLE IF NOT EXISTS monthly_values (
+            workspace TEXT NOT NULL DEFAULT '',
+            year INTEGER NOT NULL,
+            month NOT NULL,
+            kind TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (workspace, year, month, kind)
+        ) WITHOUT ROWID""",
+        """CREATE TABLE IF NOT EXISTS yearly_values (
+            workspace TEXT NOT NULL DEFAULT '',
+            year INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            value REAL NOT NULL,
+            PRIMARY KEY (workspace, year, kind)
+        ) WITHOUT ROWID""",
+    )
+
+    def __init__(self, filename: str, workspace: str = "", pool=None):
+        """
+        Opens (or creates) the database and its tables.
+
+        Month keys are stored in an untyped column, so integer and string months both round-trip.
+
+        Args:
+            filename (str): The path of the SQLite database file.
+            workspace (str, optional): The workspace to read and write. Defaults to the unnamed
+                workspace, which holds the data of databases created before workspaces existed.
+            pool (ConnectionPool, optional): Pool to take a shared connection from, instead of opening one.
+
+        Raises:
+            StorageError: If the database can't be opened.
+        """
+        self.filename = filename
+        self.workspace = workspace
+        self._pool = pool
+        # {year: {(month, kind): value}} for the monthly rows and {year: {kind: value}} for the
+        # yearly ones, as last read from or written to the database
+        self._monthly_rows = {}
+        self._yearly_rows = {}
+        if pool is not None:
+            self._connection, self._lock = pool.acquire(filename)
+        else:
+            self._connection = self.connect(filename)
+            self._lock = threading.RLock()
+
+    @classmethod
+    def connect(cls, filename: str) -> sqlite3.Connection:
+        """
+        Opens a connection to a database, creating its tables or upgrading them to the current schema.
+
+        Databases from before the workspace column are upgraded in place; their rows move to the
+        unnamed workspace ('').
+
+        Args:
+            filename (str): The path of the SQLite database file.
+
+        Returns:
+            sqlite3.Connection: The connection, usable from any thread.
+
+        Raises:
+            StorageError: If the database can't be opened or upgraded.
+        """
+        try:
+            connection = sqlite3.connect(filename, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            version, = connection.execute("PRAGMA user_version").fetchone()
+            if version < cls._schema_version:
+                with connection:
+                    existing = {name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+                    for table in ("monthly_values", "yearly_values"):
+                        if table in existing:
+                            connection.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+                    for statement in cls._schema:
+                        connection.execute(statement)
+                    if "monthly_values" in existing:
+                        connection.execute("INSERT INTO monthly_values (year, month, kind, value) "
+                                           "SELECT year, month, kind, value FROM monthly_values_old")
+                        connection.execute("DROP TABLE monthly_values_old")
+                    if "yearly_values" in existing:
+                        connection.execute("INSERT INTO yearly_values (year, kind, value) "
+                                           "SELECT year, kind, value FROM yearly_values_old")
+                        connection.execute("DROP TABLE yearly_values_old")
+                    connection.execute(f"PRAGMA user_version = {cls._schema_version}")
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+        return connection
+
+    def workspaces(self) -> list:
+        """
+        Returns the sorted names of the workspaces that have data in this database.
+        """
+        with self._lock:
+            try:
+                cursor = self._connection.execute(
+                    "SELECT workspace FROM monthly_values UNION SELECT workspace FROM yearly_values ORDER BY workspace")
+                return [workspace for workspace, in cursor]
+            except sqlite3.Error as e:
+                raise StorageError(e) from e
+
+    def _load_year(self, year: int) -> None:
+        """
+        Reads the rows of a year into the row cache if they aren't there yet.
+        """
+        if year in self._monthly_rows:
+            return
+        cursor = self._connection.execute(
+            "SELECT month, kind, value FROM monthly_values WHERE workspace = ? AND year = ?", (self.workspace, year))
+        monthly = cursor.fetchall()
+        cursor = self._connection.execute(
+            "SELECT kind, value FROM yearly_values WHERE workspace = ? AND year = ?", (self.workspace, year))
+        yearly = cursor.fetchall()
+        if instrumentation.enabled:
+            instrumentation.count_io(read=_row_bytes(monthly) + _row_bytes(yearly), fallback="sqlite")
+        self._monthly_rows[year] = {(month, kind): value for month, kind, value in monthly}
+        self._yearly_rows[year] = dict(yearly)
+
+    def read(self, year: int) -> dict:
+        with self._lock:
+            try:
+                self._load_year(year)
+            except sqlite3.Error as e:
+                raise StorageError(e) from e
+
+            data = {}
+            for (month, kind), value in self._monthly_rows[year].items():
+                data.setdefault(kind, {})[month] = value
+            data.update(self._yearly_rows[year])
+            return data
+
+    def years(self) -> list:
+        with self._lock:
+            try:
+                cursor = self._connection.execute(
+                    "SELECT year FROM monthly_values WHERE workspace = ? "
+                    "UNION SELECT year FROM yearly_values WHERE workspace = ? ORDER BY year", (self.workspace,) * 2)
+                return [year for year, in cursor]
+            except sqlite3.Error as e:
+                raise StorageError(e) from e
+
+    def read_month(self, year: int, month) -> dict:
+        with self._lock:
+            try:
+                cursor = self._connection.execute(
+                    "SELECT kind, value FROM monthly_values WHERE workspace = ? AND year = ? AND month = ?",
+                    (self.workspace, year, month))
+                rows = cursor.fetchall()
+            except sqlite3.Error as e:
+                raise StorageError(e) from e
+            if instrumentation.enabled:
+                instrumentation.count_io(read=_row_bytes(rows), fallback="sqlite")
+            return dict(rows)
+
+    def write(self, data: dict, year: int) -> None:
+        with self._lock:
+            self._write(data, year, replace=True)
+
+    def update(self, data: dict, year: int) -> None:
+        with self._lock:
+            self._write(data, year, replace=False)
+
+    def _write(self, data: dict, year: int, replace: bool) -> None:
+        """
+        Writes the rows of `data` that differ from the stored ones. With `replace`, stored months
+        missing from a kind in `data` are deleted.
+        """
+        try:
+            self._load_year(year)
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+        monthly_rows = self._monthly_rows[year]
+        yearly_rows = self._yearly_rows[year]
+
+        changed = []
+        removed = []
+        for kind in MONTHLY_KINDS:
+            if kind not in data:
+                continue
+            values = data[kind]
+            for month, value in values.items():
+                if monthly_rows.get((month, kind)) != value:
+                    changed.append((self.workspace, year, month, kind, value))
+            if replace:
+                for month, stored_kind in list(monthly_rows):
+                    if stored_kind == kind and month not in values:
+                        removed.append((self.workspace, year, month, kind))
+        changed_yearly = [(self.workspace, year, kind, data[kind]) for kind in YEARLY_KINDS
+                          if data.get(kind) is not None and yearly_rows.get(kind) != data[kind]]
+
+        if not (changed or removed or changed_yearly):
+            return
+        try:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO monthly_values (workspace, year, month, kind, value) VALUES (?, ?, ?, ?, ?)",
+                    changed)
+                self._connection.executemany(
+                    "DELETE FROM monthly_values WHERE workspace = ? AND year = ? AND month = ? AND kind = ?", removed)
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO yearly_values (workspace, year, kind, value) VALUES (?, ?, ?, ?)",
+                    changed_yearly)
+        except sqlite3.Error as e:
+            raise StorageError(e) from e
+        if instrumentation.enabled:
+            instrumentation.count_io(written=_row_bytes(changed) + _row_bytes(removed) + _row_bytes(changed_yearly),
+                                     fallback="sqlite")
+
+        for _, _, month, kind, value in changed:
+            monthly_rows[(month, kind)] = value
+        for _, _, month, kind in removed:
+            del monthly_rows[(month, kind)]
+        for _, _, kind, value in changed_yearly:
+            yearly_rows[kind] = value
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.release(self.filename)
+            return
+        with self._lock:
+            try:
+                self._connection.close()
+            except sqlite3.Error as e:
+                raise StorageError(e) from e
+
+
+
+class ConnectionPool:
+    """
+    This class shares one SQLite connection per database file between SQLiteBackends.
+
+    Many workspaces can then be open at once without a connection (and WAL file handles) for each.
+    The connection is opened by the first backend that needs it and closed when the last one
+    using it is closed. Backends sharing a connection also share its lock.
+    """
+
+    def __init__(self):
+        """
+        Initializes the class with no open connections.
+        """
+        self._connections = {}  # filename: [connection, lock, number of backends using it]
+        self._lock = threading.Lock()
+
+    def acquire(self, filename: str) -> tuple:
+        """
+        Returns the shared connection to a database and its lock, opening it if needed.
+
+        Args:
+            filename (str): The path of the SQLite database file.
+
+        Returns:
+            tuple: (sqlite3.Connection, threading.RLock)
+
+        Raises:
+            StorageError: If the database can't be opened.
+        """
+        with self._lock:
+            entry = self._connections.get(filename)
+            if entry is None:
+                entry = self._connections[filename] = [SQLiteBackend.connect(filename), threading.RLock(), 0]
+            entry[2] += 1
+            return entry[0], entry[1]
+
+    def release(self, filename: str) -> None:
+        """
+        Gives back a connection taken with `acquire`, closing it if nothing else uses it.
+
+        Args:
+            filename (str): The path of the SQLite database file.
+
+        Raises:
+            StorageError: If the connection can't be closed.
+        """
+        with self._lock:
+            entry = self._connections[filename]
+            entry[2] -= 1
+            if entry[2]:
+                return
+            del self._connections[filename]
+        with entry[1]:
+            try:
+                entry[0].close()
+            except sqlite3.Error as e:
+                raise StorageError(e) from e
+
+    def open_connections(self) -> int:
+        """
+        Returns the number of connections currently open.
+        """
+        return len(self._connections)
+
+
+
+class Journal:
+    """
+    This class keeps an append-only journal of changes, so edits survive a crash between saves.
+
+    Every record holds the new values of one change, in the layout of `StorageBackend.update` (or of
+    `write` for records made with `replace=True`), framed by its length and a CRC32 checksum.
+    Appending only pickles the record into an in-memory buffer. A background thread writes the buffer
+    `commit_interval` seconds after the first record arrives, with a single write and fsync for every
+    record collected by then (group commit), so each change costs microseconds and at most the last
+    `commit_interval` seconds of changes can be lost. `commit` makes everything appended so far durable
+    at once; callers that commit at the same time share one fsync.
+
+    Replaying records always yields the latest values, so `compact` can apply the journal to the
+    main store in order and then drop the applied records from the file. A record that was cut off
+    by a crash (a torn tail) fails its checksum and is discarded when the journal is opened.
+    """
+    _record_header = struct.Struct("<II")  # length, CRC32 of the pickled record
+
+    def __init__(self, filename: str, commit_interval: float = 0.05):
+        """
+        Opens and locks the journal file, creating it if it doesn't exist, and reads the records it holds.
+
+        Args:
+            filename (str): The journal file, e.g. 'financial_management_data.journal'.
+            commit_interval (float, optional): Seconds the background thread waits after the first
+                uncommitted record before committing. 0 disables the thread; records are then only
+                written by `commit`.
+
+        Raises:
+            StorageError: If the file can't be opened.
+        """
+        self.filename = filename
+        self.commit_interval = commit_interval
+        self._condition = threading.Condition(threading.Lock())
+        self._buffer = []  # encoded records that haven't been written yet
+        self._count = 0  # committed records that haven't been compacted yet
+        self._committing = False
+        self._closed = False
+        try:
+            self._file = open(filename, "ab", buffering=0)
+        except OSError as e:
+            raise StorageError(e) from e
+        try:
+            if fcntl is not None:
+                # Held until the file is closed, so another process can't replay or truncate it meanwhile
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            records, self._size = self._read()
+            self._count = len(records)
+            self._file.truncate(self._size)
+        except BlockingIOError as e:
+            self._file.close()
+            raise StorageError(f"The journal '{filename}' is in use by another process") from e
+        except OSError as e:
+            self._file.close()
+            raise StorageError(e) from e
+        self._thread = None
+        if commit_interval > 0:
+            self._thread = threading.Thread(target=self._commit_loop, name="journal-commit", daemon=True)
+            self._thread.start()
+
+    def _read(self, size: int = -1) -> tuple:
+        """
+        Returns the complete records in the first `size` bytes of the journal file (all of it by
+        default) and the number of bytes they take up.
+        """
+        records = []
+        try:
+            with open(self.filename, "rb") as journal:
+                content = journal.read(size)
+        except FileNotFoundError:
+            return records, 0
+        if instrumentation.enabled:
+            instrumentation.count_io(read=len(content), fallback="journal")
+        offset = 0
+        while offset + self._record_header.size <= len(content):
+            length, checksum = self._record_header.unpack_from(content, offset)
+            payload = content[offset + self._record_header.size:offset + self._record_header.size + length]
+            if len(payload) != length or zlib.crc32(payload) != checksum:
+                break
+            try:
+                records.append(pickle.loads(payload))
+            except (pickle.UnpicklingError, EOFError, ValueError):
+                break
+            offset += self._record_header.size + length
+        return records, offset
+
+    def __len__(self) -> int:
+        """
+        Returns the number of records that haven't been compacted yet.
+        """
+        with self._condition:
+            return self._count + len(self._buffer)
+
+    def append(self, year: int, data: dict, replace: bool = False) -> None:
+        """
+        Adds a change to the journal. It is written by the next group commit.
+
+        Args:
+            year (int): The year the values belong to.
+            data (dict): The new values, in the layout of `StorageBackend.update`.
+            replace (bool, optional): If True, the kinds in `data` replace the stored ones when the
+                record is replayed (as `StorageBackend.write` does) instead of being merged.
+        """
+        payload = pickle.dumps((year, data, replace), pickle.HIGHEST_PROTOCOL)
+        encoded = self._record_header.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._condition:
+            if self._closed:
+                raise StorageError(f"The journal '{self.filename}' is closed")
+            self._buffer.append(encoded)
+            if len(self._buffer) == 1:
+                self._condition.notify_all()
+
+    def commit(self) -> None:
+        """
+        Writes and fsyncs every record appended so far.
+
+        If another thread is already committing, this waits for it and then commits whatever is left
+        in one go, so concurrent commits are batched into as few fsyncs as possible.
+
+        Raises:
+            StorageError: If the records can't be written.
+        """
+        with self._condition:
+            while self._buffer or self._committing:
+                if self._committing:
+                    self._condition.wait()
+                    continue
+                group, self._buffer = self._buffer, []
+                self._committing = True
+                self._condition.release()
+                content = b"".join(group)
+                try:
+                    self._file.write(content)
+                    os.fsync(self._file.fileno())
+                except OSError as e:
+                    # Keep the records for the next commit, without a partly written group in the file
+                    with contextlib.suppress(OSError):
+                        self._file.truncate(self._size)
+                    self._condition.acquire()
+                    self._buffer[:0] = group
+                    self._committing = False
+                    self._condition.notify_all()
+                    raise StorageError(e) from e
+                if instrumentation.enabled:
+                    instrumentation.count_io(written=len(content), fallback="journal")
+                self._condition.acquire()
+                self._committing = False
+                self._condition.notify_all()
+                self._count += len(group)
+                self._size += len(content)
+
+    def _commit_loop(self) -> None:
+        """
+        Commits the buffered records `commit_interval` seconds after the first one arrives.
+        """
+        while True:
+            with self._condition:
+                while not self._buffer and not self._closed:
+                    self._condition.wait()
+                if self._closed:
+                    return
+            time.sleep(self.commit_interval)
+            try:
+                self.commit()
+            except StorageError as e:
+                print(f"Error writing journal: {e}")
+
+    def compact(self, backend: StorageBackend, apply=None) -> int:
+        """
+        Applies the committed records to a backend and removes them from the journal.
+
+        Records appended while the backend is being updated stay in the journal.
+
+        Args:
+            backend (StorageBackend): The main store.
+            apply (optional): Called as `apply(data, year, replace)` for every record instead of
+                writing it to the backend directly, e.g. to check versions first (see
+                `DataPersistence.compact_journal`).
+
+        Returns:
+            int: The number of records applied.
+
+        Raises:
+            StorageError: If the backend or the journal can't be written. The records stay in the
+                journal and are applied by a later compaction.
+        """
+        self.commit()
+        with self._condition:
+            while self._committing:
+                self._condition.wait()
+            count, size = self._count, self._size
+        if not count:
+            return 0
+        try:
+            records = self._read(size)[0]
+        except OSError as e:
+            raise StorageError(e) from e
+
+        for year, data, replace in _coalesce(records):
+            if apply is not None:
+                apply(data, year, replace)
+            elif replace:
+                backend.write(data, year)
+            else:
+                backend.update(data, year)
+        backend.flush()
+
+        with self._condition:
+            while self._committing:
+                self._condition.wait()
+            try:
+                if self._size == size:
+                    self._file.truncate(0)
+                else:
+                    self._rewrite_from(size)
+                os.fsync(self._file.fileno())
+            except OSError as e:
+                raise StorageError(e) from e
+            self._count -= count
+            self._size -= size
+        return count
+
+    def _rewrite_from(self, offset: int) -> None:
+        """
+        Replaces the journal file with its records after `offset`.
+        """
+        with open(self.filename, "rb") as journal:
+            journal.seek(offset)
+            remaining = journal.read()
+        temporary = f"{self.filename}.{os.getpid()}.tmp"
+        replacement = open(temporary, "ab", buffering=0)
+        if fcntl is not None:
+            fcntl.flock(replacement, fcntl.LOCK_EX)
+        replacement.write(remaining)
+        os.fsync(replacement.fileno())
+        os.replace(temporary, self.filename)
+        self._file.close()
+        self._file = replacement
+
+    def close(self) -> None:
+        """
+        Commits the buffered records, stops the background thread and closes the file.
+        """
+        try:
+            self.commit()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            if self._thread is not None:
+                self._thread.join()
+            self._file.close()
+
+
+def _coalesce(records: list):
+    """
+    Merges consecutive journal records that update the same year, so compaction writes each year
+    once per run of changes instead of once per change.
+    """
+    merged = None
+    for year, data, replace in records:
+        if merged is not None and not replace and not merged[2] and merged[0] == year:
+            for kind, value in data.items():
+                if kind in MONTHLY_KINDS:
+                    merged[1].setdefault(kind, {}).update(value)
+                else:
+                    merged[1][kind] = value
+            continue
+        if merged is not None:
+            yield merged
+        merged = (year, {kind: dict(value) if isinstance(value, dict) else value
+                         for kind, value in data.items()}, replace)
+    if merged is not None:
+        yield merged
+
+
+class DataPersistence:
+    """
+    This class handles data persistence for the financial management application.
+
+    The data is written through a storage backend (see the classes above), which stores it by year.
+    By default it uses the `shelve` module to store and retrieve data from a file named
+    'financial_management_data' (or the `filename` given); an `SQLiteBackend` can be passed instead
+    to store one row per value.
+
+    The backend stays open for the lifetime of the object, so it should be used as a context manager
+    (or closed with `close`) to make sure batched writes reach the disk.
+    """
+    _filename = 'financial_management_data'
+
+    def __init__(self, backend: StorageBackend = None, filename: str = None, journal=None, shared: bool = False):
+        """
+        Opens the storage backend, by default the shelve file in create mode ('c').
+
+        If the file doesn't exist, it will be created with an empty dictionary as the default data.
+        The file is opened once here and kept open until `close` is called.
+
+        With a journal, changes left in it by a session that didn't save (e.g. because the process
+        was killed) are applied to the backend before anything is read.
+
+        Args:
+            backend (StorageBackend, optional): The backend to store data in. Defaults to a
+                ShelveBackend on `filename`.
+            filename (str, optional): The shelve file to use when no backend is given. Defaults to
+                'financial_management_data'.
+            journal (optional): A Journal, or the file name of one, that records every change made
+                through `attach` and `update_database` until it reaches the backend. The default
+                shelve file always gets one, '<filename>.journal'; pass False to turn it off. Only one
+                process can use a journal at a time; others go on without one.
+            shared (bool, optional): Open the default shelve file in shared mode (see ShelveBackend),
+                so other processes can read and write it at the same time.
+
+        Raises:
+            StorageError: If the default shelve file can't be opened. A failing journal is only
+                reported, and the data is used without one.
+        """
+        self.backend = backend
+        self.journal = None
+        self.conflicts = []
+        self._pending = {}
+        self._attached = ()
+        # year: (version, stored data at that version, data as read plus the changes written since)
+        self._bases = {}
+        if self.backend is None:
+            filename = filename or self._filename
+            # Without a backend every later call would fail, so the caller has to handle this
+            self.backend = ShelveBackend(filename, shared=shared)
+            print(f"File '{filename}' opened")
+            if journal is None:
+                journal = f"{filename}.journal"
+        if journal is not None and journal is not False:
+            try:
+                self.journal = journal if isinstance(journal, Journal) else Journal(journal)
+                recovered = self.compact_journal()
+                if recovered:
+                    print(f"Recovered {recovered} unsaved changes from '{self.journal.filename}'")
+            except StorageError as e:
+                print(f"Error opening journal: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def attach(self, money_management, goals) -> None:
+        """
+        Records every change of the income, expenses and goals in the journal as it happens.
+
+        Without a journal this does nothing. Call it after the stored data has been loaded, so the
+        loaded values aren't journaled again.
+
+        Args:
+            money_management (MoneyManagement): The income and expenses to record.
+            goals (Goals): The goals to record.
+        """
+        if self.journal is None:
+            return
+        self.detach()
+        money_management.subscribe(self._value_changed)
+        goals.subscribe(self._goal_changed)
+        self._attached = (money_management, goals)
+
+    def detach(self) -> None:
+        """
+        Stops recording the changes of the objects passed to `attach`.
+        """
+        if self._attached:
+            self._attached[0].unsubscribe(self._value_changed)
+            self._attached[1].unsubscribe(self._goal_changed)
+            self._attached = ()
+
+    def _value_changed(self, type: str, year: int, month) -> None:
+        total = self._attached[0].get_year(type, year).get(month, 0.0)
+        self._record(year, {"income" if type == "i" else "expenses": {month: total}})
+
+    def _goal_changed(self, type: str, year: int, month) -> None:
+        goals = self._attached[1]
+        if month is None:
+            data = {"yearly_income_goal" if type == "i" else "yearly_expense_goal": goals.get_yearly_goal(type, year)}
+        else:
+            data = {"income_goal" if type == "i" else "expense_goal": {month: goals.get_monthly_goals(type, year).get(month, 0.0)}}
+        self._record(year, data)
+
+    def _record(self, year: int, data: dict, replace: bool = False) -> None:
+        try:
+            self.journal.append(year, data, replace)
+        except StorageError as e:
+            print(f"Error writing journal: {e}")
+
+    def compact_journal(self) -> int:
+        """
+        Applies the changes recorded in the journal to the backend and removes them from the journal.
+
+        Called after every save, so the journal only holds the changes of the last few seconds.
+
+        With a shared backend the records go through the same version check and month merge as
+        `update_database`, so replaying values that were already saved doesn't overwrite what other
+        processes stored since.
+
+        Returns:
+            int: The number of journal records applied.
+
+        Raises:
+            StorageError: If the backend or the journal can't be written.
+        """
+        if self.journal is None:
+            return 0
+        return self.journal.compact(self.backend, self._write_merged if self.backend.shared else None)
+
+    @timed("persistence.update_database")
+    def update_database(self, income=None, expenses=None, 
+                        income_goal=None, expense_goal=None, 
+                        yearly_income_goal=None, yearly_expense_goal=None, year=None) -> None:
+        """
+        Updates the stored income, expense, and goal data of a year.
+
+        Only the values that are passed are replaced; the backend decides how much has to be
+        written (the SQLite backend only writes the rows that changed).
+
+        With a shared backend (e.g. `DataPersistence(shared=True)`), if the year was read with
+        `read_data` or written before, only the months whose values differ from what was read or
+        written are written, and only if nobody else has written the year since (an optimistic version
+        check). If someone has, the changes are merged month by month with what they stored (see
+        `merge_changes`) and written again. Months that both changed keep the value passed here and
+        are added to `conflicts`. Other years are written as passed.
+
+        Values are rounded to the cent before they are stored, and may also be given as Money values
+        or strings such as '$1,200.50' (see `money.to_amount`).
+
+        Args:
+            income (float, optional): The user's monthly income.
+            expenses (float, optional): The user's monthly expenses.
+            income_goal (float, optional): The user's monthly income goal.
+            expense_goal (float, optional): The user's monthly expense goal.
+            yearly_income_goal (float, optional): The user's yearly income goal.
+            yearly_expense_goal (float, optional): The user's yearly expense goal.
+            year (int, optional): The year the data belongs to. Defaults to the current year.
+
+        Raises:
+            ValueError: If a value isn't a valid amount.
+        """
+
+        data = {}
+        if income is not None:
+            data['income'] = {month: to_amount(value) for month, value in income.items()}
+        if expenses is not None:
+            data['expenses'] = {month: to_amount(value) for month, value in expenses.items()}
+        if income_goal is not None:
+            data['income_goal'] = {month: to_amount(value) for month, value in income_goal.items()}
+        if expense_goal is not None:
+            data['expense_goal'] = {month: to_amount(value) for month, value in expense_goal.items()}
+        if yearly_income_goal is not None:
+            data['yearly_income_goal'] = to_amount(yearly_income_goal)
+        if yearly_expense_goal is not None:
+            data['yearly_expense_goal'] = to_amount(yearly_expense_goal)
+
+        if data:
+            year = year or datetime.now().year
+            if self.journal is not None:
+                self._record(year, data, replace=year not in self._bases)
+            try:
+                self._write_merged(data, year)
+                print(f"Data updated")
+            except StorageError as e:
+                print(f"Error updating data: {e}")
+
+    def _write_merged(self, data: dict, year: int, replace: bool = True) -> None:
+        """
+        Writes data of a year with a version check, merging it with newer stored data until the
+        write goes through.
+
+        With `replace`, kinds of a year that wasn't read replace the stored ones (as in
+        `StorageBackend.write`); otherwise their months are merged in (as in `update`). Backends that
+        aren't shared are written directly.
+        """
+        if not self.backend.shared:
+            if replace:
+                self.backend.write(data, year)
+            else:
+                self.backend.update(data, year)
+            return
+        if year not in self._bases:
+            # The write becomes the base of later merges, so it is version checked as well
+            while True:
+                stored, version = self.backend.read_versioned(year)
+                changes = {kind: {**stored.get(kind, {}), **value} if kind in MONTHLY_KINDS and not replace else value
+                           for kind, value in data.items()}
+                new_version = self.backend.compare_and_write(changes, year, version)
+                if new_version is not None:
+                    break
+            written = {**stored, **changes}
+            self._bases[year] = (new_version, written, ShelveBackend._copy(written))
+            return
+        version, stored, base = self._bases[year]
+        while True:
+            changes, conflicts = merge_changes(base, data, stored)
+            if not changes:
+                return
+            new_version = self.backend.compare_and_write(changes, year, version)
+            if new_version is not None:
+                break
+            stored, version = self.backend.read_versioned(year)
+        for kind, month in conflicts:
+            print(f"Conflict: {kind} {'' if month is None else f'for month {month} '}of {year} was also "
+                  f"changed by someone else; keeping this value")
+            self.conflicts.append((year, kind, month))
+        for kind, value in data.items():
+            base[kind] = {**base.get(kind, {}), **value} if kind in MONTHLY_KINDS else value
+        self._bases[year] = (new_version, {**stored, **changes}, base)
+
+    @timed("persistence.save_changes")
+    def save_changes(self, *changes: dict) -> bool:
+        """
+        Saves only the values that changed, as returned by `MoneyManagement.get_changes` and
+        `Goals.get_changes`.
+
+        Changes are merged into what is already stored, month by month, and flushed to disk. With a
+        shared backend they go through the same version check as `update_database`, so a month that
+        another process changed since it was read is reported in `conflicts` (and keeps the value
+        saved here) instead of being overwritten silently. If the backend fails, the changes are kept
+        and retried on the next call.
+
+        Args:
+            *changes (dict): {year: data} dictionaries of changed values.
+
+        Returns:
+            bool: True if everything pending was saved.
+        """
+
+        for change_set in changes:
+            for year, data in change_set.items():
+                pending = self._pending.setdefault(year, {})
+                for kind, value in data.items():
+                    if isinstance(value, dict):
+                        pending.setdefault(kind, {}).update(value)
+                    else:
+                        pending[kind] = value
+
+        if not self._pending:
+            return True
+        try:
+            for year in sorted(self._pending):
+                self._write_merged(self._pending[year], year, replace=False)
+                del self._pending[year]
+            self.backend.flush()
+            self.compact_journal()
+            print(f"Data updated")
+            return True
+        except StorageError as e:
+            print(f"Error updating data: {e}")
+            return False
+
+    @timed("persistence.flush")
+    def flush(self) -> None:
+        """
+        Writes batched updates to disk.
+
+        Backends batch writes (e.g. the shelve backend only syncs every `sync_every` writes), so
+        several `update_database` calls can end up as a single physical write.
+        """
+
+        try:
+            self.backend.flush()
+        except StorageError as e:
+            print(f"Error updating data: {e}")
+
+    def close(self) -> None:
+        """
+        Applies the journal, flushes batched updates and closes the storage backend.
+        """
+
+        self.detach()
+        if self.journal is not None:
+            try:
+                self.compact_journal()
+            except StorageError as e:
+                print(f"Error updating data: {e}")
+            try:
+                self.journal.close()
+            except StorageError as e:
+                print(f"Error closing journal: {e}")
+        try:
+            self.backend.close()
+        except StorageError as e:
+            print(f"Error closing: {e}")
+
+    @timed("persistence.read_data")
+    def read_data(self, year: int = None):
+        """
+        Reads and returns the stored financial data.
+
+        Args:
+            year (int, optional): The year to read. Defaults to the current year.
+
+        Returns:
+            dict: A dictionary containing the stored financial data.
+        """
+
+        year = year or datetime.now().year
+        try:
+            if not self.backend.shared:
+                return self.backend.read(year)
+            data, version = self.backend.read_versioned(year)
+        except StorageError as e:
+            print(f"Error reading data: {e}")
+            return {}
+        self._bases[year] = (version, data, {kind: dict(value) if isinstance(value, dict) else value
+                                             for kind, value in data.items()})
+        return {kind: dict(value) if isinstance(value, dict) else value for kind, value in data.items()}
+
+    @timed("persistence.read_range")
+    def read_range(self, start_year: int, end_year: int) -> dict:
+        """
+        Reads the stored financial data of every year from `start_year` to `end_year` (inclusive).
+
+        The backends index data by year, so only the requested years are read.
+
+        Args:
+            start_year (int): The first year of the range.
+            end_year (int): The last year of the range.
+
+        Returns:
+            dict: {year: data} for the years in the range that have data.
+        """
+
+        try:
+            return self.backend.read_range(start_year, end_year)
+        except StorageError as e:
+            print(f"Error reading data: {e}")
+            return {}
+
+    def years(self) -> list:
+        """
+        Returns the sorted list of years that have stored data.
+        """
+
+        try:
+            return self.backend.years()
+        except StorageError as e:
+            print(f"Error reading data: {e}")
+            return []
+
+    @timed("persistence.read_month")
+    def read_month(self, month, year: int = None) -> dict:
+        """
+        Reads the stored values of a single month.
+
+        Args:
+            month: The month to read.
+            year (int, optional): The year to read. Defaults to the current year.
+
+        Returns:
+            dict: A {kind: value} dictionary, e.g. {'income': 1000.0, 'expenses': 400.0}.
+        """
+
+        try:
+            return self.backend.read_month(year or datetime.now().year, month)
+        except StorageError as e:
+            print(f"Error reading data: {e}")
+            return {}
+
+
+
+_MISSING = object()
+
+
+def merge_changes(base: dict, ours: dict, theirs: dict) -> tuple:
+    """
+    Merges the data one writer wants to store with what another writer stored in the meantime,
+    month by month (a three-way merge).
+
+    A month counts as changed by us if its value in `ours` differs from `base`; months missing from
+    `ours` count as unchanged. Changed months are taken from `ours`, all others from `theirs`. Kinds
+    of `ours` that weren't changed at all are left out, so writing the result keeps the stored values.
+
+    Args:
+        base (dict): The data both writers started from.
+        ours (dict): The data to store, for the kinds being written.
+        theirs (dict): The data stored now.
+
+    Returns:
+        tuple: (merged, conflicts) where merged is the data to write and conflicts lists the
+            (kind, month) pairs that both changed to different values (month is None for yearly goals).
+    """
+    merged = {}
+    conflicts = []
+    for kind, value in ours.items():
+        if kind not in MONTHLY_KINDS:
+            old, other = base.get(kind), theirs.get(kind)
+            if value != old:
+                if other != old and other != value:
+                    conflicts.append((kind, None))
+                merged[kind] = value
+            continue
+        old_months, other_months = base.get(kind, {}), theirs.get(kind, {})
+        result = dict(other_months)
+        changed = False
+        for month, mine in value.items():
+            old = old_months.get(month, _MISSING)
+            if mine == old:
+                continue
+            changed = True
+            other = other_months.get(month, _MISSING)
+            if other != old and other != mine:
+                conflicts.append((kind, month))
+            result[month] = mine
+        if changed:
+            merged[kind] = result
+    return merged, conflicts
+
+
+def migrate_shelve_to_sqlite(shelve_filename: str, sqlite_filename: str, shared: bool = None) -> dict:
+    """
+    Imports the data of every year of an existing shelve file into an SQLite database.
+
+    Files from older versions, which don't distinguish years, are imported as the current year.
+
+    Args:
+        shelve_filename (str): The shelve file to read, e.g. 'financial_management_data'.
+        sqlite_filename (str): The SQLite database to write to. It is created if it doesn't exist.
+        shared (bool, optional): Open the shelve file in shared mode. Defaults to the
+            FINANCIAL_TOOL_SHARED environment variable (see `shared_requested`).
+
+    Returns:
+        dict: The {year: data} that was imported.
+    """
+    with ShelveBackend(shelve_filename, shared=shared_requested() if shared is None else shared) as shelf:
+        data = {year: shelf.read(year) for year in shelf.years()}
+    with SQLiteBackend(sqlite_filename) as backend:
+        for year, year_data in data.items():
+            backend.write(year_data, year)
+    return data
+
+
+def main(argv=None):
+    """
+    Command line entry point for migrating a shelve file to SQLite.
+
+    Usage:
+        python persistence.py <shelve file> <sqlite file>
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) != 2:
+        print(main.__doc__)
+        return 1
+    data = migrate_shelve_to_sqlite(args[0], args[1])
+    count = sum(len(year_data.get(kind, {})) for year_data in data.values() for kind in MONTHLY_KINDS)
+    print(f"Imported {count} monthly values for {len(data)} years into '{args[1]}'")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import threading
+from datetime import datetime
+
+from models import MONTH_NAMES, month_number
+from instrumentation import timed
+
+
+def _month_total(totals, month) -> float:
+    """
+    Returns a month's total from a {month: total} dictionary, adding up every key of the same calendar
+    month, so months stored as names or numbers are both found (see `month_number`).
+    """
+    number = month_number(month)
+    if not number:
+        return totals.get(month, 0.0)
+    return sum(total for key, total in totals.items() if month_number(key) == number)
+
+
+def report_values(money_management, goals, month=None, year: int = None) -> dict:
+    """
+    Collects the values the monthly report is based on.
+
+    Months without income, expenses or goals count as 0. Month keys stored as names or numbers are
+    both found.
+
+    Args:
+        money_management (MoneyManagement): The income and expenses to report on.
+        goals (Goals): The goals to compare against.
+        month (optional): The month to report on. Defaults to the current month.
+        year (int, optional): The year of the month. Defaults to the current year.
+
+    Returns:
+        dict: The month's 'income', 'expenses', 'income_goal' and 'expense_goal', the year's
+            'yearly_income' and 'yearly_expenses', and the 'month' and 'year' themselves. The month's
+            three largest expense categories are under 'top_expenses', as (category, total) pairs, and
+            the largest one's average over the six months before under 'top_expense_average'.
+    """
+    month = month or datetime.now().month
+    year = year or datetime.now().year
+    top_expenses = money_management.top_categories("e", 3, year, month) if month_number(month) else []
+    top_expense_average = None
+    if top_expenses:
+        history = money_management.get_category_history("e", top_expenses[0][0], 7, year, month)[:-1]
+        top_expense_average = sum(total for _, _, total in history) / len(history)
+    return {
+        "month": month,
+        "year": year,
+        "income": _month_total(money_management.get_year("i", year), month),
+        "expenses": _month_total(money_management.get_year("e", year), month),
+        "yearly_income": money_management.get_yearly_income(year),
+        "yearly_expenses": money_management.get_yearly_expenses(year),
+        "income_goal": _month_total(goals.get_monthly_goals("i", year), month),
+        "expense_goal": _month_total(goals.get_monthly_goals("e", year), month),
+        "top_expenses": top_expenses,
+        "top_expense_average": top_expense_average,
+    }
+
+
+def build_report(values: dict) -> str:
+    """
+    Builds the text of the monthly report from the values collected by `report_values`.
+
+    The report compares income with expenses and checks whether the month's income and expense goals
+    were reached, with suggestions for improvement. When the month's expenses have categories, the
+    suggestions name the largest ones.
+
+    Args:
+        values (dict): The report values.
+
+    Returns:
+        str: The report text.
+    """
+    curr_income = values["income"]
+    curr_expenses = values["expenses"]
+    income_goal = values["income_goal"]
+    expense_goal = values["expense_goal"]
+
+    examples = "(i.e. Subscriptions, eating out, etc)"
+    spending = ""
+    top_expenses = values.get("top_expenses")
+    if top_expenses:
+        examples = "(your largest expenses this month were " + ", ".join(
+            f"{category} at ${total:.2f}" for category, total in top_expenses) + ")"
+        if values.get("top_expense_average") is not None:
+            category, total = top_expenses[0]
+            spending = (f"\n    * {category} cost ${total:.2f} this month, compared with "
+                        f"${values['top_expense_average']:.2f} a month over the previous 6 months.")
+
+    parts = []
+    if curr_expenses > curr_income:
+        parts.append(f"Currently, your expenses are higher than your income by {curr_income/curr_expenses*100:.2f}%. ")
+        parts.append(f"You set an income goal of ${income_goal:.2f}. ")
+
+        if income_goal > curr_income:
+            parts.append("\n     * It looks like you might need to work a little harder to reach your income goal this month.")
+        else:
+            parts.append("\n     * Keep up the good work! You surpassed your goal.")
+
+        parts.append(f"\n\nYou set an expense goal of ${expense_goal:.2f}. Here's how it looks:")
+
+        if expense_goal < curr_expenses:
+            parts.append(f"\n    * It looks like you might need to adjust your spending habits to get lower your expenses and reach your goal. What innessential things can you cut out of your spending this month{examples}.")
+            parts.append(spending)
+        else:
+            parts.append("\n    * Keep up the good work! You reduced your expenses below the goal")
+    else:
+        #This text occurs when their income > than monthly expenses
+        ratio = curr_expenses/curr_income*100 if curr_income else 0.0
+        parts.append(f"Currently, your income is higher than your expenses by {ratio:.2f}%. ")
+        parts.append(f"You set an income goal of ${income_goal:.2f}. ")
+        parts.append("You're doing great so far by surpassing your current expenses, but lets check how far you are on achieving your goals:")
+
+        if income_goal > curr_income:
+            parts.append("\n    * It looks like you might need to work a little harder to reach your income goal this month.")
+        else:
+            parts.append("\n    * Keep up the good work! You surpassed your goal.")
+
+        parts.append(f"\n\nYou set an expense goal of ${expense_goal:.2f}. Here's how it looks:")
+
+        if expense_goal < curr_expenses:
+            parts.append(f"\n    * It looks like you might need to adjust your spending habits to get lower your expenses and reach your goal. What innessential things can you cut out of your spending this month{examples}. Although you are making more than you are losing, it never hurts to have more money")
+            parts.append(spending)
+        else:
+            parts.append("\n    * Keep up the good work! You reduced your expenses below the goal")
+
+    return "".join(parts)
+
+
+@timed("reports.generate_report")
+def generate_report(money_management, goals, month=None, year: int = None) -> str:
+    """
+    Generates the monthly report for any month, without needing a Tk window.
+
+    When NumPy is installed, the report ends with a forecast of the year-end income and expenses
+    and the chance of reaching the yearly goals, based on the months up to the reported one (see forecast.py).
+
+    Args:
+        money_management (MoneyManagement): The income and expenses to report on.
+        goals (Goals): The goals to compare against.
+        month (optional): The month to report on. Defaults to the current month.
+        year (int, optional): The year of the month. Defaults to the current year.
+
+    Returns:
+        str: The report text.
+    """
+    values = report_values(money_management, goals, month, year)
+    text = build_report(values)
+    try:
+        from forecast import forecast_year, forecast_text
+    except ImportError:
+        return text
+    through_month = month_number(values["month"]) or 12
+    return text + forecast_text(forecast_year(money_management, goals, values["year"], through_month))
+
+
+def draw_monthly_chart(figure, income: list, expenses: list, income_goals: list, expense_goals: list) -> dict:
+    """
+    Draws the monthly income, expense and goal chart on a Matplotlib figure.
+
+    This is the layout used by the GUI's chart window and by the batch export. The figure is passed in,
+    so this module doesn't import Matplotlib and works with any backend (TkAgg in the GUI, Agg for files).
+
+    Args:
+        figure (matplotlib.figure.Figure): The figure to draw on.
+        income (list): The twelve monthly income totals, January first.
+        expenses (list): The twelve monthly expense totals.
+        income_goals (list): The twelve monthly income goals.
+        expense_goals (list): The twelve monthly expense goals.
+
+    Returns:
+        dict: The artists for later updates: 'axes', 'income_bars', 'expense_bars',
+            'income_goal_points' and 'expense_goal_points'.
+    """
+    ax = figure.add_subplot()
+    bar_width = 0.35
+
+    # Create a list of positions for expense bars with an offset that are side-by-side
+    index = range(1, 13)
+    expense_index = [i + bar_width for i in index]
+    artists = {
+        "axes": ax,
+        "income_bars": ax.bar(index, income, bar_width, label='Income'),
+        "expense_bars": ax.bar(expense_index, expenses, bar_width, label='Expenses'),
+        "income_goal_points": ax.scatter(index, income_goals, color='red', marker='*', label='Income Goal'),
+        "expense_goal_points": ax.scatter(expense_index, expense_goals, color='red', marker='s', label='Expense Goal'),
+    }
+
+    ax.set_xlabel('Month')
+    ax.set_ylabel('Amount')
+    ax.set_title('Monthly Income and Expenses')
+    ax.set_xticks([i + bar_width / 2 for i in index])
+    ax.set_xticklabels(MONTH_NAMES, rotation=45, ha='right')
+    ax.legend()
+    figure.tight_layout()
+    return artists
+
+
+
+class ReportEngine:
+    """
+    This class generates monthly reports and remembers them until the data changes.
+
+    Reports are cached per (year, month). The cache is only valid for the `version` counters of
+    MoneyManagement and Goals it was built with; as soon as either changes, the cache is emptied.
+    Reports may be requested from worker threads; the cache is guarded by a lock.
+    """
+
+    def __init__(self, money_management, goals):
+        """
+        Initializes the engine with an empty cache.
+
+        Args:
+            money_management (MoneyManagement): The income and expenses to report on.
+            goals (Goals): The goals to compare against.
+        """
+        self.money_management = money_management
+        self.goals = goals
+        self._cache = {}
+        self._versions = None
+        self._lock = threading.Lock()
+
+    def report(self, month=None, year: int = None, snapshot: tuple = None) -> str:
+        """
+        Returns the report of a month, generating it only if the data changed since it was last generated.
+
+        Args:
+            month (optional): The month to report on. Defaults to the current month.
+            year (int, optional): The year of the month. Defaults to the current year.
+            snapshot (tuple, optional): (money_management, goals) copies to report on instead of the
+                objects passed to the constructor, so a worker thread doesn't read them while they
+                change. The copies keep the versions of the originals, so they share the cache.
+
+        Returns:
+            str: The report text.
+        """
+        money_management, goals = snapshot or (self.money_management, self.goals)
+        with self._lock:
+            versions = (money_management.version, goals.version)
+            if versions != self._versions:
+                self._cache = {}
+                self._versions = versions
+
+            key = (year or datetime.now().year, month or datetime.now().month)
+            text = self._cache.get(key)
+            if text is None:
+                text = self._cache[key] = generate_report(money_management, goals, key[1], key[0])
+            return text
@@ -0,0 +1,126 @@
+import queue
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class TaskRunner:
+    """
+    This class runs slow work (saving, aggregating, building reports) on a pool of worker threads.
+
+    Tkinter widgets may only be touched from the thread running the mainloop, so results aren't handed
+    to their callback in the worker. Finished tasks are put on a queue instead, and `poll` - called
+    regularly from the mainloop with `window.after` - runs the callbacks on the Tk thread.
+
+    Every task has a key such as 'chart'. Submitting a task with the same key as an unfinished one
+    supersedes it: the older task is cancelled if it hasn't started yet, and its result is dropped
+    if it has.
+    """
+
+    def __init__(self, max_workers: int = 2):
+        """
+        Initializes the class with an idle pool of worker threads.
+
+        Args:
+            max_workers (int, optional): The number of worker threads.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="task")
+        self._finished = queue.SimpleQueue()
+        self._generations = {}  # key: number of the latest task submitted with that key
+        self._futures = {}      # key: future of the latest task submitted with that key
+
+    def submit(self, key: str, func, *args, callback=None, error_callback=None) -> int:
+        """
+        Runs `func(*args)` on a worker thread, superseding the previous task with the same key.
+
+        Args:
+            key (str): Identifies what the task is for, e.g. 'save' or 'chart'.
+            func: The function to run.
+            *args: The arguments of the function.
+            callback (optional): Called by `poll` with the result of the function.
+            error_callback (optional): Called by `poll` with the exception if the function fails.
+                Without it the error is printed.
+
+        Returns:
+            int: The number of the task among the tasks with this key.
+        """
+        generation = self._generations.get(key, 0) + 1
+        self._generations[key] = generation
+        previous = self._futures.get(key)
+        if previous is not None:
+            previous.cancel()
+
+        future = self._executor.submit(func, *args)
+        self._futures[key] = future
+        future.add_done_callback(lambda done: self._finished.put((key, generation, done, callback, error_callback)))
+        return generation
+
+    def cancel(self, key: str) -> None:
+        """
+        Cancels the task with the given key if it hasn't started, and drops its result if it has.
+
+        Args:
+            key (str): The key of the task.
+        """
+        if key in self._generations:
+            self._generations[key] += 1
+            self._futures[key].cancel()
+
+    def running(self, key: str) -> bool:
+        """
+        Returns whether the latest task with the given key is queued or running.
+        """
+        future = self._futures.get(key)
+        return future is not None and not future.done()
+
+    @property
+    def busy(self) -> bool:
+        """
+        True while any task is queued or running.
+        """
+        return any(not future.done() for future in self._futures.values())
+
+    def poll(self) -> int:
+        """
+        Runs the callbacks of every finished task. Call this from the Tk thread.
+
+        Results of superseded and cancelled tasks are dropped.
+
+        Returns:
+            int: The number of callbacks that were run.
+        """
+        handled = 0
+        while True:
+            try:
+                key, generation, future, callback, error_callback = self._finished.get_nowait()
+            except queue.Empty:
+                return handled
+            if generation != self._generations.get(key) or future.cancelled():
+                continue
+
+            error = future.exception()
+            if error is not None:
+                if error_callback is not None:
+                    error_callback(error)
+                else:
+                    print(f"Error in background task '{key}': {error}")
+            elif callback is not None:
+                callback(future.result())
+            handled += 1
+
+    def wait(self, timeout: float = None) -> bool:
+        """
+        Blocks until every queued and running task has finished.
+
+        Args:
+            timeout (float, optional): The maximum number of seconds to wait.
+
+        Returns:
+            bool: True if every task finished in time.
+        """
+        _, not_done = wait(list(self._futures.values()), timeout=timeout)
+        return not not_done
+
+    def shutdown(self) -> None:
+        """
+        Waits for the queued and running tasks to finish and stops the worker threads.
+        """
+        self._executor.shutdown(wait=True)
@@ -1,8 +1,36 @@
+import asyncio
+import json
+import html
+import os
+import subprocess
+import sys
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
-from datetime import datetime
+from datetime import datetime, date
 from financial_management_tool import *
 from unittest import mock
+import shelve
+from persistence import migrate_shelve_to_sqlite
+from bulk_import import read_csv_rows, read_ofx_rows, import_rows, chunked
+from compact_models import CompactMoneyManagement, CompactGoals
+from persistence import ConnectionPool, Journal, merge_changes
+from benchmarks.stress_persistence import run_stress
+from api_server import ApiServer
+from goal_monitor import GoalMonitor, format_alert
+from models import MONTH_NAMES
+from archive import ColumnarArchive, export_archive, import_archive, write_archive
+from money import Money, parse_amount, parse_amounts, to_cents
+import sqlite3
+
+try:
+    import numpy
+    from aggregation import AggregationCube, month_number
+    from batch_export import export_reports, month_range, parse_month
+    from forecast import monthly_history, project_months, simulate_year, forecast_year
+except ImportError:
+    numpy = None
 
 
 class TestMoneyManagement(unittest.TestCase):
@@ -60,6 +88,234 @@ class TestMoneyManagement(unittest.TestCase):
         money_management.expenses = {1: 500.0, 2: 1000.0, 3: 1500.0}
         self.assertEqual(money_management.get_yearly_expenses(), 3000.0)
 
+    def test_yearly_totals_consistency(self):
+        """Test that yearly totals stay consistent through every kind of update."""
+        money_management = MoneyManagement(check_totals=True)
+        money_management.load_data({"income": {1: 1000.0, 2: 2000.0}, "expenses": {1: 400.0}})
+        money_management.update_values("i", 1500.0, 2)
+        money_management.change_monthly_vals("250.5", "e")
+        money_management.add_transaction(99.5, "e")
+        self.assertEqual(money_management.get_yearly_income(), 2500.0)
+        self.assertEqual(money_management.get_yearly_expenses(),
+                         sum(money_management.expenses.values()))
+
+    def test_years_are_kept_apart(self):
+        """Test that the same month of different years doesn't overwrite each other."""
+        self.money_management.update_values("i", 1000.0, 1, 2025)
+        self.money_management.update_values("i", 1100.0, 1, 2026)
+        self.money_management.load_data({"income": {2: 900.0}, "expenses": {}}, 2024)
+        self.assertEqual(self.money_management.get_monthly_vals("i", 1, 2025), 1000.0)
+        self.assertEqual(self.money_management.get_yearly_income(2026), 1100.0)
+        self.assertEqual(self.money_management.get_range("i", 2020, 2025), {2024: {2: 900.0}, 2025: {1: 1000.0}})
+        self.assertEqual(self.money_management.get_changes(), {2025: {"income": {1: 1000.0}},
+                                                               2026: {"income": {1: 1100.0}}})
+
+    def test_get_changes_only_returns_modified_months(self):
+        """Test that only months changed after loading are reported as changes."""
+        year = datetime.now().year
+        self.money_management.load_data({"income": {1: 1000.0, 2: 2000.0}, "expenses": {1: 400.0}})
+        self.assertFalse(self.money_management.has_changes())
+        self.money_management.update_values("i", 2500.0, 2)
+        self.assertEqual(self.money_management.get_changes(), {year: {"income": {2: 2500.0}}})
+        self.assertEqual(self.money_management.get_changes(), {})
+
+    def test_add_transaction(self):
+        """Test that individual transactions are summed into the month total."""
+        today = datetime.now().date()
+        self.money_management.add_transaction(40.0, "e", today, "Dining")
+        self.money_management.add_transaction(60.0, "e", today, "Groceries")
+        self.assertEqual(self.money_management.get_monthly_vals("e"), 100.0)
+        self.assertEqual(len(self.money_management.ledger), 2)
+
+    def test_change_monthly_vals_keeps_history(self):
+        """Test that changing a month's value is recorded in the ledger."""
+        self.money_management.change_monthly_vals("1500.0", "i")
+        self.money_management.change_monthly_vals("1800.0", "i")
+        self.assertEqual(self.money_management.get_monthly_vals("i"), 1800.0)
+        self.assertEqual(len(self.money_management.ledger), 2)
+
+
+class TestTransactionLedger(unittest.TestCase):
+    """Test cases for TransactionLedger class."""
+
+    def setUp(self):
+        self.ledger = TransactionLedger()
+
+    def test_append_updates_monthly_total(self):
+        """Test that appending transactions keeps a running month total."""
+        self.ledger.append("e", 20.0, 3, 2024, category="Dining")
+        self.ledger.append("e", 30.0, 3, 2024, category="Groceries")
+        self.assertEqual(len(self.ledger), 2)
+        self.assertEqual(self.ledger.monthly_totals("e", 2024), {3: 50.0})
+        self.assertEqual(self.ledger.monthly_totals("i", 2024), {})
+
+    def test_adjust_to_keeps_history(self):
+        """Test that adjusting a month total appends instead of overwriting."""
+        self.ledger.adjust_to("i", 1000.0, 1, 2024)
+        self.ledger.adjust_to("i", 1200.0, 1, 2024)
+        self.assertEqual(self.ledger.monthly_totals("i", 2024)[1], 1200.0)
+        self.assertEqual([entry.amount for entry in self.ledger], [1000.0, 200.0])
+
+    def test_transaction_fields(self):
+        """Test reading a transaction back from the ledger."""
+        self.ledger.append("i", 10.0, 5, 2023, date(2023, 5, 2), "Salary")
+        entry = self.ledger[0]
+        self.assertEqual(entry, Transaction(date(2023, 5, 2), 10.0, "Salary", "i", 2023, 5))
+        self.assertEqual(self.ledger.years(), [2023])
+
+    def test_compact_keeps_totals(self):
+        """Test that compacting frees the rows but keeps the totals consistent."""
+        self.ledger.append("e", 20.0, 3, 2024)
+        self.ledger.append("e", 30.0, 3, 2024)
+        self.ledger.compact()
+        self.ledger.append("e", 5.0, 3, 2024)
+        self.assertEqual(len(self.ledger), 1)
+        self.assertEqual(self.ledger.monthly_totals("e", 2024), {3: 55.0})
+        self.ledger.check_totals()
+
+    def test_yearly_totals_per_year(self):
+        """Test that running yearly totals are kept separately for each year."""
+        self.ledger.append("i", 100.0, 12, 2023)
+        self.ledger.append("i", 250.0, 1, 2024)
+        self.ledger.adjust_to("i", 300.0, 1, 2024)
+        self.assertEqual(self.ledger.yearly_total("i", 2023), 100.0)
+        self.assertEqual(self.ledger.yearly_total("i", 2024), 300.0)
+        self.assertEqual(self.ledger.yearly_total("e", 2024), 0.0)
+        self.ledger.check_totals()
+
+    def test_copy_is_independent(self):
+        """Test that changing a ledger doesn't change its copy."""
+        self.ledger.append("e", 20.0, 3, 2024, category="Dining")
+        copy = self.ledger.copy()
+        self.ledger.append("e", 30.0, 3, 2024, category="Groceries")
+        self.assertEqual(len(copy), 1)
+        self.assertEqual(copy.monthly_totals("e", 2024), {3: 20.0})
+        copy.check_totals()
+
+    def test_check_totals_detects_mismatch(self):
+        """Test that a corrupted running total is reported."""
+        self.ledger.append("e", 75.0, 2, 2024)
+        self.ledger._yearly[1][2024] = 80.0
+        with self.assertRaises(ValueError):
+            self.ledger.check_totals()
+
+
+class TestMoney(unittest.TestCase):
+    """Test cases for parsing and adding up money amounts."""
+
+    def test_parse_amount_formats(self):
+        """Test parsing amounts with currency symbols, separators and negative forms."""
+        cases = {"1200.5": 120050, "-45": -4500, "$1,200.50": 120050, "1.200,50 €": 120050,
+                 "(45.00)": -4500, "CHF 1'234.55": 123455, "12-": -1200, "1,20": 120, "1,234": 123400,
+                 "1\u00a0200,50": 120050, ".5": 50, "12.345": 1235}
+        for text, cents in cases.items():
+            self.assertEqual(parse_amount(text), cents, text)
+        self.assertEqual(parse_amount("1.200", "de_DE"), 120000)
+        self.assertEqual(parse_amount("1 200,50", "fr_FR"), 120050)
+
+    def test_parse_amount_rejects_invalid(self):
+        """Test that text that isn't an amount raises ValueError."""
+        for text in ("", "abc", "1,2,3", "1.2.3", "--5", "(5", "1e3", "nan", "$"):
+            with self.assertRaises(ValueError, msg=text):
+                parse_amount(text)
+        with self.assertRaises(ValueError):
+            parse_amount("1,5", "xx_XX")
+
+    def test_parse_amounts_matches_parse_amount(self):
+        """Test that bulk parsing gives the same cents as parsing one amount at a time."""
+        for texts in (["-79.43", "5", "0.5"], ["$1,079.43", "-$2.00", "12,345,678.9"], ["1.079,43 €", "3"]):
+            self.assertEqual(list(parse_amounts(texts)), [parse_amount(text) for text in texts])
+        for texts in (["1", "1\n2"], ["1", "x"]):
+            with self.assertRaises(ValueError):
+                parse_amounts(texts)
+
+    def test_money_arithmetic(self):
+        """Test that Money values add up exactly and format for display."""
+        self.assertEqual(sum([Money("0.10")] * 10), Money(1))
+        self.assertEqual(Money("19.99") * 3, Money("59.97"))
+        self.assertEqual(Money("$1,200.50").format(), "$1,200.50")
+        self.assertEqual((-Money(1200.5)).format("de_DE", ""), "-1.200,50")
+        self.assertEqual(to_cents(0.1 + 0.2), 30)
+        self.assertEqual(float(Money("2.50")), 2.5)
+
+    def test_totals_dont_drift(self):
+        """Test that many small amounts add up to the exact total, and that user input is parsed."""
+        money_management, compact = MoneyManagement(check_totals=True), CompactMoneyManagement()
+        for _ in range(10):
+            money_management.add_transaction(0.1, "e", date(2024, 1, 5))
+            compact.add_transaction(0.1, "e", date(2024, 1, 5))
+        self.assertEqual(money_management.get_yearly_expenses(2024), 1.0)
+        self.assertEqual(compact.get_yearly_expenses(2024), 1.0)
+        self.assertEqual(money_management.get_category_totals("e", 2024), {"": 1.0})
+
+        money_management.change_monthly_vals("$1,200.50", "i")
+        self.assertEqual(money_management.get_monthly_vals("i"), 1200.5)
+        with self.assertRaises(ValueError):
+            money_management.change_monthly_vals("twelve", "i")
+        self.assertEqual(money_management.get_monthly_vals("i"), 1200.5)
+        goals = Goals()
+        goals.update_monthly_goal("$1,000", "e", 3, 2024)
+        self.assertEqual(goals.get_monthly_goal("e", 3, 2024), 1000.0)
+
+
+class TestCategoryIndex(unittest.TestCase):
+    """Test cases for the category and tag indexes of the ledger."""
+
+    def setUp(self):
+        self.money_management = MoneyManagement()
+        for month, amount, category, tags in ((1, 300.0, "Dining", ()), (2, 200.0, "Dining", ("date-night",)),
+                                              (3, 100.0, "Dining", ()), (3, 900.0, "Rent", ()),
+                                              (3, 50.0, "Travel", ("date-night", "vacation"))):
+            self.money_management.add_transaction(amount, "e", date(2024, month, 5), category, tags)
+        self.money_management.update_values("e", 1100.0, 3, 2024)
+
+    def test_breakdowns(self):
+        """Test category and tag totals, top categories and the history of a category."""
+        self.assertEqual(self.money_management.top_categories("e", 2, 2024), [("Rent", 900.0), ("Dining", 600.0)])
+        self.assertEqual(self.money_management.get_category_totals("e", 2024, "March"),
+                         {"Dining": 100.0, "Rent": 900.0, "Travel": 50.0, "": 50.0})
+        self.assertEqual(self.money_management.get_tag_totals("e", 2024), {"date-night": 250.0, "vacation": 50.0})
+        self.assertEqual(self.money_management.get_category_history("e", "Dining", 4, 2024, 3),
+                         [(2023, 12, 0.0), (2024, 1, 300.0), (2024, 2, 200.0), (2024, 3, 100.0)])
+        self.assertEqual(self.money_management.get_tag_history("e", "date-night", 2, 2024, 3), [(2024, 2, 200.0), (2024, 3, 50.0)])
+
+    def test_find_transactions(self):
+        """Test filtering line items by category, tag and month."""
+        found = self.money_management.find_transactions(tag="date-night", year=2024)
+        self.assertEqual([(entry.category, entry.month, entry.tags) for entry in found],
+                         [("Dining", 2, ("date-night",)), ("Travel", 3, ("date-night", "vacation"))])
+        self.assertEqual([entry.amount for entry in self.money_management.find_transactions(category="Dining", month=3, year=2024)], [100.0])
+        self.assertEqual(len(self.money_management.find_transactions(year=2024, month="March")), 4)
+        self.assertEqual(self.money_management.find_transactions(category="Groceries"), [])
+
+    def test_copy_and_compact_keep_totals(self):
+        """Test that copies have their own indexes and compacting keeps the category totals."""
+        copy = self.money_management.ledger.copy()
+        self.money_management.add_transaction(10.0, "e", date(2024, 3, 6), "Dining")
+        self.assertEqual(copy.dimension_totals("category", "e", 2024)["Dining"], 600.0)
+        self.assertEqual(len(copy.find(category="Dining")), 3)
+        self.money_management.ledger.compact()
+        self.assertEqual(self.money_management.find_transactions(category="Dining"), [])
+        self.assertEqual(self.money_management.top_categories("e", 1, 2024), [("Rent", 900.0)])
+
+    def test_report_names_largest_expenses(self):
+        """Test that the report's spending suggestions use the month's categories."""
+        goals = Goals()
+        goals.update_monthly_goal("500", "e", 3, 2024)
+        text = generate_report(self.money_management, goals, 3, 2024)
+        self.assertIn("(your largest expenses this month were Rent at $900.00, Dining at $100.00, Travel at $50.00)", text)
+        self.assertIn("Rent cost $900.00 this month, compared with $0.00 a month over the previous 6 months.", text)
+
+    def test_compact_models(self):
+        """Test the same breakdowns on the compact models."""
+        money_management = CompactMoneyManagement()
+        money_management.add_transaction(300.0, "e", date(2024, 1, 5), "Dining")
+        money_management.add_transaction(100.0, "e", date(2024, 3, 5), "Dining")
+        money_management.add_transaction(900.0, "e", date(2024, 3, 5), "Rent")
+        self.assertEqual(money_management.top_categories("e", 10, 2024, 3), [("Rent", 900.0), ("Dining", 100.0)])
+        self.assertEqual(money_management.get_category_history("e", "Dining", 3, 2024, 3),
+                         [(2024, 1, 300.0), (2024, 2, 0.0), (2024, 3, 100.0)])
+
 
 class TestGoals(unittest.TestCase):
     """Test cases for Goals class."""
@@ -99,6 +355,30 @@ class TestGoals(unittest.TestCase):
         self.goals.update_yearly_goal("30000.0", "i")
         self.assertEqual(self.goals.get_yearly_goal("i"), 30000.0)
 
+    def test_get_changes(self):
+        """Test that only goals changed after loading are reported as changes."""
+        self.goals.load_data({"income_goal": {1: 100.0}, "expense_goal": {1: 50.0},
+                              "yearly_income_goal": 1200.0, "yearly_expense_goal": 600.0})
+        self.assertFalse(self.goals.has_changes())
+        self.goals.update_monthly_goal("80.0", "e", 1)
+        self.goals.update_yearly_goal("1500.0", "i")
+        self.assertEqual(self.goals.get_changes(), {datetime.now().year: {"expense_goal": {1: 80.0},
+                                                                          "yearly_income_goal": 1500.0}})
+        self.assertFalse(self.goals.has_changes())
+
+    def test_goals_per_year(self):
+        """Test that monthly and yearly goals are kept per year."""
+        self.goals.update_monthly_goal("100", "i", 1, 2024)
+        self.goals.update_monthly_goal("200", "i", 1, 2025)
+        self.goals.update_yearly_goal("5000", "e", 2024)
+        self.assertEqual(self.goals.get_monthly_goal("i", 1, 2024), 100.0)
+        self.assertEqual(self.goals.get_range("i", 2025, 2030), {2025: {1: 200.0}})
+        self.assertEqual(self.goals.get_yearly_goal("e", 2024), 5000.0)
+        self.assertEqual(self.goals.get_yearly_goal("e", 2025), 0.0)
+        self.assertEqual(self.goals.years(), [2024, 2025])
+        self.assertEqual(self.goals.get_changes(), {2024: {"income_goal": {1: 100.0}, "yearly_expense_goal": 5000.0},
+                                                    2025: {"income_goal": {1: 200.0}}})
+
     def test_get_yearly_goal_expense(self):
         """Test getting yearly expense goal."""
         self.goals.update_yearly_goal("20000.0", "e")
@@ -106,6 +386,1234 @@ class TestGoals(unittest.TestCase):
 
 
 
+class TestCompactModels(unittest.TestCase):
+    """Test cases for the compact drop-ins for MoneyManagement and Goals."""
+
+    def test_same_results_as_money_management(self):
+        """Test that the compact class gives the same totals and changes as MoneyManagement."""
+        regular, compact = MoneyManagement(), CompactMoneyManagement()
+        for money_management in (regular, compact):
+            money_management.load_data({"income": {1: 1000.0}, "expenses": {}}, 2023)
+            money_management.add_transaction(25.0, "e", date(2023, 1, 5), "Dining")
+            money_management.add_transaction(75.0, "e", date(2023, 1, 9), "Groceries")
+            money_management.update_values("i", 1500.0, 2, 2023)
+        self.assertEqual(compact.get_data(2023), regular.get_data(2023))
+        self.assertEqual(compact.get_yearly_expenses(2023), regular.get_yearly_expenses(2023))
+        self.assertEqual(compact.get_range("i", 2022, 2024), regular.get_range("i", 2022, 2024))
+        self.assertEqual(compact.get_changes(), regular.get_changes())
+        self.assertFalse(compact.has_changes())
+
+    def test_api_parity(self):
+        """Test that tags, copies, cubes and reports give the same results with both classes."""
+        regular, compact = MoneyManagement(), CompactMoneyManagement()
+        goals = Goals()
+        goals.update_monthly_goal("100", "e", 1, 2023)
+        for money_management in (regular, compact):
+            money_management.add_transaction(25.0, "e", date(2023, 1, 5), "Dining", ("vacation", "shared"))
+            money_management.add_transaction(75.0, "e", date(2023, 1, 9), "Groceries", ("shared",))
+            money_management.add_transaction(10.0, "e", date(2022, 12, 9), "Dining")
+            money_management.update_values("i", 1500.0, 1, 2023)
+        for name, args in (("get_tag_totals", ("e", 2023)), ("get_tag_totals", ("e", 2023, 1)),
+                           ("get_category_totals", ("e", 2023)), ("top_categories", ("e", 3, 2023, 1)),
+                           ("get_tag_history", ("e", "shared", 3, 2023, 1)),
+                           ("get_category_history", ("e", "Dining", 3, 2023, 1)), ("is_archived", (2023,))):
+            self.assertEqual(getattr(compact, name)(*args), getattr(regular, name)(*args), name)
+
+        regular_copy, compact_copy = regular.copy(), compact.copy()
+        compact.add_transaction(5.0, "e", date(2023, 1, 10), "Dining", ("shared",))
+        self.assertEqual(compact_copy.get_tag_totals("e", 2023), regular_copy.get_tag_totals("e", 2023))
+        self.assertEqual(compact_copy.version, regular_copy.version)
+        self.assertFalse(compact_copy.has_changes())
+        self.assertEqual(generate_report(compact_copy, goals, 1, 2023), generate_report(regular_copy, goals, 1, 2023))
+        if numpy:
+            self.assertEqual(GUI_management.chart_data(compact_copy, goals, 2023),
+                             GUI_management.chart_data(regular_copy, goals, 2023))
+            cubes = [money_management.aggregate(goals) for money_management in (compact_copy, regular_copy)]
+            self.assertEqual(*[dict(zip(cube.categories, cube.by_category("expenses", 2023).tolist())) for cube in cubes])
+
+        self.assertTrue(regular.find_transactions(tag="shared"))
+        with self.assertRaises(NotImplementedError):
+            compact.find_transactions(tag="shared")
+
+    def test_yearly_total_in_cents(self):
+        """Test that yearly totals are summed in cents, like MoneyManagement's."""
+        regular, compact = MoneyManagement(), CompactMoneyManagement()
+        for money_management in (regular, compact):
+            money_management.load_data({"income": {1: 0.1, 2: 0.2}}, 2023)
+        self.assertEqual(compact.get_yearly_income(2023), 0.3)
+        self.assertEqual(compact.get_yearly_income(2023), regular.get_yearly_income(2023))
+
+    def test_category_totals(self):
+        """Test that totals are kept per category, with set totals counted as uncategorized."""
+        compact = CompactMoneyManagement()
+        compact.add_transaction(25.0, "e", date(2023, 1, 5), "Dining")
+        compact.update_values("e", 100.0, "January", 2023)
+        compact.add_transaction(10.0, "e", date(2024, 3, 1), "Rent")
+        self.assertEqual(compact.get_category_totals("e", 2023), {"": 75.0, "Dining": 25.0})
+        self.assertEqual(compact.get_category_totals("e", 2024), {"Rent": 10.0})
+        self.assertEqual(compact.get_monthly_vals("e", 1, 2023), 100.0)
+        with self.assertRaises(KeyError):
+            compact.get_monthly_vals("e", 2, 2023)
+
+    def test_goals(self):
+        """Test that the compact goals give the same results as Goals."""
+        regular, compact = Goals(), CompactGoals()
+        for goals in (regular, compact):
+            goals.load_data({"income_goal": {1: 500.0}, "expense_goal": {}, "yearly_income_goal": 6000.0}, 2023)
+            goals.update_monthly_goal("300", "e", 2, 2023)
+            goals.update_yearly_goal("4000", "e", 2023)
+        self.assertEqual(compact.get_data(2023), regular.get_data(2023))
+        self.assertEqual(compact.get_changes(), regular.get_changes())
+        self.assertEqual(compact.years(), [2023])
+        self.assertEqual(compact.get_yearly_goal("i", 2024), 0.0)
+
+    def test_goal_setters_are_saved(self):
+        """Test that goals set through the properties are returned by get_changes."""
+        year = datetime.now().year
+        for goals in (Goals(), CompactGoals()):
+            goals.income_goal = {1: 500.0, 2: 600.0}
+            goals.yearly_expense_goal = 3000.0
+            self.assertTrue(goals.has_changes())
+            self.assertEqual(goals.get_changes(), {year: {"income_goal": {1: 500.0, 2: 600.0},
+                                                          "yearly_expense_goal": 3000.0}})
+
+    def test_goal_getters_are_read_only(self):
+        """Test that reading the goal properties adds no year and that they can't be written to directly."""
+        for goals in (Goals(), CompactGoals()):
+            self.assertEqual(dict(goals.income_goal), {})
+            self.assertEqual(dict(goals.expense_goal), {})
+            self.assertEqual(goals.years(), [])
+            self.assertFalse(goals.has_changes())
+            with self.assertRaises(TypeError):
+                goals.income_goal[1] = 500.0
+            goals.update_monthly_goal("500", "i", 1)
+            self.assertEqual(dict(goals.income_goal), {1: 500.0})
+
+    def test_no_instance_dict(self):
+        """Test that the compact classes use __slots__."""
+        for instance in (CompactMoneyManagement(), CompactGoals()):
+            self.assertFalse(hasattr(instance, "__dict__"))
+
+
+class TestGoalMonitor(unittest.TestCase):
+    """Test cases for the incremental goal monitor."""
+
+    def setUp(self):
+        self.money_management = MoneyManagement()
+        self.goals = Goals()
+        self.goals.update_monthly_goal("1000", "e", 3, 2024)
+        self.goals.update_yearly_goal("10000", "e", 2024)
+        self.alerts = []
+        self.monitor = GoalMonitor(self.money_management, self.goals, on_alert=self.alerts.append)
+
+    def test_subscribe(self):
+        """Test that subscribers are told which month changed."""
+        changes = []
+        callback = self.money_management.subscribe(lambda *change: changes.append(change))
+        self.money_management.update_values("i", 100.0, "March", 2024)
+        self.money_management.add_transaction(5.0, "e", date(2024, 4, 2))
+        self.money_management.unsubscribe(callback)
+        self.money_management.update_values("i", 200.0, "March", 2024)
+        self.assertEqual(changes, [("i", 2024, "March"), ("e", 2024, 4)])
+
+    def test_alert_once_per_crossing(self):
+        """Test that a threshold raises one alert when crossed, and another when the total falls back."""
+        self.money_management.add_transaction(500.0, "e", date(2024, 3, 1))
+        self.money_management.add_transaction(350.0, "e", date(2024, 3, 2))
+        self.money_management.add_transaction(10.0, "e", date(2024, 3, 3))
+        self.assertEqual([(alert.month, alert.threshold, alert.rising) for alert in self.alerts], [(3, 0.8, True)])
+        self.money_management.update_values("e", 1200.0, 3, 2024)
+        self.money_management.update_values("e", 100.0, 3, 2024)
+        self.assertEqual([(alert.threshold, alert.rising) for alert in self.alerts],
+                         [(0.8, True), (1.0, True), (0.8, False)])
+        self.assertEqual(format_alert(self.alerts[1]), "Expenses for March 2024 reached 100% of the goal ($1200.00 of $1000.00)")
+        self.assertEqual(self.monitor.variance("e", 2024, 3), 900.0)
+
+    def test_goal_changes_and_yearly_goals(self):
+        """Test that lowering a goal and yearly totals are evaluated too."""
+        self.money_management.update_values("e", 500.0, 3, 2024)
+        self.assertEqual(self.alerts, [])
+        self.goals.update_monthly_goal("500", "e", 3, 2024)
+        self.assertEqual((self.alerts[-1].month, self.alerts[-1].threshold), (3, 1.0))
+        self.money_management.load_data({"income": {}, "expenses": {month: 700.0 for month in range(1, 13)}}, 2024)
+        self.assertEqual((self.alerts[-1].month, self.alerts[-1].threshold), (None, 0.8))
+
+    def test_prime_and_close(self):
+        """Test that primed totals don't alert again and a closed monitor stops alerting."""
+        self.money_management.update_values("e", 900.0, 3, 2024)
+        monitor = GoalMonitor(self.money_management, self.goals, on_alert=self.fail)
+        monitor.prime([2024])
+        self.money_management.update_values("e", 950.0, 3, 2024)
+        monitor.close()
+        self.monitor.close()
+        self.money_management.update_values("e", 1500.0, 3, 2024)
+        self.assertEqual(len(self.alerts), 1)
+
+    def test_compact_models(self):
+        """Test that the compact models notify the monitor as well."""
+        money_management, goals, alerts = CompactMoneyManagement(), CompactGoals(), []
+        GoalMonitor(money_management, goals, on_alert=alerts.append)
+        goals.update_monthly_goal("100", "i", "May", 2024)
+        money_management.update_values("i", 150.0, "May", 2024)
+        self.assertEqual([(alert.month, alert.threshold) for alert in alerts], [(5, 1.0)])
+
+
+class TestStorageBackends(unittest.TestCase):
+    """Test cases for the DataPersistence storage backends."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.sqlite_path = os.path.join(self.tmpdir.name, "data.sqlite3")
+
+    def test_sqlite_round_trip(self):
+        """Test writing and reading a year of data with SQLite."""
+        backend = SQLiteBackend(self.sqlite_path)
+        self.addCleanup(backend.close)
+        backend.write({"income": {1: 1000.0, "January": 5.0}, "yearly_income_goal": 12000.0}, 2024)
+        reopened = SQLiteBackend(self.sqlite_path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.read(2024), {"income": {1: 1000.0, "January": 5.0},
+                                               "yearly_income_goal": 12000.0})
+        self.assertEqual(reopened.read(2023), {})
+        self.assertEqual(reopened.read_month(2024, 1), {"income": 1000.0})
+
+    def test_partial_year_loads_after_restart(self):
+        """Test that a year saved with only some kinds loads again on the next start."""
+        filename = os.path.join(self.tmpdir.name, "data")
+        money_management = MoneyManagement()
+        money_management.update_values("i", 1000.0, 4, 2024)
+        with patch("builtins.print"), DataPersistence(filename=filename) as persistence:
+            persistence.save_changes(money_management.get_changes())
+        money_management, goals = MoneyManagement(), Goals()
+        compact, compact_goals = CompactMoneyManagement(), CompactGoals()
+        with patch("builtins.print"), DataPersistence(filename=filename) as persistence:
+            data = persistence.read_data(2024)
+            self.assertEqual(data, {"income": {4: 1000.0}})
+            for model in (money_management, goals, compact, compact_goals):
+                model.load_data(data, 2024)
+        self.assertEqual(money_management.get_year("i", 2024), {4: 1000.0})
+        self.assertEqual(compact.get_year("i", 2024), {4: 1000.0})
+        self.assertEqual(goals.get_monthly_goals("i", 2024), {})
+
+    def test_sqlite_writes_only_changed_rows(self):
+        """Test that saving unchanged data doesn't touch the database."""
+        backend = SQLiteBackend(self.sqlite_path)
+        self.addCleanup(backend.close)
+        data = {"income": {month: 100.0 for month in range(1, 13)}, "expenses": {1: 50.0}}
+        backend.write(data, 2024)
+        before = backend._connection.total_changes
+        backend.write(data, 2024)
+        self.assertEqual(backend._connection.total_changes, before)
+        data["income"][3] = 300.0
+        backend.write(data, 2024)
+        self.assertEqual(backend._connection.total_changes, before + 1)
+
+    def test_shelve_write_keeps_other_kinds(self):
+        """Test that writing one kind to the shelve backend keeps the others."""
+        backend = ShelveBackend(os.path.join(self.tmpdir.name, "data"))
+        self.addCleanup(backend.close)
+        backend.write({"income": {1: 10.0}, "expenses": {1: 5.0}})
+        backend.write({"income": {1: 20.0}})
+        self.assertEqual(backend.read(), {"income": {1: 20.0}, "expenses": {1: 5.0}})
+
+    def test_failed_open_raises(self):
+        """Test that a data file that can't be opened is reported instead of leaving no backend."""
+        blocker = os.path.join(self.tmpdir.name, "not_a_directory")
+        with open(blocker, "w") as output:
+            output.write("in the way")
+        with self.assertRaises(StorageError):
+            DataPersistence(filename=os.path.join(blocker, "data"))
+
+    def test_shelve_opened_once_and_batched(self):
+        """Test that the shelve file is opened once and writes are synced in batches."""
+        path = os.path.join(self.tmpdir.name, "data")
+        with patch("persistence.shelve.open", wraps=shelve.open) as mock_open:
+            with DataPersistence(ShelveBackend(path, sync_every=0)) as persistence:
+                with patch.object(persistence.backend._db, "sync", wraps=persistence.backend._db.sync) as mock_sync:
+                    for month in range(1, 13):
+                        persistence.update_database(income={month: float(month)})
+                    persistence.read_data()
+                    mock_sync.assert_not_called()
+                    persistence.flush()
+                    mock_sync.assert_called_once()
+        mock_open.assert_called_once()
+        with ShelveBackend(path) as backend:
+            self.assertEqual(backend.read(), {"income": {12: 12.0}})
+
+    def test_save_changes_merges_months(self):
+        """Test that saving changes keeps the months that didn't change."""
+        for backend in (SQLiteBackend(self.sqlite_path), ShelveBackend(os.path.join(self.tmpdir.name, "data"))):
+            self.addCleanup(backend.close)
+            persistence = DataPersistence(backend)
+            backend.write({"income": {1: 10.0, 2: 20.0}, "yearly_income_goal": 100.0}, 2024)
+            self.assertTrue(persistence.save_changes({2024: {"income": {2: 25.0}}},
+                                                     {2024: {"expense_goal": {2: 5.0}}}))
+            self.assertEqual(backend.read(2024), {"income": {1: 10.0, 2: 25.0}, "expense_goal": {2: 5.0},
+                                                  "yearly_income_goal": 100.0})
+
+    def test_save_changes_retries_after_error(self):
+        """Test that changes that failed to save are kept for the next save."""
+        backend = MagicMock(shared=False)
+        backend.update.side_effect = [StorageError("disk full"), None, None]
+        persistence = DataPersistence(backend)
+        self.assertFalse(persistence.save_changes({2024: {"income": {1: 10.0}}}))
+        self.assertTrue(persistence.save_changes({2024: {"income": {2: 20.0}}}))
+        backend.update.assert_called_with({"income": {1: 10.0, 2: 20.0}}, 2024)
+
+    def test_migrate_shelve_to_sqlite(self):
+        """Test importing an existing shelve file into SQLite."""
+        shelve_path = os.path.join(self.tmpdir.name, "financial_management_data")
+        with ShelveBackend(shelve_path) as backend:
+            backend.write({"income": {4: 1000.0}, "expense_goal": {4: 300.0}, "yearly_expense_goal": 5000.0}, 2024)
+            backend.write({"income": {4: 900.0}}, 2023)
+        migrate_shelve_to_sqlite(shelve_path, self.sqlite_path)
+        persistence = DataPersistence(SQLiteBackend(self.sqlite_path))
+        self.addCleanup(persistence.backend.close)
+        self.assertEqual(persistence.read_data(2024), {"income": {4: 1000.0}, "expense_goal": {4: 300.0},
+                                                       "yearly_expense_goal": 5000.0})
+        self.assertEqual(persistence.read_month(4, 2024), {"income": 1000.0, "expense_goal": 300.0})
+        self.assertEqual(persistence.read_range(2000, 2023), {2023: {"income": {4: 900.0}}})
+
+    def test_shelve_years_index(self):
+        """Test that each year is stored under its own key and found through the index."""
+        with ShelveBackend(os.path.join(self.tmpdir.name, "data")) as backend:
+            for year in (2019, 2015, 2017):
+                backend.write({"income": {1: float(year)}}, year)
+            self.assertEqual(backend.years(), [2015, 2017, 2019])
+            self.assertEqual(backend.read_range(2016, 2019), {2017: {"income": {1: 2017.0}},
+                                                              2019: {"income": {1: 2019.0}}})
+
+    def test_shelve_legacy_data_moves_to_current_year(self):
+        """Test that the single 'data' key of older files becomes the current year."""
+        path = os.path.join(self.tmpdir.name, "financial_management_data")
+        with shelve.open(path, "c") as db:
+            db["data"] = {"income": {4: 1000.0}, "yearly_income_goal": 12000.0}
+        with ShelveBackend(path) as backend:
+            self.assertEqual(backend.years(), [datetime.now().year])
+            self.assertEqual(backend.read(), {"income": {4: 1000.0}, "yearly_income_goal": 12000.0})
+
+
+class TestJournal(unittest.TestCase):
+    """Test cases for the write-ahead journal of DataPersistence."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.filename = os.path.join(self.tmpdir.name, "data")
+        self.journal_path = self.filename + ".journal"
+
+    def test_unsaved_changes_are_recovered(self):
+        """Test that changes of a session that never saved are applied when the file is opened again."""
+        journal = Journal(self.journal_path, commit_interval=0)
+        # The crashed session's store never reaches the disk, so it is a throwaway file here
+        lost = ShelveBackend(os.path.join(self.tmpdir.name, "lost"))
+        self.addCleanup(lost.close)
+        persistence = DataPersistence(lost, journal=journal)
+        money_management, goals = MoneyManagement(), Goals()
+        persistence.attach(money_management, goals)
+        money_management.update_values("i", 1200.0, 3, 2024)
+        goals.update_yearly_goal(5000.0, "e", 2024)
+        persistence.update_database(income_goal={1: 10.0}, year=2023)
+        journal.commit()
+        self.assertEqual(len(journal), 3)
+        journal._file.close()
+
+        with DataPersistence(filename=self.filename) as reopened:
+            self.assertEqual(reopened.read_data(2024), {"income": {3: 1200.0}, "yearly_expense_goal": 5000.0})
+            self.assertEqual(reopened.read_data(2023), {"income_goal": {1: 10.0}})
+            self.assertEqual(len(reopened.journal), 0)
+        self.assertEqual(os.path.getsize(self.journal_path), 0)
+
+    def test_torn_tail_is_discarded(self):
+        """Test that a record cut off by a crash is dropped and the ones before it are kept."""
+        journal = Journal(self.journal_path, commit_interval=0)
+        journal.append(2024, {"income": {1: 1.0}})
+        journal.append(2024, {"income": {2: 2.0}})
+        journal.close()
+        with open(self.journal_path, "r+b") as file:
+            file.truncate(os.path.getsize(self.journal_path) - 3)
+        reopened = Journal(self.journal_path, commit_interval=0)
+        self.addCleanup(reopened.close)
+        self.assertEqual(len(reopened), 1)
+        with ShelveBackend(self.filename) as backend:
+            self.assertEqual(reopened.compact(backend), 1)
+            self.assertEqual(backend.read(2024), {"income": {1: 1.0}})
+
+    def test_save_compacts_and_group_commit(self):
+        """Test that saving empties the journal and that concurrent commits keep every record."""
+        with DataPersistence(filename=self.filename) as persistence:
+            money_management, goals = MoneyManagement(), Goals()
+            persistence.attach(money_management, goals)
+
+            def edit(month):
+                for value in range(50):
+                    money_management.update_values("e", float(value), month, 2024)
+                    persistence.journal.commit()
+            threads = [threading.Thread(target=edit, args=(month,)) for month in range(1, 5)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(len(persistence.journal), 200)
+            self.assertTrue(persistence.save_changes(money_management.get_changes(), goals.get_changes()))
+            self.assertEqual(len(persistence.journal), 0)
+            self.assertEqual(persistence.read_data(2024)["expenses"], {month: 49.0 for month in range(1, 5)})
+
+
+class TestSharedAccess(unittest.TestCase):
+    """Test cases for several processes using the same shelve file."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.filename = os.path.join(self.tmpdir.name, "data")
+
+    def open(self) -> DataPersistence:
+        persistence = DataPersistence(filename=self.filename, journal=False, shared=True)
+        self.addCleanup(persistence.close)
+        return persistence
+
+    def test_shared_mode_is_opt_in(self):
+        """Test that shared mode is off unless a flag or the environment variable asks for it."""
+        import persistence
+        with patch.dict(os.environ, {persistence.SHARED_ENV_VAR: ""}):
+            self.assertFalse(persistence.shared_requested())
+            self.assertTrue(persistence.shared_requested(True))
+        with patch.dict(os.environ, {persistence.SHARED_ENV_VAR: "1"}):
+            self.assertTrue(persistence.shared_requested())
+
+    def test_shared_without_file_locks(self):
+        """Test that shared mode falls back to a private backend where fcntl is missing."""
+        import persistence
+        with patch.object(persistence, "fcntl", None), patch("builtins.print") as mock_print:
+            with ShelveBackend(self.filename, shared=True) as backend:
+                self.assertFalse(backend.shared)
+                backend.write({"income": {1: 5.0}}, 2024)
+        self.assertIn("Warning", mock_print.call_args[0][0])
+        self.assertEqual(self.open().read_data(2024), {"income": {1: 5.0}})
+
+    def test_merge_changes(self):
+        """Test the month by month merge of two writers' changes."""
+        base = {"income": {1: 10.0, 2: 20.0}, "yearly_income_goal": 100.0}
+        ours = {"income": {1: 10.0, 2: 25.0, 3: 30.0}, "yearly_income_goal": 100.0}
+        theirs = {"income": {1: 15.0, 2: 22.0}, "yearly_income_goal": 200.0}
+        merged, conflicts = merge_changes(base, ours, theirs)
+        self.assertEqual(merged, {"income": {1: 15.0, 2: 25.0, 3: 30.0}})
+        self.assertEqual(conflicts, [("income", 2)])
+
+    def test_stale_writer_keeps_other_months(self):
+        """Test that a write based on an old version merges with the newer stored months."""
+        first, second = self.open(), self.open()
+        first_income = first.read_data(2024).get("income", {})
+        second_income = second.read_data(2024).get("income", {})
+        first_income[1] = 100.0
+        first.update_database(income=first_income, year=2024)
+        second_income[2] = 200.0
+        second.update_database(income=second_income, year=2024)
+        self.assertEqual(self.open().read_data(2024), {"income": {1: 100.0, 2: 200.0}})
+        self.assertEqual(second.conflicts, [])
+
+        first_income[2] = 250.0
+        first.update_database(income=first_income, year=2024)
+        self.assertEqual(first.conflicts, [(2024, "income", 2)])
+        self.assertEqual(self.open().read_data(2024)["income"], {1: 100.0, 2: 250.0})
+
+    def test_parallel_writers_lose_nothing(self):
+        """Test several writer processes against one file."""
+        results = run_stress(self.filename, processes=4, writes=20)
+        self.assertEqual(results["lost"], 0)
+        self.assertEqual(results["conflicts"], 0)
+
+    def test_parallel_writers_with_journals(self):
+        """Test that replaying the writers' journals doesn't undo other writers' months."""
+        results = run_stress(self.filename, processes=4, writes=20, journal=True)
+        self.assertEqual(results["lost"], 0)
+        self.assertEqual(results["conflicts"], 0)
+
+    def test_journal_replay_keeps_newer_writes(self):
+        """Test that values replayed from a journal when it closes don't overwrite a later write."""
+        journaled = DataPersistence(filename=self.filename, journal=self.filename + ".journal", shared=True)
+        journaled.update_database(income={1: 100.0, 2: 200.0}, year=2024)
+        journaled.update_database(income={1: 150.0, 2: 200.0}, year=2024)
+        other = self.open()
+        income = other.read_data(2024)["income"]
+        income[2] = 999.0
+        other.update_database(income=income, year=2024)
+        journaled.close()
+        self.assertEqual(self.open().read_data(2024)["income"], {1: 150.0, 2: 999.0})
+
+    def test_save_changes_reports_conflicts(self):
+        """Test that saving a month another writer changed since it was read is reported."""
+        first, second = self.open(), self.open()
+        for persistence, month in ((first, 3), (second, 4)):
+            persistence.read_data(2024)
+            persistence.save_changes({2024: {"expenses": {month: 10.0}}})
+        first.save_changes({2024: {"expenses": {4: 20.0}}})
+        self.assertEqual(first.conflicts, [(2024, "expenses", 4)])
+        self.assertEqual(second.conflicts, [])
+        self.assertEqual(self.open().read_data(2024)["expenses"], {3: 10.0, 4: 20.0})
+
+    def test_journal_has_one_owner(self):
+        """Test that a second process can't open a journal that is in use."""
+        journal = Journal(self.filename + ".journal", commit_interval=0)
+        self.addCleanup(journal.close)
+        with self.assertRaises(StorageError):
+            Journal(self.filename + ".journal", commit_interval=0)
+
+
+class TestColumnarArchive(unittest.TestCase):
+    """Test cases for the memory-mapped columnar archive."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.path = os.path.join(self.tmpdir.name, "history.fmarch")
+        self.shelve = ShelveBackend(os.path.join(self.tmpdir.name, "data"))
+        self.addCleanup(self.shelve.close)
+        self.shelve.write({"income": {1: 1000.0, "March": 250.0, "Bonus": 5.0}, "expenses": {12: 80.0},
+                           "yearly_income_goal": 15000.0}, 2021)
+        self.shelve.write({"expense_goal": {2: 400.0}}, 2023)
+
+    def test_export_and_read(self):
+        """Test that exported years read back with calendar month keys."""
+        self.assertEqual(export_archive(self.shelve, self.path), {"years": 2, "skipped": 1})
+        with ColumnarArchive(self.path) as archive:
+            self.assertEqual(archive.years(), [2021, 2023])
+            self.assertEqual(archive.read(2021), {"income": {1: 1000.0, 3: 250.0}, "expenses": {12: 80.0},
+                                                  "yearly_income_goal": 15000.0})
+            self.assertEqual(archive.read(2022), {})
+            self.assertEqual(archive.read_month(2021, "March"), {"income": 250.0})
+            self.assertEqual(archive.yearly_total("i", 2021), 1250.0)
+            self.assertEqual(archive.chart_data(2023)["expense_goal"][:3], [0.0, 400.0, 0.0])
+            self.assertEqual(len(archive.monthly("income", 2021)), 12)
+            self.assertIsNone(archive.monthly("income", 2022))
+
+    def test_read_only_persistence_and_import(self):
+        """Test reading an archive through DataPersistence and importing it into another shelve file."""
+        export_archive(self.shelve, self.path)
+        with DataPersistence(ColumnarArchive(self.path)) as persistence:
+            self.assertEqual(persistence.read_data(2023), {"expense_goal": {2: 400.0}})
+            with self.assertRaises(StorageError):
+                persistence.backend.write({}, 2023)
+        with ShelveBackend(os.path.join(self.tmpdir.name, "copy")) as target:
+            self.assertEqual(import_archive(self.path, target), 2)
+            self.assertEqual(target.read(2021)["income"], {1: 1000.0, 3: 250.0})
+
+    def test_archived_years_in_money_management(self):
+        """Test that yearly totals and charts of years only in the archive are read from it."""
+        from io import BytesIO
+        from matplotlib.figure import Figure
+        from reports import draw_monthly_chart
+        export_archive(self.shelve, self.path)
+        with ColumnarArchive(self.path) as archive:
+            money_management = MoneyManagement(archive=archive)
+            money_management.update_values("e", 30.0, 1, 2023)
+            self.assertTrue(money_management.is_archived(2021))
+            self.assertFalse(money_management.is_archived(2023))
+            self.assertEqual(money_management.get_yearly_income(2021), 1250.0)
+            self.assertEqual(money_management.get_yearly_expenses(2021), 80.0)
+            self.assertEqual(money_management.get_yearly_expenses(2023), 30.0)
+
+            data = archive.chart_data(2021)
+            figure = Figure()
+            artists = draw_monthly_chart(figure, data["income"], data["expenses"], data["income_goal"],
+                                         data["expense_goal"])
+            figure.savefig(BytesIO(), format="png")
+            self.assertEqual([bar.get_height() for bar in artists["income_bars"]][:3], [1000.0, 0.0, 250.0])
+
+    def test_invalid_file(self):
+        """Test that files in other formats are rejected."""
+        with open(self.path, "wb") as output:
+            output.write(b"not an archive at all")
+        with self.assertRaises(StorageError):
+            ColumnarArchive(self.path)
+
+
+class TestWorkspaces(unittest.TestCase):
+    """Test cases for named workspaces."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.sqlite_path = os.path.join(self.tmpdir.name, "data.sqlite3")
+
+    def test_sqlite_workspaces_are_separate(self):
+        """Test that workspaces in one database don't see each other's data and share a connection."""
+        pool = ConnectionPool()
+        home = SQLiteBackend(self.sqlite_path, workspace="home", pool=pool)
+        office = SQLiteBackend(self.sqlite_path, workspace="office", pool=pool)
+        home.write({"income": {1: 100.0}}, 2024)
+        office.write({"income": {1: 200.0}, "yearly_income_goal": 5.0}, 2023)
+        self.assertIs(home._connection, office._connection)
+        self.assertEqual(home.read(2024), {"income": {1: 100.0}})
+        self.assertEqual(home.years(), [2024])
+        self.assertEqual(office.years(), [2023])
+        self.assertEqual(home.workspaces(), ["home", "office"])
+        home.close()
+        self.assertEqual(pool.open_connections(), 1)
+        office.close()
+        self.assertEqual(pool.open_connections(), 0)
+
+    def test_sqlite_upgrade_keeps_data(self):
+        """Test that a database created before workspaces is upgraded and its rows kept."""
+        connection = sqlite3.connect(self.sqlite_path)
+        connection.executescript("""
+            CREATE TABLE monthly_values (year INTEGER NOT NULL, month NOT NULL, kind TEXT NOT NULL,
+                value REAL NOT NULL, PRIMARY KEY (year, month, kind)) WITHOUT ROWID;
+            CREATE TABLE yearly_values (year INTEGER NOT NULL, kind TEXT NOT NULL,
+                value REAL NOT NULL, PRIMARY KEY (year, kind)) WITHOUT ROWID;
+            INSERT INTO monthly_values VALUES (2022, 4, 'income', 10.0);
+            INSERT INTO yearly_values VALUES (2022, 'yearly_income_goal', 99.0);
+        """)
+        connection.close()
+        backend = SQLiteBackend(self.sqlite_path)
+        self.addCleanup(backend.close)
+        self.assertEqual(backend.read(2022), {"income": {4: 10.0}, "yearly_income_goal": 99.0})
+        other = SQLiteBackend(self.sqlite_path, workspace="other")
+        self.addCleanup(other.close)
+        self.assertEqual(other.read(2022), {})
+
+    def test_manager_evicts_least_recently_used(self):
+        """Test that opening more workspaces than allowed saves and closes the least recently used one."""
+        evicted = []
+        with WorkspaceManager(sqlite=self.sqlite_path, max_open=2, on_evict=lambda workspace: evicted.append(workspace.name)) as workspaces:
+            workspaces.open("a").load_year(2024)
+            workspaces.open("a").money_management.update_values("i", 100.0, 1, 2024)
+            workspaces.open("b")
+            workspaces.open("a")
+            workspaces.open("c")
+            self.assertEqual(evicted, ["b"])
+            self.assertFalse(workspaces.is_open("b"))
+            workspaces.open("d")
+            self.assertEqual(evicted, ["b", "a"])
+            self.assertEqual(workspaces.names(), ["a", "c", "d"])
+            workspaces.open("a").load_year(2024)
+            self.assertEqual(workspaces.open("a").money_management.get_year("i", 2024), {1: 100.0})
+
+    def test_workspaces_load_lazily(self):
+        """Test that a shelve workspace is only read once it is used."""
+        with WorkspaceManager(self.tmpdir.name) as workspaces:
+            workspace = workspaces.open("household")
+            self.assertFalse(workspace.loaded)
+            workspace.goals.update_yearly_goal("1200", "i", 2024)
+        self.assertEqual(WorkspaceManager(self.tmpdir.name).names(), ["household"])
+        with WorkspaceManager(self.tmpdir.name) as workspaces:
+            workspace = workspaces.open("household")
+            self.assertEqual(workspace.goals.get_yearly_goal("i", 2024), 0.0)
+            workspace.load_year(2024)
+            self.assertEqual(workspace.goals.get_yearly_goal("i", 2024), 1200.0)
+        with self.assertRaises(ValueError):
+            WorkspaceManager(self.tmpdir.name).open("../escape")
+
+    def test_workspace_reads_only_requested_years(self):
+        """Test that opening a workspace reads the current year only, and other years when asked for."""
+        year = datetime.now().year
+        with WorkspaceManager(self.tmpdir.name) as workspaces:
+            persistence = workspaces.open("household").persistence
+            for stored_year in (year - 10, year - 1, year):
+                persistence.update_database(income={1: float(stored_year)}, year=stored_year)
+        with WorkspaceManager(self.tmpdir.name) as workspaces:
+            workspace = workspaces.open("household")
+            with patch.object(workspace.persistence, "read_data", wraps=workspace.persistence.read_data) as mock_read, \
+                    patch.object(workspace.persistence, "read_range") as mock_range:
+                self.assertEqual(workspace.money_management.get_year("i"), {1: float(year)})
+                self.assertEqual(workspace.money_management.get_year("i", year - 10), {})
+                workspace.load_year(year - 1)
+                workspace.load_year(year - 1)
+            self.assertEqual([call.args[0] for call in mock_read.call_args_list], [year, year - 1])
+            mock_range.assert_not_called()
+            self.assertEqual(workspace.money_management.get_year("i", year - 1), {1: float(year - 1)})
+            self.assertFalse(workspace.money_management.has_changes())
+
+            server = ApiServer(workspace.money_management, workspace.goals, load_year=workspace.load_year)
+            status, totals = server.dispatch("GET", f"/totals/monthly?type=i&year={year - 10}", b"")
+            self.assertEqual((status, totals), (200, {1: float(year - 10)}))
+
+
+class TestApiServer(unittest.TestCase):
+    """Test cases for the HTTP/JSON API server."""
+
+    def setUp(self):
+        self.server = ApiServer(MoneyManagement(), Goals())
+
+    def call(self, method, target, body=None):
+        status, payload = self.server.dispatch(method, target, json.dumps(body).encode() if body is not None else b"")
+        return status, payload
+
+    def test_update_and_read_values(self):
+        """Test updating values and goals and reading totals and reports back."""
+        self.assertEqual(self.call("POST", "/values", {"type": "i", "value": 1000, "month": 3, "year": 2024})[0], 200)
+        self.assertEqual(self.call("POST", "/values", {"type": "i", "value": 500, "month": "4", "year": 2024})[0], 200)
+        self.assertEqual(self.call("POST", "/goals", {"type": "i", "goal": "1200", "month": 3, "year": 2024})[0], 200)
+        self.assertEqual(self.call("GET", "/totals/monthly?type=i&year=2024"), (200, {3: 1000.0, 4: 500.0}))
+        self.assertEqual(self.call("GET", "/totals/yearly?type=i&year=2024"), (200, {"total": 1500.0}))
+        self.assertEqual(self.call("GET", "/goals?type=i&year=2024"), (200, {3: 1200.0}))
+        self.assertIn("income goal of $1200.00", self.call("GET", "/report?month=3&year=2024")[1]["report"])
+
+    def test_categories(self):
+        """Test the largest categories of a month."""
+        for category, amount in (("Rent", 900.0), ("Dining", 120.0), ("Travel", 80.0)):
+            self.server.money_management.add_transaction(amount, "e", date(2024, 4, 1), category)
+        self.assertEqual(self.call("GET", "/categories?type=e&year=2024&month=4&top=2"),
+                         (200, {"categories": [("Rent", 900.0), ("Dining", 120.0)]}))
+        self.assertEqual(self.call("GET", "/categories?top=many")[0], 400)
+
+    def test_errors(self):
+        """Test that bad requests get an error status instead of failing."""
+        self.assertEqual(self.call("GET", "/nothing")[0], 404)
+        self.assertEqual(self.call("GET", "/values")[0], 405)
+        self.assertEqual(self.call("POST", "/values", {"type": "x", "value": 1, "month": 1})[0], 400)
+        self.assertEqual(self.call("POST", "/values", {"type": "i", "month": 1})[0], 400)
+        self.assertEqual(self.server.dispatch("POST", "/values", b"{not json")[0], 400)
+        for month in (13, 0, "Smarch", "", True, 2.5, None):
+            self.assertEqual(self.call("POST", "/values", {"type": "i", "value": 1, "month": month})[0], 400)
+        self.assertEqual(self.call("GET", "/report?month=13")[0], 400)
+        self.assertEqual(self.server.money_management.get_year("i"), {})
+
+    def test_month_names(self):
+        """Test that month names are stored under their month number."""
+        self.assertEqual(self.call("POST", "/values", {"type": "i", "value": 5, "month": "April", "year": 2024})[0], 200)
+        self.assertEqual(self.call("GET", "/totals/monthly?type=i&year=2024"), (200, {4: 5.0}))
+
+    def test_handler_failure(self):
+        """Test that an unexpected error in a handler is answered with 500."""
+        with patch.object(self.server.report_engine, "report", side_effect=RuntimeError("boom")), \
+                patch("builtins.print"):
+            self.assertEqual(self.call("GET", "/report?month=3&year=2024"),
+                             (500, {"error": "Internal server error"}))
+
+    def test_batch_is_all_or_nothing(self):
+        """Test that a batch with an invalid update applies none of its updates."""
+        updates = [{"op": "values", "type": "e", "value": 10, "month": month, "year": 2024} for month in range(1, 13)]
+        self.assertEqual(self.call("POST", "/batch", {"updates": updates}), (200, {"updated": 12}))
+        updates = [dict(update, value=99) for update in updates]
+        updates[5] = {"op": "values", "type": "e", "month": 6}
+        self.assertEqual(self.call("POST", "/batch", {"updates": updates})[0], 400)
+        self.assertEqual(self.server.money_management.get_yearly_expenses(2024), 120.0)
+
+    def test_concurrent_clients_and_save(self):
+        """Test serving concurrent keep-alive clients over HTTP and saving their changes on close."""
+        tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmpdir.cleanup)
+        persistence = DataPersistence(SQLiteBackend(os.path.join(tmpdir.name, "data.sqlite3")))
+        self.addCleanup(persistence.close)
+        server = ApiServer(MoneyManagement(), Goals(), persistence, save_interval=60)
+
+        async def client(port, month):
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            for value in (1.0, float(month)):
+                body = json.dumps({"type": "e", "value": value, "month": month, "year": 2024}).encode()
+                writer.write(b"POST /values HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s" % (len(body), body))
+                await writer.drain()
+                self.assertIn(b" 200 ", await reader.readline())
+                headers = await reader.readuntil(b"\r\n\r\n")
+                length = int(headers.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+                await reader.readexactly(length)
+            writer.close()
+
+        async def scenario():
+            port = (await server.start("127.0.0.1", 0)).sockets[0].getsockname()[1]
+            await asyncio.gather(*(client(port, month) for month in range(1, 13)))
+            await server.close()
+
+        asyncio.run(scenario())
+        self.assertEqual(persistence.read_data(2024), {"expenses": {month: float(month) for month in range(1, 13)}})
+
+
+class TestBenchmarks(unittest.TestCase):
+    """Test cases for the benchmark runner."""
+
+    def test_measure_and_compare(self):
+        """Test measuring a benchmark and flagging a slower run as a regression."""
+        from benchmarks.run import BENCHMARKS, measure, compare
+        result = measure(BENCHMARKS["load_data"][1], 2, repeat=1)
+        self.assertEqual(result["ops"], 2)
+        self.assertGreater(result["peak_bytes"], 0)
+        result.update(name="load_data", size=2)
+        slower = dict(result, median_s=result["median_s"] * 2)
+        with patch("builtins.print"):
+            self.assertEqual(compare([slower], [result], 1.5), [("load_data", 2)])
+            self.assertEqual(compare([result], [slower], 1.5), [])
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test cases for the opt-in timing instrumentation."""
+
+    def setUp(self):
+        import instrumentation
+        self.instrumentation = instrumentation
+        instrumentation.reset()
+        self.addCleanup(instrumentation.reset)
+
+    def test_disabled_returns_function_unchanged(self):
+        """Test that decorating costs nothing while instrumentation is off."""
+        def read():
+            return {}
+        with patch.object(self.instrumentation, "enabled", False):
+            self.assertIs(self.instrumentation.timed("test.read")(read), read)
+
+    def test_records_calls_and_storage_bytes(self):
+        """Test that calls, time and the bytes the backends read and write are recorded and exported."""
+        with tempfile.TemporaryDirectory() as tmpdir, patch.object(self.instrumentation, "enabled", True):
+            read = self.instrumentation.timed("test.read")(lambda backend: backend.read(2024))
+            write = self.instrumentation.timed("test.write")(lambda backend, data: backend.write(data, 2024))
+            with ShelveBackend(os.path.join(tmpdir, "data"), shared=True) as shelf:
+                write(shelf, {"income": {1: 100.0}})
+                read(shelf)
+                read(shelf)
+            with SQLiteBackend(os.path.join(tmpdir, "data.sqlite3")) as backend:
+                write(backend, {"income": {1: 100.0, "May": 5.0}})
+            with SQLiteBackend(os.path.join(tmpdir, "data.sqlite3")) as backend:
+                read(backend)
+            journal = Journal(os.path.join(tmpdir, "data.journal"), commit_interval=0)
+            journal.append(2024, {"income": {1: 100.0}})
+            journal.commit()
+            journal.close()
+            journal_size = os.path.getsize(os.path.join(tmpdir, "data.journal"))
+        stats = self.instrumentation.stats()
+        self.assertEqual(stats["test.read"]["calls"], 3)
+        self.assertEqual(stats["test.write"]["calls"], 2)
+        # The pickled shelve year, plus the SQLite rows: 39 bytes of month, kind and value read, and
+        # 55 bytes written, which include the year (the workspace name is empty)
+        self.assertGreater(stats["test.read"]["bytes_read"], 39)
+        self.assertGreater(stats["test.write"]["bytes_written"], 55)
+        self.assertEqual(stats["journal"]["bytes_written"], journal_size)
+        text = self.instrumentation.prometheus_text()
+        self.assertIn('financial_tool_calls_total{operation="test.read"} 3\n', text)
+        self.assertIn("# TYPE financial_tool_seconds_max gauge", text)
+        self.assertIn('financial_tool_bytes_written_total{operation="journal"}', text)
+        self.assertIn("journal", self.instrumentation.format_stats())
+
+    def test_profile_session(self):
+        """Test that a profile session saves a profile pstats can read."""
+        import pstats
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "session.prof")
+            with self.instrumentation.profile_session(path):
+                generate_report(MoneyManagement(), Goals(), "March", 2024)
+            self.assertIn("generate_report", "".join(name for _, _, name in pstats.Stats(path).stats))
+
+
+class TestBulkImport(unittest.TestCase):
+    """Test cases for the bulk import command line tool."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def write_file(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as statement:
+            statement.write(text)
+        return path
+
+    def test_read_csv_rows(self):
+        """Test reading signed amounts and categories from a CSV statement."""
+        path = self.write_file("statement.csv", "date,amount,category\n2024-01-03,\"1,200.50\",Salary\n2024-01-04,-12.5,Dining\n"
+                                                "2024-01-05,(0.10),Dining\n")
+        expected = [(date(2024, 1, 3), Money("1200.50"), "Salary"), (date(2024, 1, 4), Money("-12.50"), "Dining"),
+                    (date(2024, 1, 5), Money("-0.10"), "Dining")]
+        self.assertEqual(list(read_csv_rows(path)), expected)
+        self.assertEqual(list(read_csv_rows(path, chunk_size=2)), expected)
+
+    def test_read_ofx_rows(self):
+        """Test reading transactions from an SGML OFX statement."""
+        path = self.write_file("statement.ofx", "OFXHEADER:100\n<OFX><BANKTRANLIST>\n"
+                               "<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240205120000<TRNAMT>-42.10<NAME>Groceries\n</STMTTRN>\n"
+                               "<STMTTRN>\n<TRNTYPE>CREDIT\n<DTPOSTED>20240206\n<TRNAMT>100.00\n<MEMO>Refund\n</STMTTRN>\n"
+                               "</BANKTRANLIST></OFX>\n")
+        self.assertEqual(list(read_ofx_rows(path)), [(date(2024, 2, 5), Money("-42.10"), "Groceries"),
+                                                     (date(2024, 2, 6), Money("100.00"), "Refund")])
+
+    def test_chunked(self):
+        """Test splitting rows into chunks."""
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_import_rows_saves_month_totals(self):
+        """Test that imported rows are saved as month totals in chunks."""
+        rows = [(date(2024, 1, day), amount, "") for day, amount in ((1, 1000.0), (2, -20.0), (3, -30.0))]
+        rows.append((date(2024, 2, 1), -5.0, ""))
+        money_management = MoneyManagement()
+        persistence = DataPersistence(SQLiteBackend(os.path.join(self.tmpdir.name, "data.sqlite3")))
+        self.addCleanup(persistence.close)
+        persistence.update_database(expenses={1: 100.0}, year=2024)
+        self.assertEqual(import_rows(iter(rows), money_management, persistence, chunk_size=2), 4)
+        self.assertEqual(persistence.read_data(2024), {"income": {1: 1000.0}, "expenses": {1: 150.0, 2: 5.0}})
+        self.assertEqual(len(money_management.ledger), 0)
+
+    def test_import_keeps_cents(self):
+        """Test that imported amounts reach the ledger as whole cents, without float rounding."""
+        path = self.write_file("statement.csv", "date,amount\n" + "2024-03-01,-0.10\n" * 3 + "2024-03-02,$0.20\n")
+        money_management = MoneyManagement()
+        persistence = DataPersistence(SQLiteBackend(os.path.join(self.tmpdir.name, "data.sqlite3")))
+        self.addCleanup(persistence.close)
+        self.assertEqual(import_rows(read_csv_rows(path, chunk_size=3), money_management, persistence,
+                                     keep_transactions=True), 4)
+        self.assertEqual(list(money_management.ledger.columns()["amount"]), [10, 10, 10, 20])
+        self.assertEqual(persistence.read_data(2024), {"income": {3: 0.2}, "expenses": {3: 0.3}})
+
+
+class TestHeadlessImport(unittest.TestCase):
+    """Test that the model and persistence modules load quickly without the GUI libraries."""
+
+    IMPORT_BUDGET = 0.5  # seconds
+
+    def test_headless_import_time(self):
+        """Test that importing the headless modules stays under budget and skips Tk/matplotlib."""
+        script = ("import sys, time\n"
+                  "start = time.perf_counter()\n"
+                  "import models, persistence, bulk_import\n"
+                  "print(time.perf_counter() - start)\n"
+                  "print(sorted({name.split('.')[0] for name in sys.modules} & {'tkinter', 'matplotlib', 'numpy'}))\n")
+        result = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        elapsed, gui_modules = result.stdout.splitlines()
+        self.assertEqual(gui_modules, "[]")
+        self.assertLess(float(elapsed), self.IMPORT_BUDGET)
+
+
+class TestReports(unittest.TestCase):
+    """Test cases for the headless report engine."""
+
+    def setUp(self):
+        self.money_management = MoneyManagement()
+        self.goals = Goals()
+        self.money_management.update_values("i", 1000.0, "March", 2023)
+        self.money_management.update_values("e", 1500.0, "March", 2023)
+        self.goals.update_monthly_goal("1200", "i", "March", 2023)
+        self.goals.update_monthly_goal("1000", "e", "March", 2023)
+        self.engine = ReportEngine(self.money_management, self.goals)
+
+    def test_generate_report(self):
+        """Test that a report can be generated for any month without a window."""
+        text = generate_report(self.money_management, self.goals, "March", 2023)
+        self.assertTrue(text.startswith("Currently, your expenses are higher than your income by 66.67%. "))
+        self.assertIn("income goal of $1200.00", text)
+        self.assertIn("expense goal of $1000.00", text)
+
+    def test_empty_month(self):
+        """Test that a month without any values gives a report instead of an error."""
+        text = generate_report(self.money_management, self.goals, "April", 2023)
+        self.assertIn("higher than your expenses by 0.00%", text)
+
+    def test_report_is_cached_until_data_changes(self):
+        """Test that the cached report is reused until income, expenses or goals change."""
+        with patch("reports.generate_report", wraps=generate_report) as mock_generate:
+            first = self.engine.report("March", 2023)
+            self.assertIs(self.engine.report("March", 2023), first)
+            self.assertEqual(mock_generate.call_count, 1)
+
+            self.goals.update_monthly_goal("900", "i", "March", 2023)
+            second = self.engine.report("March", 2023)
+        self.assertEqual(mock_generate.call_count, 2)
+        self.assertIn("income goal of $900.00", second)
+        self.money_management.update_values("i", 1200.0, "March", 2023)
+        self.assertIn("higher than your income by 80.00%", self.engine.report("March", 2023))
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestAggregation(unittest.TestCase):
+    """Test cases for the NumPy aggregation cube."""
+
+    def setUp(self):
+        self.money_management = MoneyManagement()
+        self.year = datetime.now().year
+        for month, amount, category in ((1, 100.0, "Dining"), (1, 50.0, "Rent"), (5, 25.0, "Dining")):
+            self.money_management.add_transaction(amount, "e", date(self.year, month, 1), category)
+        self.money_management.add_transaction(900.0, "e", date(self.year - 1, 12, 1), "Rent")
+        self.money_management.update_values("i", 2000.0, 1)
+
+    def test_month_number(self):
+        """Test converting month keys to calendar months."""
+        self.assertEqual([month_number(key) for key in (4, "4", "April", "Someday", 13)], [4, 4, 4, 0, 0])
+
+    def test_rollups_match_running_totals(self):
+        """Test monthly, quarterly and yearly rollups against the ledger's running totals."""
+        cube = self.money_management.aggregate()
+        self.assertEqual(cube.years, [self.year - 1, self.year])
+        monthly = cube.monthly("expenses", self.year)
+        self.assertEqual([monthly[0], monthly[4]], [150.0, 25.0])
+        self.assertEqual(cube.quarterly("expenses", self.year).tolist(), [150.0, 25.0, 0.0, 0.0])
+        self.assertEqual(cube.yearly("expenses").tolist(),
+                         [self.money_management.get_yearly_expenses(year) for year in cube.years])
+        self.assertEqual(self.money_management.get_rollup("i", "monthly")[0], 2000.0)
+        self.assertEqual(self.money_management.get_rollup("e", "yearly"), [(self.year - 1, 900.0), (self.year, 175.0)])
+
+    def test_by_category(self):
+        """Test totals per category."""
+        cube = self.money_management.aggregate()
+        totals = dict(zip(cube.categories, cube.by_category("expenses", self.year).tolist()))
+        self.assertEqual(totals["Dining"], 125.0)
+        self.assertEqual(totals["Rent"], 50.0)
+
+    def test_compacted_ledger(self):
+        """Test that balances folded by compact() are still aggregated."""
+        self.money_management.ledger.compact()
+        self.money_management.add_transaction(5.0, "e", date(self.year, 5, 2), "Dining")
+        self.assertEqual(self.money_management.aggregate().monthly("expenses", self.year)[4], 30.0)
+
+    def test_cube_is_cached_until_a_change(self):
+        """Test that the cube is only rebuilt after the income, expenses or goals change."""
+        goals = Goals()
+        cube = self.money_management.aggregate(goals)
+        self.assertIs(self.money_management.aggregate(goals), cube)
+        self.assertIsNot(self.money_management.aggregate(), cube)
+        cube = self.money_management.aggregate(goals)
+        goals.update_monthly_goal("1500", "i", 1)
+        self.assertIsNot(self.money_management.aggregate(goals), cube)
+        self.assertEqual(goals.get_variance(self.money_management)["income"][0], 500.0)
+        self.money_management.update_values("i", 1000.0, 1)
+        self.assertEqual(goals.get_variance(self.money_management)["income"][0], -500.0)
+        self.assertEqual(self.money_management.get_rollup("i")[0], 1000.0)
+
+    def test_goal_variance(self):
+        """Test comparing months against their goals."""
+        goals = Goals()
+        goals.update_monthly_goal("1500", "i", 1)
+        goals.update_monthly_goal("120", "e", 1)
+        variance = goals.get_variance(self.money_management)
+        self.assertEqual(variance["income"][0], 500.0)
+        self.assertEqual(variance["expenses"][0], -30.0)
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestForecast(unittest.TestCase):
+    """Test cases for the year-end forecast."""
+
+    def setUp(self):
+        self.money_management = MoneyManagement()
+        self.goals = Goals()
+        for month in range(1, 13):
+            self.money_management.update_values("i", 1000.0 + 10 * month, month, 2023)
+            self.money_management.update_values("e", 500.0, MONTH_NAMES[month - 1], 2023)
+        for month in range(1, 4):
+            self.money_management.update_values("i", 1120.0 + 10 * month, month, 2024)
+            self.money_management.update_values("e", 800.0, month, 2024)
+
+    def test_project_months(self):
+        """Test the trend, moving average and seasonal naive projections."""
+        history = monthly_history(self.money_management, "i", 2024)
+        self.assertEqual(history.shape, (2, 12))
+        numpy.testing.assert_allclose(project_months(history, 3, "trend"), [1000.0 + 10 * month for month in range(16, 25)])
+        self.assertEqual(project_months(history, 3, "moving_average", window=2).tolist(), [1145.0] * 9)
+        self.assertEqual(project_months(history, 3, "seasonal_naive").tolist(), [1000.0 + 10 * month for month in range(4, 13)])
+        with self.assertRaises(ValueError):
+            project_months(history, 3, "guess")
+
+    def test_goal_probability(self):
+        """Test the chance of reaching yearly goals and that the forecast is reproducible."""
+        self.goals.update_yearly_goal("10000", "i", 2024)
+        self.goals.update_yearly_goal("5000", "e", 2024)
+        forecast = forecast_year(self.money_management, self.goals, 2024, through_month=3)
+        self.assertEqual(forecast["income"]["actual"], 3420.0)
+        self.assertEqual(forecast["income"]["probability"], 1.0)
+        self.assertEqual(forecast["expenses"]["probability"], 0.0)
+        self.assertEqual(forecast_year(self.money_management, self.goals, 2024, through_month=3), forecast)
+        self.goals.update_yearly_goal("20000", "i", 2024)
+        self.assertEqual(forecast_year(self.money_management, self.goals, 2024, through_month=3)["income"]["probability"], 0.0)
+
+    def test_simulate_year_in_parallel(self):
+        """Test that the simulated runs are split between worker processes."""
+        history = monthly_history(self.money_management, "e", 2024)
+        totals = simulate_year(history, 3, runs=1001, seed=1, workers=2)
+        self.assertEqual(totals.shape, (1001,))
+        self.assertTrue((totals >= 2400.0).all())
+
+    def test_report_includes_forecast(self):
+        """Test that the monthly report ends with the year-end forecast."""
+        self.goals.update_yearly_goal("10000", "i", 2024)
+        text = generate_report(self.money_management, self.goals, 3, 2024)
+        self.assertIn("Year-end forecast for 2024 (based on the months through March)", text)
+        self.assertIn("Chance of meeting your yearly income goal of $10000.00: 100%.", text)
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestBatchExport(unittest.TestCase):
+    """Test cases for the batch report export."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+        self.money_management = MoneyManagement()
+        self.goals = Goals()
+        self.money_management.update_values("i", 1000.0, "December", 2023)
+        self.money_management.update_values("e", 1500.0, 12, 2023)
+        self.goals.update_monthly_goal("1200", "i", 12, 2023)
+
+    def test_month_range(self):
+        """Test parsing months and iterating over a range that spans a new year."""
+        self.assertEqual(list(month_range(parse_month("2023-11"), parse_month("2024-02"))),
+                         [(2023, 11), (2023, 12), (2024, 1), (2024, 2)])
+        with self.assertRaises(ValueError):
+            parse_month("2023-13")
+
+    def test_export_reports(self):
+        """Test that every month of the range gets an HTML report with the same text as the GUI report."""
+        timings = export_reports(self.money_management, self.goals, (2023, 12), (2024, 1),
+                                 self.tmpdir.name, workers=2, charts=False)
+        self.assertEqual(sorted(name for name, _ in timings), ["report-2023-12.html", "report-2024-01.html"])
+        with open(os.path.join(self.tmpdir.name, "report-2023-12.html"), encoding="utf-8") as report:
+            text = report.read()
+        self.assertIn("higher than your income by 66.67%", text)
+        self.assertIn("income goal of $1200.00", text)
+        self.assertTrue(os.path.exists(os.path.join(self.tmpdir.name, "index.html")))
+
+    def test_export_matches_generate_report(self):
+        """Test that an exported report has the same text as generate_report, largest expenses and forecast included."""
+        for month in range(1, 12):
+            self.money_management.add_transaction(80.0, "e", date(2023, month, 5), "Dining")
+        self.money_management.add_transaction(300.0, "e", date(2023, 12, 5), "Dining")
+        export_reports(self.money_management, self.goals, (2023, 12), (2023, 12),
+                       self.tmpdir.name, workers=1, charts=False)
+        with open(os.path.join(self.tmpdir.name, "report-2023-12.html"), encoding="utf-8") as report:
+            text = report.read()
+        expected = generate_report(self.money_management, self.goals, 12, 2023)
+        self.assertIn("Dining at $300.00", expected)
+        self.assertIn("Year-end forecast for 2023", expected)
+        self.assertIn(html.escape(expected).replace("\n", "<br>\n"), text)
+
+    def test_export_charts(self):
+        """Test that a PNG chart is rendered for every year without a display."""
+        try:
+            import matplotlib
+        except ImportError:
+            self.skipTest("matplotlib is not installed")
+        timings = export_reports(self.money_management, self.goals, (2023, 12), (2023, 12),
+                                 self.tmpdir.name, workers=1)
+        self.assertIn("chart-2023.png", [name for name, _ in timings])
+        with open(os.path.join(self.tmpdir.name, "chart-2023.png"), "rb") as chart:
+            self.assertEqual(chart.read(8), b"\x89PNG\r\n\x1a\n")
+
+
+@unittest.skipUnless(numpy, "numpy is not installed")
+class TestChart(unittest.TestCase):
+    """Test cases for the embedded chart of GUI_management."""
+
+    @patch('financial_management_tool.Tk')
+    def setUp(self, mock_Tk):
+        self.gui = GUI_management(MoneyManagement(), Goals(), MagicMock())
+
+    def finish_tasks(self):
+        self.assertTrue(self.gui.tasks.wait(timeout=10))
+        self.gui.tasks.poll()
+
+    def fake_create_chart(self):
+        def bar(x):
+            rect = MagicMock()
+            rect.get_x.return_value = x - 0.175
+            rect.get_width.return_value = 0.35
+            return rect
+        self.gui.income_bars = [bar(i) for i in range(1, 13)]
+        self.gui.expense_bars = [bar(i + 0.35) for i in range(1, 13)]
+        self.gui.income_goal_points = MagicMock()
+        self.gui.expense_goal_points = MagicMock()
+        self.gui.chart_axes = MagicMock()
+        self.gui.chart_window = MagicMock()
+        self.gui.chart_canvas = MagicMock()
+
+    def test_plot_chart_reuses_figure(self):
+        """Test that plotting twice updates the same artists instead of creating a new figure."""
+        with patch.object(self.gui, "create_chart", side_effect=self.fake_create_chart) as mock_create:
+            self.gui.plot_chart()
+            self.finish_tasks()
+            self.gui.money_management.update_values("i", 1200.0, 3)
+            self.gui.goals.update_monthly_goal("1500", "i", 3)
+            self.gui.plot_chart()
+            self.finish_tasks()
+        mock_create.assert_called_once()
+        self.gui.income_bars[2].set_height.assert_called_with(1200.0)
+        self.assertEqual(self.gui.income_goal_points.set_offsets.call_args[0][0][2], (3.0, 1500.0))
+        self.assertEqual(self.gui.chart_canvas.draw_idle.call_count, 2)
+
+
+    def test_plot_archived_year(self):
+        """Test that a year only in the archive is drawn from it without a background task."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "history.fmarch")
+            write_archive(path, {2019: {"income": {2: 700.0}, "income_goal": {2: 900.0}}})
+            with ColumnarArchive(path) as archive:
+                self.gui.money_management.archive = archive
+                with patch.object(self.gui, "create_chart", side_effect=self.fake_create_chart):
+                    self.gui.plot_chart(2019)
+                self.assertFalse(self.gui.tasks.running("chart"))
+                self.gui.income_bars[1].set_height.assert_called_with(700.0)
+                self.assertEqual(self.gui.income_goal_points.set_offsets.call_args[0][0][1], (2.0, 900.0))
+                self.gui.chart_canvas.draw_idle.assert_called_once()
+
+    def test_superseded_chart_is_not_drawn(self):
+        """Test that only the latest chart request is drawn."""
+        with patch.object(self.gui, "draw_chart") as mock_draw:
+            self.gui.plot_chart()
+            self.gui.money_management.update_values("i", 1200.0, 3)
+            self.gui.plot_chart()
+            self.finish_tasks()
+        mock_draw.assert_called_once()
+        self.assertEqual(mock_draw.call_args[0][0]["income"][2], 1200.0)
+
+    def test_report_is_shown_after_background_generation(self):
+        """Test that the report generated on a worker thread is shown on the Tk thread."""
+        with patch.object(self.gui, "show_report") as mock_show:
+            self.gui.open_info_window()
+            mock_show.assert_not_called()
+            self.finish_tasks()
+        mock_show.assert_called_once_with(generate_report(self.gui.money_management, self.gui.goals))
+
+    def test_report_reads_copies(self):
+        """Test that the report task works on copies, so it never reads the models while they change."""
+        self.gui.money_management.update_values("i", 800.0, 3)
+        with patch("reports.generate_report", return_value="report") as mock_generate, \
+                patch.object(self.gui, "show_report"):
+            self.gui.open_info_window()
+            self.gui.money_management.update_values("i", 900.0, 3)
+            self.finish_tasks()
+        money_management, goals = mock_generate.call_args[0][:2]
+        self.assertIsNot(money_management, self.gui.money_management)
+        self.assertIsNot(goals, self.gui.goals)
+        self.assertEqual(money_management.get_monthly_vals("i", 3), 800.0)
+
+
+class TestTaskRunner(unittest.TestCase):
+    """Test cases for the background task runner used by the GUI."""
+
+    def setUp(self):
+        self.tasks = TaskRunner(max_workers=1)
+        self.addCleanup(self.tasks.shutdown)
+
+    def test_callbacks_run_on_poll(self):
+        """Test that results are only handed to callbacks by poll."""
+        results = []
+        self.tasks.submit("sum", sum, [1, 2, 3], callback=results.append)
+        self.assertTrue(self.tasks.wait(timeout=10))
+        self.assertEqual(results, [])
+        self.assertEqual(self.tasks.poll(), 1)
+        self.assertEqual(results, [6])
+        self.assertFalse(self.tasks.busy)
+
+    def test_superseded_and_cancelled_tasks(self):
+        """Test that superseded and cancelled tasks don't reach their callback."""
+        release = threading.Event()
+        results = []
+        self.tasks.submit("block", release.wait)
+        self.tasks.submit("chart", str, 1, callback=results.append)
+        self.tasks.submit("chart", str, 2, callback=results.append)
+        self.tasks.submit("report", str, 3, callback=results.append)
+        self.tasks.cancel("report")
+        self.assertTrue(self.tasks.running("chart"))
+        release.set()
+        self.assertTrue(self.tasks.wait(timeout=10))
+        self.tasks.poll()
+        self.assertEqual(results, ["2"])
+
+    def test_error_callback(self):
+        """Test that errors are handed to the error callback."""
+        errors = []
+        self.tasks.submit("fail", int, "x", error_callback=errors.append)
+        self.tasks.wait(timeout=10)
+        self.tasks.poll()
+        self.assertIsInstance(errors[0], ValueError)
+
+
 class TestGUIManagement(unittest.TestCase):
     """Test cases for GUI_management class."""
 
@@ -0,0 +1,233 @@
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime
+
+from models import MoneyManagement, Goals
+from persistence import DataPersistence, SQLiteBackend, ConnectionPool
+
+
+_valid_name = re.compile(r"^[\w-]+$")
+_shelve_suffixes = (".dat", ".dir", ".bak", ".db")
+
+
+
+class Workspace:
+    """
+    This class holds one named set of finances (one account, household or user) and its storage.
+
+    Nothing is read until `money_management` or `goals` is first used, so opening a workspace is cheap.
+    Even then only the current year is read; other years are read when they are asked for with
+    `load_year`, so the cost of opening a workspace doesn't grow with its history.
+    """
+
+    def __init__(self, name: str, persistence: DataPersistence):
+        """
+        Initializes the workspace without loading its data.
+
+        Args:
+            name (str): The name of the workspace.
+            persistence (DataPersistence): Where the workspace's data is stored.
+        """
+        self.name = name
+        self.persistence = persistence
+        self._money_management = None
+        self._goals = None
+        self._years = set()  # years read from storage so far
+
+    @property
+    def loaded(self) -> bool:
+        """
+        True once the workspace's data has been read.
+        """
+        return self._money_management is not None
+
+    @property
+    def money_management(self) -> MoneyManagement:
+        """
+        The workspace's income and expenses, read from storage on first use.
+        """
+        if not self.loaded:
+            self.load()
+        return self._money_management
+
+    @property
+    def goals(self) -> Goals:
+        """
+        The workspace's goals, read from storage on first use.
+        """
+        if not self.loaded:
+            self.load()
+        return self._goals
+
+    def load(self) -> None:
+        """
+        Reads the current year of the workspace into new MoneyManagement and Goals objects.
+        """
+        self._money_management = MoneyManagement()
+        self._goals = Goals()
+        self._years = set()
+        self.load_year(datetime.now().year)
+
+    def load_year(self, year: int) -> None:
+        """
+        Reads a year of the workspace from storage, unless it was read already.
+
+        Call it before a year is shown or changed: loading a year sets its months to the stored values.
+
+        Args:
+            year (int): The year to read.
+        """
+        if not self.loaded:
+            self.load()
+        if year in self._years:
+            return
+        data = self.persistence.read_data(year)
+        # Loaded values aren't changes, so they are kept out of the journal
+        self.persistence.detach()
+        self._money_management.load_data(data, year)
+        self._goals.load_data(data, year)
+        self.persistence.attach(self._money_management, self._goals)
+        self._years.add(year)
+
+    def save(self) -> bool:
+        """
+        Saves the values changed since the last save.
+
+        Returns:
+            bool: False if the changes couldn't be written (they are kept for the next save).
+        """
+        if not self.loaded:
+            return True
+        return self.persistence.save_changes(self._money_management.get_changes(), self._goals.get_changes())
+
+    def close(self) -> None:
+        """
+        Saves the changed values and closes the workspace's storage.
+        """
+        self.save()
+        self.persistence.close()
+
+
+
+class WorkspaceManager:
+    """
+    This class opens named workspaces and keeps the most recently used ones open.
+
+    Workspaces are stored either in their own shelve file ('financial_management_data-<name>') in a
+    directory, or together in one SQLite database whose connection they all share through a
+    ConnectionPool. At most `max_open` workspaces are kept open; opening another one saves and
+    closes the least recently used.
+    """
+
+    _prefix = 'financial_management_data-'
+
+    def __init__(self, directory: str = ".", sqlite: str = None, max_open: int = 8, on_evict=None,
+                 shared: bool = False):
+        """
+        Initializes the manager with no open workspaces.
+
+        Args:
+            directory (str, optional): The directory holding the shelve files of the workspaces.
+            sqlite (str, optional): An SQLite database to keep every workspace in, instead of shelve files.
+            max_open (int, optional): The number of workspaces kept open.
+            on_evict (optional): Called with the Workspace before it is closed to make room.
+            shared (bool, optional): Open the shelve files in shared mode, so other processes can use
+                the same workspaces at the same time (see ShelveBackend).
+        """
+        if max_open < 1:
+            raise ValueError("max_open must be at least 1")
+        self.directory = directory
+        self.sqlite = sqlite
+        self.max_open = max_open
+        self.on_evict = on_evict
+        self.shared = shared
+        self.pool = ConnectionPool() if sqlite else None
+        self._open = OrderedDict()  # name: Workspace, least recently used first
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def names(self) -> list:
+        """
+        Returns the sorted names of the stored and open workspaces.
+        """
+        names = set(self._open)
+        if self.sqlite:
+            backend = SQLiteBackend(self.sqlite, pool=self.pool)
+            try:
+                names.update(name for name in backend.workspaces() if name)
+            finally:
+                backend.close()
+        elif os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if filename.startswith(self._prefix):
+                    name = filename[len(self._prefix):]
+                    for suffix in _shelve_suffixes:
+                        if name.endswith(suffix):
+                            name = name[:-len(suffix)]
+                            break
+                    if _valid_name.match(name):
+                        names.add(name)
+        return sorted(names)
+
+    def open(self, name: str) -> Workspace:
+        """
+        Returns a workspace, opening it (and closing the least recently used one) if it isn't open yet.
+
+        Its data is only read once it is used (see Workspace).
+
+        Args:
+            name (str): The name of the workspace: letters, digits, '_' and '-'.
+
+        Returns:
+            Workspace: The workspace.
+
+        Raises:
+            ValueError: If the name isn't valid.
+            StorageError: If the workspace's data file can't be opened.
+        """
+        workspace = self._open.get(name)
+        if workspace is not None:
+            self._open.move_to_end(name)
+            return workspace
+        if not _valid_name.match(name):
+            raise ValueError(f"Invalid workspace name '{name}'")
+
+        while len(self._open) >= self.max_open:
+            self.evict(next(iter(self._open)))
+
+        if self.sqlite:
+            persistence = DataPersistence(SQLiteBackend(self.sqlite, workspace=name, pool=self.pool))
+        else:
+            persistence = DataPersistence(filename=os.path.join(self.directory, self._prefix + name), shared=self.shared)
+        workspace = self._open[name] = Workspace(name, persistence)
+        return workspace
+
+    def is_open(self, name: str) -> bool:
+        """
+        Returns whether a workspace is currently open.
+        """
+        return name in self._open
+
+    def evict(self, name: str) -> None:
+        """
+        Saves and closes an open workspace.
+
+        Args:
+            name (str): The name of the workspace.
+        """
+        workspace = self._open.pop(name)
+        if self.on_evict is not None:
+            self.on_evict(workspace)
+        workspace.close()
+
+    def close(self) -> None:
+        """
+        Saves and closes every open workspace.
+        """
+        while self._open:
+            self._open.popitem(last=False)[1].close()